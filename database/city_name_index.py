@@ -0,0 +1,76 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+NOT_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """Регистр, ё/е и пунктуация не влияют на поиск: "Санкт-Петербург" -> "санкт петербург" """
+    name = name.casefold().replace("ё", "е")
+    return NOT_WORD.sub(" ", name).strip()
+
+
+class CityNameIndex:
+    """Отсортированный массив нормализованных названий городов.
+
+    Ключи - название целиком и его хвосты с начала каждого слова, поэтому
+    "петербург" находит "Санкт-Петербург". Поиск по точному совпадению и
+    префиксу - бинарный поиск по ключам.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str | None, int | None]]) -> None:
+        entries = []
+        # rows: city_uuid, city, region, code
+        self._cities: Dict[str, Tuple[str, str, int]] = {}
+        for city_uuid, city, region, code in rows:
+            if not city:
+                continue
+            name = normalize_name(city)
+            self._cities[city_uuid] = (name, normalize_name(region or ""), code or 0)
+            words = name.split(" ")
+            position = 0
+            for word in words:
+                entries.append((name[position:], position, city_uuid))
+                position += len(word) + 1
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = [(position, city_uuid) for _, position, city_uuid in entries]
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def search(self, query: str, region: str | None = None) -> List[str]:
+        """uuid городов, название которых (или одно из слов) начинается с query.
+
+        Первыми идут точные совпадения, затем совпадения с начала названия,
+        города из region и региональные центры, затем короткие названия.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        region = normalize_name(region) if region else None
+        ranks: Dict[str, tuple] = {}
+        start = bisect_left(self._keys, query)
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(query):
+                break
+            position, city_uuid = self._entries[i]
+            rank = self._rank(city_uuid, query, position, region)
+            if city_uuid not in ranks or rank < ranks[city_uuid]:
+                ranks[city_uuid] = rank
+        return sorted(ranks, key=ranks.__getitem__)
+
+    def _rank(self, city_uuid: str, query: str, position: int, region: str | None):
+        name, city_region, code = self._cities[city_uuid]
+        # в cities нет численности населения, поэтому крупные города
+        # угадываем по региону: "Москва"/"Москва", "Псков"/"Псковская область"
+        is_regional_centre = city_region.startswith(name[: max(len(name) - 1, 1)])
+        return (
+            name != query,
+            position != 0,
+            region is not None and not city_region.startswith(region),
+            not is_regional_centre,
+            len(name),
+            code,
+        )
@@ -13,3 +13,15 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 ScopedSession = scoped_session(SessionLocal)
+
+
+def bind_engine(url: str) -> None:
+    """Переключить сессии на другую базу, пока ими никто не пользовался.
+
+    engine создаётся при импорте, а адрес отдельной базы (--stand-in)
+    известен только после разбора опций pytest.
+    """
+    global engine  # pylint: disable=global-statement
+    engine.dispose()
+    engine = create_engine(url)
+    SessionLocal.configure(bind=engine)
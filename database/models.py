@@ -18,19 +18,47 @@ from enums.country_code import CountryCode
 
 Base = declarative_base()
 
+ORDER_STATES = ("ACCEPTED", "WAITING", "SUCCESSFUL", "INVALID")
+
 
 class OrderModel(Base):
     __tablename__ = "orders"
 
     uuid = Column(String(36), primary_key=True)
-    created_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
-    state = Column(Enum("ACCEPTED", "INVALID"))
+    created_at = Column(DateTime, default=func.now(), index=True)  # pylint: disable=not-callable
+    state = Column(Enum(*ORDER_STATES), index=True)
+    cdek_number = Column(String(30))
+    # заказ выдан тесту до leased_until; просроченная аренда считается свободной
+    leased_by = Column(String(100))
+    leased_until = Column(DateTime)
 
     def to_dict(self):
         return {
             "uuid": self.uuid,
             "created_at": self.created_at,
             "state": self.state,
+            "cdek_number": self.cdek_number,
+            "leased_by": self.leased_by,
+            "leased_until": self.leased_until,
+        }
+
+
+class SyncStateModel(Base):
+    __tablename__ = "sync_state"
+
+    name = Column(String(100), primary_key=True)
+    synced_at = Column(DateTime, nullable=False)
+    rows = Column(Integer)
+    upserted = Column(Integer)
+    deleted = Column(Integer)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "synced_at": self.synced_at,
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "deleted": self.deleted,
         }
 
 
@@ -39,7 +67,7 @@ class AuthTokenModel(Base):
 
     access_token = Column(Text, nullable=False)
     token_type = Column(String(100))
-    expired_at = Column(DateTime, nullable=False)
+    expired_at = Column(DateTime, nullable=False, index=True)
     scope = Column(String(100))
     jti = Column(String(100), primary_key=True, nullable=False)
 
@@ -71,6 +99,8 @@ class CityModel(Base):
     payment_limit = Column(Float)
     country = Column(String(100))
     kladr_code = Column(BIGINT(unsigned=True))
+    # хэш содержимого строки для инкрементальной синхронизации с API
+    content_hash = Column(String(32))
     delivery_points = relationship('DeliveryPointModel', back_populates="city")
 
     def to_dict(self):
@@ -140,6 +170,7 @@ class DeliveryPointModel(Base):
     distance = Column(INTEGER(unsigned=True))
     fulfillment = Column(Boolean)
     city_code = Column(INTEGER(unsigned=True), ForeignKey("cities.code"))
+    content_hash = Column(String(32))
     city = relationship("CityModel", back_populates="delivery_points")
 
 
@@ -1,17 +1,107 @@
 # pyright: reportReturnType=false
+import hashlib
+import json
 from datetime import datetime, timedelta
-from typing import List
-from sqlalchemy import desc, exists
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from sqlalchemy import and_, case, delete, desc, exists, func, insert, or_, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.orm import Session
+from database.city_name_index import CityNameIndex
 from database.models import (
     CityModel,
     DeliveryModeModel,
     DeliveryPointModel,
     OrderModel,
     AuthTokenModel,
+    PostalCodeModel,
+    SyncStateModel,
     TariffModel,
 )
 
+DEFAULT_BATCH_SIZE = 1000
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def upsert(session: Session, model, rows: List[dict], conflict_columns: Tuple[str, ...]) -> None:
+    """INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (SQLite, PostgreSQL).
+
+    conflict_columns - уникальный ключ, по которому строка считается той же.
+    MySQL сам проверяет все уникальные ключи, остальным диалектам ключ
+    передаётся явно, иначе совпадение по не первичному ключу падает на
+    IntegrityError. Для прочих диалектов строки пишутся по одной.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    # обновляются колонки, которые есть в строках: автоинкрементный id не трогаем
+    update_names = [name for name in rows[0] if name not in conflict_columns]
+    dialect = session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table)
+        update_columns = {name: statement.inserted[name] for name in update_names}
+        statement = statement.on_duplicate_key_update(**update_columns)
+    elif dialect in ("sqlite", "postgresql"):
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        update_columns = {name: statement.excluded[name] for name in update_names}
+        statement = statement.on_conflict_do_update(
+            index_elements=list(conflict_columns), set_=update_columns
+        )
+    else:
+        for row in rows:
+            key = {column: row[column] for column in conflict_columns}
+            stored = session.scalars(select(model).filter_by(**key).limit(1)).first()
+            if stored is None:
+                session.add(model(**row))
+            else:
+                for column, value in row.items():
+                    setattr(stored, column, value)
+        session.flush()
+        return
+    # executemany: SQL компилируется один раз и берётся из кэша SQLAlchemy,
+    # а не собирается заново под каждую пачку с .values(rows)
+    session.execute(statement, rows)
+
+
+def content_hash(row: dict) -> str:
+    """Хэш значений колонок строки: совпал с сохранённым - строку не переписываем"""
+    data = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def table_row(model, data: dict) -> dict:
+    # у всех строк одного INSERT должен быть одинаковый набор колонок,
+    # а лишние поля из payload'а API в таблицу не идут
+    columns = model.__table__.columns.keys()
+    row = {column: data.get(column) for column in columns if column != "content_hash"}
+    if "content_hash" in columns:
+        row["content_hash"] = content_hash(row)
+    return row
+
+
+def purge_batches(session: Session, key_column, condition, batch_size: int) -> int:
+    """Удаление строк по condition пачками с commit после каждой.
+
+    Короткие транзакции не держат блокировки на всю таблицу, пока CI
+    пишет в неё же.
+    """
+    table = key_column.table
+    deleted = 0
+    while True:
+        keys = list(session.scalars(select(key_column).where(condition).limit(batch_size)))
+        if not keys:
+            return deleted
+        session.execute(delete(table).where(key_column.in_(keys)))
+        session.commit()
+        deleted += len(keys)
+        if len(keys) < batch_size:
+            return deleted
+
 
 class OrderRepository:
     def __init__(self, session: Session) -> None:
@@ -24,13 +114,74 @@ class OrderRepository:
         self.session.refresh(order)
         return order
 
-    def get_all_orders(self) -> List[OrderModel]:
-        return (
-            self.session.query(OrderModel)
-            .where(OrderModel.created_at.isnot(None))
-            .all()
+    def purge_created_before(
+        self, created_before: datetime, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        # заказы, выданные тестам, не удаляем
+        return purge_batches(
+            self.session,
+            OrderModel.uuid,
+            and_(OrderModel.created_at < created_before, self._is_free(datetime.now())),
+            batch_size,
         )
 
+    @staticmethod
+    def _is_free(now: datetime):
+        return or_(OrderModel.leased_until.is_(None), OrderModel.leased_until < now)
+
+    def count_available(self, states: Iterable[str]) -> int:
+        return self.session.scalar(
+            select(func.count())
+            .select_from(OrderModel)
+            .where(OrderModel.state.in_(states), self._is_free(datetime.now()))
+        )
+
+    def claim_order(
+        self, states: Iterable[str], leased_by: str, lease_s: float
+    ) -> OrderModel | None:
+        """Свободный заказ в одном из states, выданный в аренду до now + lease_s.
+
+        SKIP LOCKED: воркеры xdist не ждут друг друга на одной строке, а
+        берут следующую свободную.
+        """
+        now = datetime.now()
+        try:
+            order = self.session.scalars(
+                select(OrderModel)
+                .where(OrderModel.state.in_(states), self._is_free(now))
+                .order_by(OrderModel.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if order is not None:
+                order.leased_by = leased_by
+                order.leased_until = now + timedelta(seconds=lease_s)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return order
+
+    def release_order(self, uuid: str) -> None:
+        self.session.execute(
+            update(OrderModel)
+            .where(OrderModel.uuid == uuid)
+            .values(leased_by=None, leased_until=None)
+        )
+        self.session.commit()
+
+    def get_orders_in_states(self, states: Iterable[str]) -> List[OrderModel]:
+        return list(
+            self.session.scalars(select(OrderModel).where(OrderModel.state.in_(states)))
+        )
+
+    def update_state(self, uuid: str, state: str, cdek_number: str | None = None) -> None:
+        values = {"state": state}
+        if cdek_number:
+            values["cdek_number"] = cdek_number
+        self.session.execute(update(OrderModel).where(OrderModel.uuid == uuid).values(**values))
+        self.session.commit()
+
 
 class TokenRepository:
     def __init__(self, session: Session) -> None:
@@ -48,8 +199,19 @@ class TokenRepository:
         return auth_token
 
     def get_last_token_row(self) -> AuthTokenModel:
+        # first() даёт LIMIT 1, по индексу expired_at это чтение одной строки
         return self.session.query(AuthTokenModel).order_by(desc("expired_at")).first()
 
+    def purge_expired_before(
+        self, expired_before: datetime, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        return purge_batches(
+            self.session,
+            AuthTokenModel.jti,
+            AuthTokenModel.expired_at < expired_before,
+            batch_size,
+        )
+
     def is_expired(self, token_row: AuthTokenModel) -> bool:
         if token_row.expired_at is None:
             return True
@@ -61,29 +223,109 @@ class TokenRepository:
             return str(token_row.access_token)
 
 
+class SyncStateRepository:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def get(self, name: str) -> SyncStateModel | None:
+        return self.session.get(SyncStateModel, name)
+
+    def record(self, name: str, rows: int, upserted: int, deleted: int) -> SyncStateModel:
+        return self.session.merge(
+            SyncStateModel(
+                name=name,
+                synced_at=datetime.now(),
+                rows=rows,
+                upserted=upserted,
+                deleted=deleted,
+            )
+        )
+
+
 class CityRepository:
     def __init__(self, session: Session) -> None:
         self.session = session
+        self._name_index = None
 
-    def write_cities(self, cities) -> List[CityModel]:
+    def write_cities(self, cities, batch_size: int = DEFAULT_BATCH_SIZE) -> List[CityModel]:
+        # один запрос за всеми существующими uuid вместо exists() на каждый город
+        known_uuids = set(self.session.scalars(select(CityModel.city_uuid)))
+        new_uuids = []
+        try:
+            for batch in chunked(cities, batch_size):
+                rows = []
+                for city_data in batch:
+                    if city_data["city_uuid"] not in known_uuids:
+                        known_uuids.add(city_data["city_uuid"])
+                        rows.append(table_row(CityModel, city_data))
+                if rows:
+                    # многострочный INSERT на пачку, без refresh каждой строки
+                    self.session.execute(insert(CityModel), rows)
+                    new_uuids.extend(row["city_uuid"] for row in rows)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self._name_index = None
+        return self.get_rows_by_uuids(new_uuids, batch_size)
+
+    def get_rows_by_uuids(
+        self, uuids: List[str], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[CityModel]:
         city_models = []
-        for city_data in cities:
-            if not self.exists(city_data["city_uuid"]):
-                city = CityModel(**city_data)
-                city_models.append(city)
-                self.session.add(city)
-                self.session.commit()
-                self.session.refresh(city)
+        for batch in chunked(uuids, batch_size):
+            city_models.extend(
+                self.session.scalars(
+                    select(CityModel).where(CityModel.city_uuid.in_(batch))
+                )
+            )
         return city_models
 
     def exists(self, uuid):
         return self.session.query(exists().where(CityModel.city_uuid == uuid)).scalar()
 
-    def get_row_by_city(self, city: str) -> CityModel:
-        return (
-            self.session.query(CityModel).where(CityModel.city.contains(city)).first()
+    def get_content_hashes(self) -> Dict[str, str | None]:
+        return dict(
+            self.session.execute(select(CityModel.city_uuid, CityModel.content_hash)).all()
         )
 
+    def upsert_cities(self, rows: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        # без commit: синхронизация справочников идёт одной транзакцией
+        for batch in chunked(rows, batch_size):
+            # uuid города в API может смениться при том же code
+            upsert(self.session, CityModel, batch, ("code",))
+        self._name_index = None
+
+    def delete_by_uuids(self, uuids: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        for batch in chunked(uuids, batch_size):
+            city_codes = select(CityModel.code).where(CityModel.city_uuid.in_(batch))
+            self.session.execute(
+                delete(PostalCodeModel).where(PostalCodeModel.city_code.in_(city_codes))
+            )
+            self.session.execute(delete(CityModel).where(CityModel.city_uuid.in_(batch)))
+        self._name_index = None
+
+    def get_name_index(self) -> CityNameIndex:
+        # LIKE '%...%' не использует индекс, поэтому ищем по индексу в памяти
+        if self._name_index is None:
+            self._name_index = CityNameIndex(
+                self.session.execute(
+                    select(
+                        CityModel.city_uuid,
+                        CityModel.city,
+                        CityModel.region,
+                        CityModel.code,
+                    )
+                )
+            )
+        return self._name_index
+
+    def get_row_by_city(self, city: str, region: str | None = None) -> CityModel:
+        city_uuids = self.get_name_index().search(city, region)
+        if city_uuids:
+            return self.session.get(CityModel, city_uuids[0])
+        return None
+
     def get_code_by_city(self, city: str) -> int | None:
         city_row = self.get_row_by_city(city)
         if city_row:
@@ -98,17 +340,72 @@ class DeliveryPointRepository:
         self.session = session
 
     def write_points(
-        self, delivery_points, city_code: int
+        self, delivery_points, city_code: int, batch_size: int = DEFAULT_BATCH_SIZE
     ) -> List[DeliveryPointModel]:
-        delivery_point_models = []
-        for point_data in delivery_points:
-            point_data["city_code"] = city_code
-            point = DeliveryPointModel(**point_data)
-            delivery_point_models.append(point)
-            self.session.add(point)
+        self.write_points_by_city({city_code: delivery_points}, batch_size)
+        return self.get_city_points(city_code)
+
+    def write_points_by_city(
+        self, points_by_city: dict, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        # upsert пачками: повторная загрузка города не падает на первичном ключе
+        rows = (
+            table_row(DeliveryPointModel, {**point_data, "city_code": city_code})
+            for city_code, delivery_points in points_by_city.items()
+            for point_data in delivery_points
+        )
+        try:
+            for batch in chunked(rows, batch_size):
+                upsert(self.session, DeliveryPointModel, batch, ("code",))
             self.session.commit()
-            self.session.refresh(point)
-        return delivery_point_models
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def get_weight_envelopes(self) -> Dict[int, Tuple[float | None, float | None]]:
+        """city_code -> (наибольший weight_min, наименьший weight_max) по офисам города.
+
+        Нулевые и пустые веса не учитываются, как в get_city_weight_range.
+        """
+        weight_min = DeliveryPointModel.weight_min
+        weight_max = DeliveryPointModel.weight_max
+        rows = self.session.execute(
+            select(
+                DeliveryPointModel.city_code,
+                func.max(case((weight_min != 0, weight_min))),
+                func.min(case((weight_max != 0, weight_max))),
+            )
+            .where(DeliveryPointModel.city_code.isnot(None))
+            .group_by(DeliveryPointModel.city_code)
+        )
+        return {city_code: (low, high) for city_code, low, high in rows}
+
+    def get_content_hashes(self) -> Dict[str, str | None]:
+        return dict(
+            self.session.execute(
+                select(DeliveryPointModel.code, DeliveryPointModel.content_hash)
+            ).all()
+        )
+
+    def upsert_points(self, rows: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        # rows уже в виде table_row, commit делает вызывающий код
+        for batch in chunked(rows, batch_size):
+            upsert(self.session, DeliveryPointModel, batch, ("code",))
+
+    def delete_by_codes(self, codes: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        for batch in chunked(codes, batch_size):
+            self.session.execute(
+                delete(DeliveryPointModel).where(DeliveryPointModel.code.in_(batch))
+            )
+
+    def get_city_points(self, city_code: int) -> List[DeliveryPointModel]:
+        return list(
+            self.session.scalars(
+                select(DeliveryPointModel).where(
+                    DeliveryPointModel.city_code == city_code
+                )
+            )
+        )
 
 
 class TariffRepository:
@@ -143,14 +440,18 @@ class DeliveryModeRepository:
         self.session = session
 
     def all(self) -> List[DeliveryModeModel]:
-        return self.session.query(DeliveryModeModel)
+        return self.session.query(DeliveryModeModel).all()
 
     def write_mode_list(self, mode_payload_list) -> List[DeliveryModeModel]:
-        mode_list = []
-        for payload in mode_payload_list:
-            mode = DeliveryModeModel(**payload)
-            mode_list.append(mode)
-            self.session.add(mode)
+        # upsert по tariff_code: справочник пишут и фикстура tariff_calculator,
+        # и test_all_tariffs, повторная запись не должна падать
+        columns = [name for name in DeliveryModeModel.__table__.columns.keys() if name != "id"]
+        rows = [{name: payload.get(name) for name in columns} for payload in mode_payload_list]
+        try:
+            upsert(self.session, DeliveryModeModel, rows, ("tariff_code",))
             self.session.commit()
-            self.session.refresh(mode)
-        return mode_list
+        except Exception:
+            # общая на сессию pytest транзакция не должна остаться сломанной
+            self.session.rollback()
+            raise
+        return self.all()
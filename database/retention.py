@@ -0,0 +1,57 @@
+"""Очистка растущих таблиц долгоживущей базы CI.
+
+    python -m database.retention [--orders-days 30] [--tokens-hours 24] [--batch-size 1000]
+
+Удаляет истёкшие токены и старые заказы пачками с commit после каждой.
+"""
+import argparse
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from database.repository import DEFAULT_BATCH_SIZE, OrderRepository, TokenRepository
+
+ORDERS_RETENTION_DAYS = 30
+# истёкшие токены немного храним для разбора упавших прогонов
+TOKENS_RETENTION_HOURS = 24
+
+
+def purge(
+    session: Session,
+    orders_days: float = ORDERS_RETENTION_DAYS,
+    tokens_hours: float = TOKENS_RETENTION_HOURS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    now = datetime.now()
+    return {
+        "auth_tokens": TokenRepository(session).purge_expired_before(
+            now - timedelta(hours=tokens_hours), batch_size
+        ),
+        "orders": OrderRepository(session).purge_created_before(
+            now - timedelta(days=orders_days), batch_size
+        ),
+    }
+
+
+def main(argv=None) -> None:
+    # engine создаётся при импорте из DB_URL, поэтому после load_dotenv()
+    from database.db_session import ScopedSession  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders-days", type=float, default=ORDERS_RETENTION_DAYS)
+    parser.add_argument("--tokens-hours", type=float, default=TOKENS_RETENTION_HOURS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    session = ScopedSession()
+    try:
+        deleted = purge(session, args.orders_days, args.tokens_hours, args.batch_size)
+    finally:
+        ScopedSession.remove()
+    for table, count in deleted.items():
+        print(f"{table}: {count} rows deleted")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
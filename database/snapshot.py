@@ -0,0 +1,337 @@
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import JSON, Boolean, Float, Integer, String, func, select
+from sqlalchemy.orm import Session
+
+from database.models import CityModel, DeliveryModeModel, DeliveryPointModel, SyncStateModel
+from database.repository import DeliveryPointRepository
+from enums.country_code import CountryCode
+
+# Формат файла: MAGIC, длина заголовка (uint64), JSON-заголовок, затем
+# выровненные колонки. Числа лежат массивами, строки - индексами в общей
+# таблице строк (смещения + utf-8 блоб). JSON-колонки в снимок не попадают.
+MAGIC = b"AQASNAP1"
+ALIGN = 8
+INT_NULL = -(2**63)
+BOOL_NULL = -1
+STRING_NULL = -1
+# уникальная на каждую строку и тестам не нужна - в таблицу строк не пишем
+SKIPPED_COLUMNS = {"content_hash"}
+
+# таблица -> (модель, сортировка, преобразования значений при чтении)
+SNAPSHOT_TABLES = {
+    "cities": (CityModel, (CityModel.code,), {"country_code": CountryCode}),
+    "delivery_points": (
+        DeliveryPointModel,
+        (DeliveryPointModel.city_code, DeliveryPointModel.code),
+        {},
+    ),
+    "delivery_modes": (DeliveryModeModel, (DeliveryModeModel.id,), {}),
+}
+
+
+def column_kind(column) -> str | None:
+    """Код array для колонки или None, если колонка в снимок не попадает"""
+    if isinstance(column.type, JSON) or column.name in SKIPPED_COLUMNS:
+        return None
+    if isinstance(column.type, Boolean):
+        return "b"
+    if isinstance(column.type, Float):
+        return "d"
+    if isinstance(column.type, Integer):
+        return "q"
+    if isinstance(column.type, String):
+        return "i"
+    return None
+
+
+def source_marker(session: Session) -> dict:
+    """Число строк справочников и время последней синхронизации.
+
+    Хранится в заголовке снимка: если база с тех пор изменилась (заново
+    заполнена, синхронизирована), снимок устарел.
+    """
+    marker = {
+        name: session.scalar(select(func.count()).select_from(model))
+        for name, (model, _, _) in SNAPSHOT_TABLES.items()
+    }
+    synced_at = session.scalar(select(func.max(SyncStateModel.synced_at)))
+    marker["synced_at"] = synced_at.isoformat() if synced_at else None
+    return marker
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._blob = bytearray()
+        self._offsets = array("Q", [0])
+
+    def add(self, value) -> int:
+        if value is None:
+            return STRING_NULL
+        value = str(getattr(value, "value", value))
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self._ids)
+            self._blob += value.encode()
+            self._offsets.append(len(self._blob))
+        return string_id
+
+
+def _encode(kind: str, value, strings: StringTable):
+    if kind == "i":
+        return strings.add(value)
+    if value is None:
+        return {"q": INT_NULL, "d": math.nan, "b": BOOL_NULL}[kind]
+    if kind == "b":
+        return int(bool(value))
+    return float(value) if kind == "d" else int(value)
+
+
+def write_snapshot(session: Session, path: Path) -> None:
+    strings = StringTable()
+    sections: List[bytes] = []
+    header = {"marker": source_marker(session), "tables": {}}
+    offset = 0
+
+    def add_section(data: bytes) -> dict:
+        nonlocal offset
+        section = {"offset": offset, "nbytes": len(data)}
+        padding = -len(data) % ALIGN
+        sections.append(data + b"\0" * padding)
+        offset += len(data) + padding
+        return section
+
+    def add_table(name: str, kinds: Dict[str, str], rows: list) -> None:
+        table_header = {"rows": len(rows), "columns": {}}
+        for position, (column, kind) in enumerate(kinds.items()):
+            values = array(kind, (_encode(kind, row[position], strings) for row in rows))
+            table_header["columns"][column] = {
+                "kind": kind,
+                **add_section(values.tobytes()),
+            }
+        header["tables"][name] = table_header
+
+    for name, (model, order_by, _) in SNAPSHOT_TABLES.items():
+        columns = [c for c in model.__table__.columns if column_kind(c)]
+        # Core-запрос: строки без создания ORM-объектов
+        rows = session.execute(select(*columns).order_by(*order_by)).all()
+        add_table(name, {c.name: column_kind(c) for c in columns}, rows)
+    # границы веса по городам считает база одним GROUP BY
+    envelopes = DeliveryPointRepository(session).get_weight_envelopes()
+    add_table(
+        "weight_envelopes",
+        {"city_code": "q", "weight_min": "d", "weight_max": "d"},
+        sorted((code, low, high) for code, (low, high) in envelopes.items()),
+    )
+    header["strings"] = {
+        "offsets": add_section(strings._offsets.tobytes()),  # pylint: disable=protected-access
+        "blob": add_section(bytes(strings._blob)),  # pylint: disable=protected-access
+    }
+
+    header_bytes = json.dumps(header).encode()
+    data_start = len(MAGIC) + 8 + len(header_bytes)
+    data_start += -data_start % ALIGN
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(header_bytes)))
+        file.write(header_bytes)
+        file.write(b"\0" * (data_start - file.tell()))
+        for section in sections:
+            file.write(section)
+    # читатели других процессов не увидят файл наполовину записанным
+    os.replace(tmp_path, path)
+
+
+class SnapshotRecord:
+    """Строка снимка с доступом к колонкам как к атрибутам ORM-модели"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "SnapshotTable", index: int) -> None:
+        self._table = table
+        self._index = index
+
+    def __getattr__(self, name: str):
+        try:
+            return self._table.value(name, self._index)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, SnapshotRecord)
+            and self._table is other._table
+            and self._index == other._index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self._table), self._index))
+
+    def __repr__(self) -> str:
+        return f"SnapshotRecord({self._table.name}, {self._index})"
+
+    def to_dict(self) -> dict:
+        return {
+            name: self._table.raw_value(name, self._index)
+            for name in self._table.columns
+        }
+
+
+class SnapshotTable(Sequence):
+    def __init__(
+        self,
+        name: str,
+        rows: int,
+        columns: Dict[str, memoryview],
+        kinds: Dict[str, str],
+        strings: Callable[[int], str | None],
+        converters: Dict[str, Callable],
+    ) -> None:
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.kinds = kinds
+        self._string = strings
+        self._converters = converters
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SnapshotRecord(self, i) for i in range(*index.indices(self.rows))]
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        return SnapshotRecord(self, index)
+
+    def raw_value(self, name: str, index: int):
+        value = self.columns[name][index]
+        kind = self.kinds[name]
+        if kind == "i":
+            return self._string(value)
+        if kind == "q":
+            return None if value == INT_NULL else value
+        if kind == "d":
+            return None if math.isnan(value) else value
+        return None if value == BOOL_NULL else bool(value)
+
+    def value(self, name: str, index: int):
+        value = self.raw_value(name, index)
+        converter = self._converters.get(name)
+        if converter is not None and value is not None:
+            return converter(value)
+        return value
+
+    def equal_range(self, name: str, value) -> range:
+        """Диапазон строк с value в колонке, по которой таблица отсортирована"""
+        column = self.columns[name]
+        return range(bisect_left(column, value), bisect_right(column, value))
+
+
+class WeightEnvelopeMap(Mapping):
+    """city_code -> (weight_min, weight_max): бинарный поиск по колонке city_code"""
+
+    def __init__(self, table: SnapshotTable) -> None:
+        self._table = table
+
+    def __getitem__(self, city_code: int) -> Tuple[float | None, float | None]:
+        rows = self._table.equal_range("city_code", city_code)
+        if not rows:
+            raise KeyError(city_code)
+        return (
+            self._table.raw_value("weight_min", rows.start),
+            self._table.raw_value("weight_max", rows.start),
+        )
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._table.columns["city_code"])
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+class ReferenceSnapshot:
+    """Справочные данные из memory-mapped файла, без ORM-объектов"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a reference snapshot")
+        (header_size,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start : header_start + header_size])
+        self.marker = header.get("marker")
+        data_start = header_start + header_size
+        self._data_start = data_start + (-data_start % ALIGN)
+        self._view = memoryview(self._mmap)
+
+        self._string_offsets = self._section(header["strings"]["offsets"], "Q")
+        self._string_blob = self._section(header["strings"]["blob"], "B")
+        self.tables: Dict[str, SnapshotTable] = {}
+        for name, table_header in header["tables"].items():
+            columns = {}
+            kinds = {}
+            for column_name, column in table_header["columns"].items():
+                kinds[column_name] = column["kind"]
+                columns[column_name] = self._section(column, column["kind"])
+            self.tables[name] = SnapshotTable(
+                name,
+                table_header["rows"],
+                columns,
+                kinds,
+                self.string,
+                SNAPSHOT_TABLES[name][2] if name in SNAPSHOT_TABLES else {},
+            )
+
+    @classmethod
+    def open(cls, path: Path) -> "ReferenceSnapshot | None":
+        if not Path(path).exists():
+            return None
+        return cls(path)
+
+    def _section(self, section: dict, kind: str) -> memoryview:
+        start = self._data_start + section["offset"]
+        return self._view[start : start + section["nbytes"]].cast(kind)
+
+    def string(self, string_id: int) -> str | None:
+        if string_id == STRING_NULL:
+            return None
+        start = self._string_offsets[string_id]
+        end = self._string_offsets[string_id + 1]
+        return str(self._string_blob[start:end], "utf-8")
+
+    @property
+    def cities(self) -> SnapshotTable:
+        return self.tables["cities"]
+
+    @property
+    def delivery_points(self) -> SnapshotTable:
+        return self.tables["delivery_points"]
+
+    @property
+    def delivery_modes(self) -> SnapshotTable:
+        return self.tables["delivery_modes"]
+
+    @property
+    def weight_envelopes(self) -> WeightEnvelopeMap:
+        return WeightEnvelopeMap(self.tables["weight_envelopes"])
+
+    def city_points(self, city_code: int) -> List[SnapshotRecord]:
+        points = self.delivery_points
+        return [points[i] for i in points.equal_range("city_code", city_code)]
@@ -0,0 +1,245 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, TypeVar
+import pytest
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from yarl import URL
+
+from tests.api.api_urls import ApiUrls
+from tests.api.cassettes import CassetteAdapter, CassetteStore
+from tests.api.coordination import state_dir
+from tests.api.constants import (
+    ASYNC_CONCURRENCY,
+    CONNECT_TIMEOUT_S,
+    DEFAULT_REQUEST_TIMEOUT_S,
+    ENDPOINT_TIMEOUTS_S,
+    HTTP_CACHE_TTLS_S,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    RATE_LIMIT_GROUPS,
+    RATE_LIMITS,
+    RETRY_POLICIES,
+)
+from tests.api.circuit_breaker import CircuitBreakers
+from tests.api.http_cache import CachingAdapter, HttpCacheStore
+from tests.api.rate_limit import RateLimit, RateLimiter, RateLimitingAdapter
+from tests.api.retries import RetryBudget, RetryingAdapter, RetryPolicy
+
+T = TypeVar("T")
+
+
+def endpoint_path(url, base_url: URL) -> str:
+    """Путь эндпоинта относительно base_url: "v2/location/cities" """
+    path = URL(str(url)).path
+    base_path = base_url.path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path) :]
+    return path.strip("/")
+
+
+def match_endpoint(path: str, table: Dict[str, T], default: T) -> T:
+    """Значение для самого длинного префикса пути из table"""
+    prefixes = [prefix for prefix in table if path.startswith(prefix)]
+    if not prefixes:
+        return default
+    return table[max(prefixes, key=len)]
+
+
+class ApiClient:
+    """Общий на процесс клиент СДЕК API поверх requests.Session.
+
+    Соединения переиспользуются через пул HTTPAdapter, заголовок авторизации
+    и таймауты по эндпоинтам подставляются автоматически.
+    """
+
+    def __init__(
+        self,
+        base_url: URL,
+        session: requests.Session | None = None,
+        auth: Callable[[], Dict[str, str]] | None = None,
+        adapter: BaseAdapter | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.endpoints = ApiUrls(base_url)
+        self.session = session or self._create_session(adapter)
+        self.auth = auth
+
+    @staticmethod
+    def _create_session(adapter: BaseAdapter | None = None) -> requests.Session:
+        session = requests.Session()
+        if adapter is None:
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+            )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def with_auth(self, auth: Callable[[], Dict[str, str]]) -> "ApiClient":
+        """Клиент с авторизацией на том же пуле соединений"""
+        return ApiClient(self.base_url, self.session, auth)
+
+    def timeout(self, url) -> tuple:
+        read_timeout = match_endpoint(
+            endpoint_path(url, self.base_url),
+            ENDPOINT_TIMEOUTS_S,
+            DEFAULT_REQUEST_TIMEOUT_S,
+        )
+        return (CONNECT_TIMEOUT_S, read_timeout)
+
+    def request(self, method: str, url, **kwargs) -> requests.Response:
+        headers = kwargs.pop("headers", None) or {}
+        if self.auth is not None:
+            headers = {**self.auth(), **headers}
+        kwargs.setdefault("timeout", self.timeout(url))
+        return self.session.request(method, str(url), headers=headers, **kwargs)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncApiClient:
+    """asyncio-интерфейс к ApiClient.
+
+    Запросы выполняются в пуле из concurrency потоков поверх того же
+    requests.Session, поэтому пул соединений, авторизация и таймауты общие
+    с синхронным клиентом, а в полёте одновременно до concurrency запросов.
+    """
+
+    def __init__(self, client: ApiClient, concurrency: int = ASYNC_CONCURRENCY) -> None:
+        self.client = client
+        self.endpoints = client.endpoints
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="async-api"
+        )
+
+    async def request(self, method: str, url, **kwargs) -> requests.Response:
+        if self.client.auth is not None:
+            # первый вызов auth читает токен через сессию SQLAlchemy, а она
+            # не потокобезопасна - берём заголовок в потоке event loop
+            kwargs["headers"] = {**self.client.auth(), **(kwargs.get("headers") or {})}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self.client.request, method, url, **kwargs)
+        )
+
+    async def get(self, url, **kwargs) -> requests.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs) -> requests.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url, **kwargs) -> requests.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url, **kwargs) -> requests.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+http_client_key = pytest.StashKey[ApiClient]()
+
+
+HTTP_CACHE_FILE = "responses.sqlite3"
+RATE_LIMIT_DIR = "rate-limit"
+RETRIES_DIR = "retries"
+RETRY_BUDGET_FILE = "budget.state"
+
+
+def get_rate_limiter(config: pytest.Config, base_url: URL) -> RateLimiter | None:
+    """Лимиты запросов из RATE_LIMITS с учётом --rate-limit, None при --no-rate-limit"""
+    if config.getoption("no_rate_limit", True):
+        return None
+    limits = {group: RateLimit(*limit) for group, limit in RATE_LIMITS.items()}
+    limits.update(config.getoption("rate_limit") or [])
+    # файлы в кэше pytest общие для всех воркеров xdist
+    return RateLimiter(
+        state_dir(config, RATE_LIMIT_DIR),
+        limits,
+        lambda url: match_endpoint(endpoint_path(url, base_url), RATE_LIMIT_GROUPS, None),
+    )
+
+
+def endpoint_prefix(base_url: URL, prefixes) -> Callable[[str], str | None]:
+    """url -> самый длинный подходящий префикс из prefixes или None"""
+    table = {prefix: prefix for prefix in prefixes}
+    return lambda url: match_endpoint(endpoint_path(url, base_url), table, None)
+
+
+def get_circuit_breakers(config: pytest.Config, base_url: URL) -> CircuitBreakers | None:
+    """Размыкатели эндпоинтов RETRY_POLICIES, None при --no-circuit-breaker"""
+    if config.getoption("no_circuit_breaker", True):
+        return None
+    return CircuitBreakers(
+        state_dir(config, RETRIES_DIR), RETRY_POLICIES, endpoint_prefix(base_url, RETRY_POLICIES)
+    )
+
+
+def get_retry_budget(config: pytest.Config) -> RetryBudget:
+    return RetryBudget(state_dir(config, RETRIES_DIR) / RETRY_BUDGET_FILE)
+
+
+def create_adapter(config: pytest.Config, base_url: URL) -> BaseAdapter:
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE
+    )
+    # лимит и повторы оборачивают только сетевой транспорт: ответы из
+    # кассеты их не тратят, а промахи replay размыкатель не считает сбоями
+    rate_limiter = get_rate_limiter(config, base_url)
+    if rate_limiter is not None:
+        adapter = RateLimitingAdapter(rate_limiter, adapter)
+    policies = {prefix: RetryPolicy(*policy) for prefix, policy in RETRY_POLICIES.items()}
+    if config.getoption("no_retries", True):
+        policies = {prefix: policy._replace(attempts=1) for prefix, policy in policies.items()}
+    adapter = RetryingAdapter(
+        adapter,
+        policies,
+        endpoint_prefix(base_url, policies),
+        get_retry_budget(config),
+        get_circuit_breakers(config, base_url),
+    )
+    cassette_mode = config.getoption("cassette_mode", "off")
+    if cassette_mode != "off":
+        adapter = CassetteAdapter(
+            CassetteStore(config.getoption("cassette_path")), cassette_mode, adapter
+        )
+    if config.getoption("http_cache", False):
+        # файл в кэше pytest общий для всех воркеров xdist
+        store = HttpCacheStore(
+            state_dir(config, "http-cache") / HTTP_CACHE_FILE,
+            config.getoption("http_cache_max_mb") * 1024 * 1024,
+        )
+        adapter = CachingAdapter(
+            store,
+            adapter,
+            lambda url: match_endpoint(endpoint_path(url, base_url), HTTP_CACHE_TTLS_S, None),
+        )
+    return adapter
+
+
+def get_http_client(config: pytest.Config) -> ApiClient:
+    """Один клиент без авторизации на процесс pytest (на воркер под xdist)"""
+    client = config.stash.get(http_client_key, None)
+    if client is None:
+        base_url = URL(os.getenv("API_BASE_URL"))
+        client = ApiClient(base_url, adapter=create_adapter(config, base_url))
+        config.stash[http_client_key] = client
+    return client
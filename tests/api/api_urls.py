@@ -43,3 +43,9 @@ class ApiUrls:
 
     def order(self, uuid):
         return self.base_url / f"v2/orders/{uuid}"
+
+    def webhooks(self):
+        return self.base_url / "v2/webhooks"
+
+    def webhook(self, uuid):
+        return self.base_url / f"v2/webhooks/{uuid}"
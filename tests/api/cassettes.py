@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+from requests.adapters import BaseAdapter
+
+from tests.api.response_store import dump_response, load_response, open_sqlite
+
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+# не пишем секреты в кассету и не зависим от них в ключе
+SECRET_PARAMS = {"client_id", "client_secret"}
+
+
+class CassetteMissError(requests.ConnectionError):
+    """В режиме replay для запроса нет записанного ответа"""
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in SECRET_PARAMS
+    )
+    return f"{parts.path}?{urlencode(query)}" if query else parts.path
+
+
+def body_hash(body) -> str:
+    if body is None:
+        body = b""
+    if isinstance(body, str):
+        body = body.encode()
+    try:
+        # порядок ключей и пробелы в JSON на ключ не влияют
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode()
+    except ValueError:
+        pass
+    return hashlib.sha256(body).hexdigest()
+
+
+def interaction_key(request: requests.PreparedRequest) -> str:
+    return hashlib.sha256(
+        f"{request.method} {normalize_url(request.url)} {body_hash(request.body)}".encode()
+    ).hexdigest()
+
+
+class CassetteStore:
+    """Записанные ответы API в sqlite: ключ запроса + порядковый номер -> сжатый ответ"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._connection = open_sqlite(self.path)
+        self._lock = threading.Lock()
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS interactions (
+                key TEXT NOT NULL,
+                ordinal INTEGER NOT NULL,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                PRIMARY KEY (key, ordinal)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def get(
+        self, request: requests.PreparedRequest, key: str, ordinal: int, exact: bool = False
+    ):
+        # повторов может быть записано меньше, чем запросов при проигрывании
+        # (например, опрос статуса заказа) - тогда отдаём последний;
+        # с exact такой запрос считается промахом и уходит в сеть
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, reason, headers, body FROM interactions "
+                "WHERE key = ? AND ordinal <= ? AND (? OR ordinal = ?) "
+                "ORDER BY ordinal DESC LIMIT 1",
+                (key, ordinal, not exact, ordinal),
+            ).fetchone()
+        if row is None:
+            return None
+        return load_response(request, *row)
+
+    def put(self, key: str, ordinal: int, response: requests.Response) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    ordinal,
+                    response.request.method,
+                    normalize_url(response.request.url),
+                    *dump_response(response),
+                ),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class CassetteAdapter(BaseAdapter):
+    """Транспорт requests, который пишет ответы в кассету или отдаёт их из неё.
+
+    В сеть запросы уходят через transport: при записи и при промахе в
+    режиме auto.
+    """
+
+    def __init__(self, store: CassetteStore, mode: str, transport: BaseAdapter) -> None:
+        super().__init__()
+        self.store = store
+        self.mode = mode
+        self.transport = transport
+        self._ordinals = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        key = interaction_key(request)
+        with self._lock:
+            ordinal = self._ordinals[key]
+            self._ordinals[key] += 1
+        if self.mode in ("replay", "auto"):
+            # в auto новый ответ на повторный запрос (опрос заказа) берётся из API,
+            # иначе заказ навсегда остался бы в первом записанном состоянии
+            response = self.store.get(request, key, ordinal, exact=self.mode == "auto")
+            if response is not None:
+                return response
+            if self.mode == "replay":
+                raise CassetteMissError(
+                    f"No recorded response for {request.method} {normalize_url(request.url)}",
+                    request=request,
+                )
+        response = self.transport.send(request, *args, **kwargs)
+        self.store.put(key, ordinal, response)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+        self.store.close()
@@ -0,0 +1,114 @@
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple
+import requests
+
+from tests.api.constants import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_S
+from tests.api.file_lock import SharedState
+
+CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "closed", OPEN: "open", HALF_OPEN: "half-open"}
+# state, failures, opened_until, trips, rejected
+BREAKER_STATE = struct.Struct("<qqdqq")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Размыкатель эндпоинта открыт: запрос не отправлялся"""
+
+
+class BreakerStats(NamedTuple):
+    state: str
+    failures: int
+    trips: int
+    rejected: int
+
+
+class SharedCircuitBreaker:
+    """Размыкатель эндпоинта, общий для воркеров xdist.
+
+    После threshold неудачных запросов подряд (5xx, таймауты, обрывы
+    соединения после всех повторов) от любых воркеров открывается на
+    open_s секунд: запросы не отправляются.
+    Затем пропускает один пробный запрос: успех закрывает размыкатель,
+    ошибка открывает его снова.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        open_s: float = CIRCUIT_OPEN_S,
+    ) -> None:
+        self.threshold = threshold
+        self.open_s = open_s
+        self.state = SharedState(path, BREAKER_STATE, [CLOSED, 0, 0.0, 0, 0])
+
+    def allow(self) -> bool:
+        def check(state: list) -> bool:
+            now = time.time()
+            if state[0] == CLOSED:
+                return True
+            if now < state[2]:
+                # открыт или пробный запрос ещё в полёте
+                state[4] += 1
+                return False
+            # пробный запрос; если он зависнет, через open_s будет следующий
+            state[0] = HALF_OPEN
+            state[2] = now + self.open_s
+            return True
+
+        return self.state.update(check)
+
+    def record(self, success: bool) -> None:
+        def change(state: list) -> None:
+            if success:
+                # поздний успех запроса, отправленного до открытия, не в счёт
+                if state[0] != OPEN:
+                    state[0], state[1] = CLOSED, 0
+                return
+            if state[0] == OPEN:
+                return
+            state[1] += 1
+            if state[0] == HALF_OPEN or state[1] >= self.threshold:
+                # trips считает и повторные открытия после неудачной пробы
+                state[3] += 1
+                state[0] = OPEN
+                state[2] = time.time() + self.open_s
+
+        self.state.update(change)
+
+    def stats(self) -> BreakerStats:
+        state = self.state.read()
+        return BreakerStats(STATE_NAMES[state[0]], state[1], state[3], state[4])
+
+
+class CircuitBreakers:
+    """Размыкатели эндпоинтов в каталоге, общем для воркеров"""
+
+    def __init__(
+        self,
+        directory: Path,
+        endpoints: Iterable[str],
+        endpoint: Callable[[str], str | None],
+    ) -> None:
+        # url -> префикс эндпоинта из endpoints или None
+        self.endpoint = endpoint
+        self.breakers = {
+            name: SharedCircuitBreaker(Path(directory) / f"{name.replace('/', '-')}.breaker")
+            for name in endpoints
+        }
+
+    def get(self, url: str) -> SharedCircuitBreaker | None:
+        return self.breakers.get(self.endpoint(url))
+
+    def reset(self) -> None:
+        for breaker in self.breakers.values():
+            breaker.state.reset()
+
+    def stats(self) -> Dict[str, BreakerStats]:
+        return {
+            name: breaker.stats()
+            for name, breaker in self.breakers.items()
+            if breaker.state.path.exists()
+        }
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+from typing import List, Set
+import pytest
+
+from tests.api.durations import test_family
+
+# файл со списком concurrent-тестов, который пишут воркеры xdist
+concurrent_families_key = pytest.StashKey[Path]()
+
+
+class FamilyBatching:
+    """Примесь к LoadScheduling: варианты concurrent-теста уходят одному воркеру.
+
+    Воркер запускает тела вариантов одной пачкой только из тестов, которые
+    ему уже прислали, поэтому вместе с тестом отправляются все ещё не
+    розданные варианты того же теста. Список таких тестов воркеры пишут в
+    файл после сбора, до того как планировщик начнёт раздачу.
+    """
+
+    def _concurrent_families(self) -> Set[str]:
+        families = getattr(self, "_families", None)
+        if families is None:
+            path = self.config.stash.get(concurrent_families_key, None)
+            try:
+                families = set(json.loads(path.read_bytes())) if path else set()
+            except (OSError, ValueError):
+                families = set()
+            self._families = families  # pylint: disable=attribute-defined-outside-init
+        return families
+
+    def _send_tests(self, node, num: int) -> None:
+        families = self._concurrent_families()
+        indices: List[int] = self.pending[:num]
+        wanted = {test_family(self.collection[index]) for index in indices} & families
+        if wanted:
+            indices += [
+                index
+                for index in self.pending[num:]
+                if test_family(self.collection[index]) in wanted
+            ]
+        if indices:
+            chosen = set(indices)
+            self.pending[:] = [index for index in self.pending if index not in chosen]
+            self.node2pending[node].extend(indices)
+            node.send_runtest_some(indices)
+
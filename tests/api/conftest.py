@@ -1,16 +1,11 @@
 # pylint: disable=redefined-outer-name
 # pyright: reportArgumentType=false
-import random
-from typing import List
 import pytest
-import requests
-
-from database.models import OrderModel
-
-from tests.api.constants import DEFAULT_REQUEST_TIMEOUT_S
 
 
 pytest_plugins = [
+    "fixtures.stand_in",
+    "fixtures.api_client",
     "fixtures.database",
     "fixtures.token_manager",
     "fixtures.data_generators",
@@ -18,67 +13,35 @@ pytest_plugins = [
     "fixtures.tariff_calculator",
     "fixtures.hooks",
     "fixtures.helpers",
+    "fixtures.warmup",
+    "fixtures.order_pool",
+    "fixtures.snapshot",
+    "fixtures.reference_sync",
+    "fixtures.concurrency",
+    "fixtures.scheduling",
 ]
 
 
 @pytest.fixture
-def get_order_uuid(
-    auth_header,
-    endpoints,
-    get_random_city,
-    get_tariff_code,
-    packages,
-    recipient,
-    sender,
-    order_repository,
-):
+def get_order_uuid(claim_order):
     def _get_order_uuid(city):
-        last_order_uuid = ""
-        orders: List[OrderModel] = order_repository.get_all_orders()
-        if orders:
-            last_order_uuid = orders[0].uuid
-        else:
-            from_location = get_random_city()
-            to_location = get_random_city()
-            tariff_code = get_tariff_code(from_location, to_location)
-            last_order_uuid = requests.post(
-                url=endpoints.orders(),
-                headers=auth_header,
-                json={
-                    "type": 1,
-                    "tariff_code": tariff_code,
-                    "from_location": from_location,
-                    "to_location": to_location,
-                    "packages": packages,
-                    "recipient": recipient,
-                    "sender": sender,
-                },
-                timeout=DEFAULT_REQUEST_TIMEOUT_S,
-            ).json()["entity"]["uuid"]
-        return last_order_uuid
+        # заказ из пула: создан заранее в фоне и возвращается в пул после теста
+        return claim_order().uuid
 
     return _get_order_uuid
 
 
 @pytest.fixture
-def get_order_state(auth_header, endpoints):
+def get_order_state(api_client, endpoints):
     def _get_order_state(uuid):
-        return requests.get(
-            url=endpoints.order(uuid),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
-        ).json()["requests"][0]["state"]
+        return api_client.get(url=endpoints.order(uuid)).json()["requests"][0]["state"]
 
     return _get_order_state
 
 
 @pytest.fixture
-def get_cdek_number(auth_header, endpoints):
+def get_cdek_number(api_client, endpoints):
     def _get_cdek_number(uuid):
-        return requests.get(
-            url=endpoints.order(uuid),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
-        ).json()["entity"]["cdek_number"]
+        return api_client.get(url=endpoints.order(uuid)).json()["entity"]["cdek_number"]
 
     return _get_cdek_number
@@ -2,3 +2,96 @@ DEFAULT_REQUEST_TIMEOUT_S = 100
 DEFAULT_WAIT_TIMEOUT_S = 10
 DEFAULT_WEIGHT_MIN_G = 10
 DEFAULT_WEIGHT_MAX_G = 200_000
+DELIVERY_POINTS_BATCH_SIZE = 500
+STREAM_CHUNK_SIZE = 64 * 1024
+CONNECT_TIMEOUT_S = 5
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 32
+# таймаут чтения по префиксу пути эндпоинта, для остальных DEFAULT_REQUEST_TIMEOUT_S
+ENDPOINT_TIMEOUTS_S = {
+    "v2/oauth": 15,
+    "v2/location": 30,
+    "v2/deliverypoints": DEFAULT_REQUEST_TIMEOUT_S,
+    "v2/calculator": 30,
+    "v2/international": 30,
+    "v2/orders": 30,
+    "v2/webhooks": 30,
+}
+ASYNC_CONCURRENCY = 16
+# время жизни закэшированных GET-ответов справочников (--http-cache)
+HTTP_CACHE_TTLS_S = {
+    "v2/location/regions": 24 * 60 * 60,
+    "v2/location/cities": 24 * 60 * 60,
+    "v2/calculator/alltariffs": 24 * 60 * 60,
+    "v2/deliverypoints": 6 * 60 * 60,
+}
+HTTP_CACHE_MAX_MB = 512
+# ответы больше не сохраняются, чтобы не раздувать кэш
+HTTP_CACHE_MAX_RESPONSE_MB = 16
+# не чаще раза в 6 часов, если не передан --force
+REFERENCE_SYNC_INTERVAL_S = 6 * 60 * 60
+# токен обновляется в фоне заранее, а за TOKEN_EXPIRY_MARGIN_S до истечения
+# уже не используется
+TOKEN_REFRESH_AHEAD_S = 5 * 60
+TOKEN_EXPIRY_MARGIN_S = 30
+TOKEN_RETRY_S = 10
+# пул заказов: свободных заказов на все воркеры, аренда заказа тестом
+ORDER_POOL_SIZE = 2
+ORDER_POLL_INTERVAL_S = 2
+ORDER_LEASE_S = 10 * 60
+ORDER_CLAIM_TIMEOUT_S = 120
+ORDER_CLAIM_POLL_S = 0.2
+# заказ, состояние которого процесс ещё не видел, перед выдачей проверяется у API
+ORDER_REVALIDATE_TIMEOUT_S = 10
+# опрос состояний заказов: задержка растёт от INITIAL до MAX, плюс jitter
+ORDER_POLL_INITIAL_S = 0.5
+ORDER_POLL_MAX_S = 10
+ORDER_POLL_CONCURRENCY = 8
+ORDER_WATCH_TIMEOUT_S = 15 * 60
+# оценки длительности тестов для планировщика --lpt
+DURATION_EWMA_ALPHA = 0.3
+DEFAULT_TEST_DURATION_S = 1.0
+# лимит запросов к API на все воркеры: группа эндпоинтов -> (запросов в секунду, burst)
+RATE_LIMIT_GROUPS = {
+    "v2/oauth": "oauth",
+    "v2/location": "location",
+    "v2/deliverypoints": "location",
+    "v2/calculator": "calculator",
+    "v2/international": "calculator",
+    "v2/orders": "orders",
+    "v2/webhooks": "orders",
+}
+RATE_LIMITS = {
+    "oauth": (2, 2),
+    "location": (20, 10),
+    "calculator": (10, 5),
+    "orders": (5, 5),
+}
+# после 429 скорость падает вдвое и восстанавливается за RECOVERY_S
+RATE_LIMIT_BACKOFF = 0.5
+RATE_LIMIT_RECOVERY_S = 30
+RATE_LIMIT_MIN_RPS = 0.5
+RATE_LIMIT_DEFAULT_RETRY_AFTER_S = 1
+RATE_LIMIT_RETRIES = 3
+# повторы запросов по префиксу пути: (попыток всего, пауза перед первым
+# повтором, POST без побочных эффектов - расчёты, токен - повторять можно)
+RETRY_POLICIES = {
+    "v2/oauth": (3, 0.5, True),
+    "v2/location": (3, 0.5, True),
+    "v2/deliverypoints": (2, 1, True),
+    "v2/calculator": (3, 0.5, True),
+    "v2/international": (3, 0.5, True),
+    "v2/orders": (3, 1, False),
+    "v2/webhooks": (2, 1, False),
+}
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_MAX_BACKOFF_S = 10
+# бюджет повторов на все воркеры: запас RETRY_BUDGET, пополняется на
+# RETRY_BUDGET_RATIO за каждый запрос
+RETRY_BUDGET = 20
+RETRY_BUDGET_RATIO = 0.1
+# после CIRCUIT_FAILURE_THRESHOLD неудачных запросов подряд (запрос со всеми
+# повторами - одна неудача) запросы к эндпоинту CIRCUIT_OPEN_S секунд сразу
+# падают, затем один пробный запрос
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_S = 30
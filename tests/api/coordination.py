@@ -0,0 +1,107 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+import pytest
+from sqlalchemy.orm import Session
+
+from tests.api.file_lock import FileLock, write_atomic
+
+# каталог в кэше pytest для блокировок и отметок общей загрузки
+SEED_DIR = "seed"
+
+state_root_key = pytest.StashKey[Path]()
+# префикс общего состояния запуска: прогон на стенде не делит его с настоящим API
+state_namespace_key = pytest.StashKey[str]()
+
+
+def is_xdist_worker() -> bool:
+    return "PYTEST_XDIST_WORKER" in os.environ
+
+
+def test_run_id() -> str:
+    """Общий для всех воркеров одного запуска pytest -n идентификатор"""
+    return os.getenv("PYTEST_XDIST_TESTRUNUID") or f"pid-{os.getpid()}"
+
+
+class RunOnce:
+    """Задача, которую за запуск выполняет один процесс из всех воркеров.
+
+    Первый взявший FileLock выполняет задачу и записывает отметку с id
+    запуска, остальные ждут на блокировке и задачу пропускают. Если задача
+    упала, отметки нет, и её выполнит следующий воркер.
+    """
+
+    def __init__(self, directory: Path, name: str) -> None:
+        self._lock = FileLock(Path(directory) / f"{name}.lock")
+        self._marker = Path(directory) / f"{name}.done"
+
+    def done(self) -> bool:
+        try:
+            return self._marker.read_text() == test_run_id()
+        except OSError:
+            return False
+
+    def run(self, task: Callable[[], None]) -> bool:
+        """True, если задачу выполнил этот процесс"""
+        if self.done():
+            return False
+        with self._lock:
+            if self.done():
+                return False
+            task()
+            write_atomic(self._marker, test_run_id().encode())
+        return True
+
+
+def state_root(config: pytest.Config) -> Path:
+    """Временный каталог запуска вместо кэша pytest при -p no:cacheprovider.
+
+    Его создаёт управляющий процесс и передаёт воркерам через workerinput.
+    """
+    root = config.stash.get(state_root_key, None)
+    if root is None:
+        workerinput = getattr(config, "workerinput", {})
+        if "state_root" in workerinput:
+            root = Path(workerinput["state_root"])
+        else:
+            root = Path(tempfile.mkdtemp(prefix="pytest-state-"))
+        config.stash[state_root_key] = root
+    return root
+
+
+def namespaced(config: pytest.Config, name: str) -> str:
+    namespace = config.stash.get(state_namespace_key, None)
+    return f"{namespace}-{name}" if namespace else name
+
+
+def state_dir(config: pytest.Config, name: str) -> Path:
+    """Каталог общего для воркеров xdist состояния: в кэше pytest, если он включён"""
+    name = namespaced(config, name)
+    cache = getattr(config, "cache", None)
+    if cache is not None:
+        return cache.mkdir(name)
+    path = state_root(config) / name
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def get_seed_dir(config: pytest.Config) -> Path | None:
+    """Каталог для RunOnce у воркеров xdist, без xdist координация не нужна"""
+    return state_dir(config, SEED_DIR) if is_xdist_worker() else None
+
+
+def seed(
+    seed_dir: Path | None,
+    name: str,
+    task: Callable[[], object],
+    session: Session | None = None,
+) -> None:
+    """Первая загрузка справочника name в базу; под xdist её делает один воркер"""
+    if seed_dir is None:
+        task()
+        return
+    RunOnce(seed_dir, name).run(task)
+    if session is not None:
+        # новая транзакция увидит строки, записанные другим воркером
+        session.commit()
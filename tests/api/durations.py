@@ -0,0 +1,89 @@
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import pytest
+
+from tests.api.constants import DEFAULT_TEST_DURATION_S, DURATION_EWMA_ALPHA
+from tests.api.file_lock import write_atomic
+
+DURATIONS_CACHE_KEY = "aqa/durations"
+
+
+def test_family(nodeid: str) -> str:
+    """Тест без параметров: "test_x.py::test_a[1]" -> "test_x.py::test_a" """
+    return nodeid.split("[", 1)[0]
+
+
+def lpt_makespan(durations: Iterable[float], workers: int) -> float:
+    """Makespan жадного LPT: самый длинный тест - самому свободному воркеру"""
+    loads = [0.0] * max(workers, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+class DurationStore:
+    """Длительности тестов прошлых запусков в кэше pytest.
+
+    На каждый nodeid хранится EWMA длительности (setup + call + teardown).
+    Для теста без истории оценка - средняя по его параметризациям, затем
+    средняя по всем тестам, затем DEFAULT_TEST_DURATION_S. С path вместо
+    кэша используется JSON-файл, общий для машин CI (--durations-file).
+    """
+
+    def __init__(
+        self,
+        cache: pytest.Cache,
+        alpha: float = DURATION_EWMA_ALPHA,
+        path: Path | None = None,
+        key: str = DURATIONS_CACHE_KEY,
+    ) -> None:
+        self.cache = cache
+        self.alpha = alpha
+        self.path = Path(path) if path else None
+        self.key = key
+        self.durations: Dict[str, float] = self._load()
+        self._families: Dict[str, List[float]] = {}
+        for nodeid, duration in self.durations.items():
+            self._add_to_family(nodeid, duration, 1)
+
+    def observe(self, nodeid: str, duration: float) -> None:
+        previous = self.durations.get(nodeid)
+        if previous is None:
+            value = duration
+        else:
+            self._add_to_family(nodeid, previous, -1)
+            value = self.alpha * duration + (1 - self.alpha) * previous
+        self.durations[nodeid] = value
+        self._add_to_family(nodeid, value, 1)
+
+    def estimate(self, nodeid: str) -> Tuple[float, str]:
+        """Оценка длительности и её источник: history, family, mean или default"""
+        if nodeid in self.durations:
+            return self.durations[nodeid], "history"
+        family = self._families.get(test_family(nodeid))
+        if family and family[1]:
+            return family[0] / family[1], "family"
+        if self.durations:
+            return sum(self.durations.values()) / len(self.durations), "mean"
+        return DEFAULT_TEST_DURATION_S, "default"
+
+    def save(self) -> None:
+        if self.path is None:
+            self.cache.set(self.key, self.durations)
+        else:
+            write_atomic(self.path, json.dumps(self.durations, indent=2, sort_keys=True).encode())
+
+    def _load(self) -> Dict[str, float]:
+        if self.path is None:
+            return self.cache.get(self.key, {})
+        try:
+            return json.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return {}
+
+    def _add_to_family(self, nodeid: str, duration: float, sign: int) -> None:
+        family = self._families.setdefault(test_family(nodeid), [0.0, 0])
+        family[0] += sign * duration
+        family[1] += sign
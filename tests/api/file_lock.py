@@ -0,0 +1,84 @@
+import fcntl
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class FileLock:
+    """Эксклюзивная блокировка через flock между процессами (воркерами xdist).
+
+    Каждый acquire открывает файл заново, поэтому блокировка исключает и
+    потоки одного процесса, но один объект нельзя захватывать из двух
+    потоков одновременно.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Читатели из других процессов видят либо старый файл, либо новый целиком"""
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+class SharedState:
+    """Несколько чисел в файле, общие для процессов: меняются под FileLock"""
+
+    def __init__(self, path: Path, layout: struct.Struct, initial: Sequence) -> None:
+        self.path = Path(path)
+        self.layout = layout
+        self.initial = list(initial)
+        # FileLock нельзя захватывать из двух потоков сразу
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self.path)
+
+    def update(self, change: Callable[[list], T]) -> T:
+        """change меняет список значений на месте, результат change возвращается"""
+        with self._lock, self._file_lock:
+            state = self.read()
+            result = change(state)
+            self.path.write_bytes(self.layout.pack(*state))
+        return result
+
+    def read(self) -> list:
+        try:
+            return list(self.layout.unpack(self.path.read_bytes()))
+        except (OSError, struct.error):
+            # файла ещё нет (или его создал FileLock и он пуст)
+            return list(self.initial)
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
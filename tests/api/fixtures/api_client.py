@@ -0,0 +1,172 @@
+# pylint: disable=redefined-outer-name
+import os
+import random
+import allure
+from faker import Faker
+import pytest
+from yarl import URL
+
+from tests.api.api_client import (
+    ApiClient,
+    get_circuit_breakers,
+    get_http_client,
+    get_rate_limiter,
+    get_retry_budget,
+    http_client_key,
+)
+from tests.api.cassettes import CASSETTE_MODES
+from tests.api.circuit_breaker import BreakerStats, CircuitBreakers
+from tests.api.constants import HTTP_CACHE_MAX_MB, RATE_LIMITS
+from tests.api.coordination import is_xdist_worker
+from tests.api.rate_limit import parse_rate_limit
+
+DEFAULT_CASSETTE_PATH = "tests/api/cassettes/cdek.sqlite3"
+
+circuit_breakers_key = pytest.StashKey[CircuitBreakers]()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--cassette-mode",
+        action="store",
+        default="off",
+        choices=CASSETTE_MODES,
+        help="Record API responses to cassette, replay them offline, "
+        "or replay with recording of misses (auto)",
+    )
+    parser.addoption(
+        "--cassette-path",
+        action="store",
+        default=DEFAULT_CASSETTE_PATH,
+        help="Cassette store file",
+    )
+    parser.addoption(
+        "--http-cache",
+        action="store_true",
+        default=False,
+        help="Cache GET responses of reference endpoints in pytest cache, "
+        "shared by xdist workers",
+    )
+    parser.addoption(
+        "--http-cache-max-mb",
+        action="store",
+        type=int,
+        default=HTTP_CACHE_MAX_MB,
+        help="HTTP cache size limit, least recently used responses are evicted",
+    )
+    parser.addoption(
+        "--rate-limit",
+        action="append",
+        type=parse_rate_limit,
+        default=[],
+        metavar="GROUP=RPS[:BURST]",
+        help=f"Request rate limit of endpoint group shared by xdist workers, "
+        f"groups: {', '.join(RATE_LIMITS)}",
+    )
+    parser.addoption(
+        "--no-rate-limit",
+        action="store_true",
+        default=False,
+        help="Send API requests without client-side rate limiting",
+    )
+    parser.addoption(
+        "--no-retries",
+        action="store_true",
+        default=False,
+        help="Do not retry failed API requests (5xx, timeouts, connection errors)",
+    )
+    parser.addoption(
+        "--no-circuit-breaker",
+        action="store_true",
+        default=False,
+        help="Keep sending requests to an endpoint after repeated failures",
+    )
+
+
+def pytest_configure(config):
+    base_url = URL(os.getenv("API_BASE_URL", ""))
+    breakers = get_circuit_breakers(config, base_url)
+    if breakers is not None:
+        config.stash[circuit_breakers_key] = breakers
+    if is_xdist_worker():
+        return
+    # до старта воркеров: запуск начинается с полными bucket'ами и бюджетом
+    # повторов, размыкатели закрыты
+    for shared in (get_rate_limiter(config, base_url), breakers, get_retry_budget(config)):
+        if shared is not None:
+            shared.reset()
+
+
+def format_breaker(endpoint: str, stats: BreakerStats) -> str:
+    return (
+        f"{endpoint}: {stats.state}, failures in a row: {stats.failures}, "
+        f"opened: {stats.trips}, requests failed fast: {stats.rejected}"
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    # случайные данные запросов должны совпадать при записи и проигрывании,
+    # поэтому зерно зависит только от теста, а не от порядка запуска
+    if item.config.getoption("cassette_mode") != "off":
+        random.seed(item.nodeid)
+        Faker.seed(item.nodeid)
+
+
+def pytest_runtest_teardown(item):
+    breakers = item.config.stash.get(circuit_breakers_key, None)
+    if breakers is None:
+        return
+    # тест, запущенный при открытом размыкателе, мог упасть из-за него
+    not_closed = [
+        format_breaker(endpoint, stats)
+        for endpoint, stats in breakers.stats().items()
+        if stats.state != "closed"
+    ]
+    if not_closed:
+        allure.attach(
+            "\n".join(not_closed),
+            name="Circuit breakers",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    rate_limiter = get_rate_limiter(config, URL(os.getenv("API_BASE_URL", "")))
+    stats = rate_limiter.stats() if rate_limiter is not None else {}
+    if stats:
+        terminalreporter.write_sep("-", "API rate limit")
+        for group, group_stats in stats.items():
+            terminalreporter.write_line(
+                f"{group}: {group_stats.requests} requests, waited {group_stats.waited_s:.2f}s, "
+                f"429: {group_stats.throttled}, rate {group_stats.rate:.1f}/s"
+            )
+    retries, denied = get_retry_budget(config).stats()
+    breakers = config.stash.get(circuit_breakers_key, None)
+    troubled = {
+        endpoint: breaker_stats
+        for endpoint, breaker_stats in (breakers.stats() if breakers is not None else {}).items()
+        if breaker_stats.trips or breaker_stats.failures
+    }
+    if retries or denied or troubled:
+        terminalreporter.write_sep("-", "API retries and circuit breakers")
+        terminalreporter.write_line(f"retries: {retries}, denied by retry budget: {denied}")
+        for endpoint, breaker_stats in troubled.items():
+            terminalreporter.write_line(format_breaker(endpoint, breaker_stats))
+
+
+def pytest_unconfigure(config):
+    client = config.stash.get(http_client_key, None)
+    if client is not None:
+        client.close()
+
+
+@pytest.fixture(scope="session")
+def http_client(pytestconfig: pytest.Config) -> ApiClient:
+    return get_http_client(pytestconfig)
+
+
+@pytest.fixture(scope="session")
+def api_client(http_client: ApiClient, token_manager) -> ApiClient:
+    # заголовок берётся при каждом запросе: токен мог обновиться
+    return http_client.with_auth(lambda: token_manager.auth_header)
@@ -0,0 +1,208 @@
+# pylint: disable=redefined-outer-name
+import asyncio
+import inspect
+import json
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List
+import pytest
+from _pytest.skipping import evaluate_skip_marks, evaluate_xfail_marks
+
+from tests.api.api_client import AsyncApiClient
+from tests.api.concurrent_scheduling import concurrent_families_key
+from tests.api.constants import ASYNC_CONCURRENCY
+from tests.api.coordination import is_xdist_worker, state_dir
+from tests.api.durations import test_family
+from tests.api.file_lock import write_atomic
+
+CONCURRENCY_DIR = "concurrency"
+# nodeid -> исключение теста или None, если тело теста прошло
+concurrent_results_key = pytest.StashKey[Dict[str, BaseException | None]]()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--async-concurrency",
+        action="store",
+        type=int,
+        default=ASYNC_CONCURRENCY,
+        help="Max number of async test bodies and API requests in flight per worker",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "concurrent: run bodies of async parametrized variants of the test together "
+        "on one event loop. Allure steps of the batch are recorded on the first variant",
+    )
+    config.stash[concurrent_results_key] = {}
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # воркеры сообщают планировщику, какие тесты раздавать вместе
+    path = node.config.stash.get(concurrent_families_key, None)
+    if path is None:
+        path = state_dir(node.config, CONCURRENCY_DIR) / f"{uuid.uuid4().hex}.json"
+        node.config.stash[concurrent_families_key] = path
+    node.workerinput["concurrent_families"] = str(path)
+
+
+@pytest.hookimpl(tryfirst=True, optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    # --lpt раздаёт concurrent-тесты так же, см. FamilyBatching
+    if config.getvalue("dist") != "load" or config.getoption("lpt", False):
+        return None
+    # xdist нужен только здесь, без него плагин должен загружаться
+    # pylint: disable-next=import-outside-toplevel
+    from tests.api.lpt_scheduling import ConcurrentLoadScheduling
+
+    return ConcurrentLoadScheduling(config, log)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    path = getattr(config, "workerinput", {}).get("concurrent_families")
+    if path is None:
+        return
+    families = sorted({test_family(item.nodeid) for item in items if _is_batchable(item)})
+    write_atomic(Path(path), json.dumps(families).encode())
+
+
+def pytest_unconfigure(config):
+    path = config.stash.get(concurrent_families_key, None)
+    if path is not None and not is_xdist_worker():
+        path.unlink(missing_ok=True)
+
+
+@pytest.fixture(scope="session")
+def async_api_client(api_client, pytestconfig: pytest.Config):
+    client = AsyncApiClient(api_client, pytestconfig.getoption("async_concurrency"))
+
+    yield client
+
+    client.close()
+
+
+def _fixture_is_shared(item: pytest.Function, argname: str) -> bool:
+    """Значение аргумента можно взять у другого варианта того же теста"""
+    fixturedef = item._fixtureinfo.name2fixturedefs[argname][-1]  # pylint: disable=protected-access
+    if fixturedef.func.__name__ == "get_direct_param_fixture_func":
+        return True
+    callspec = getattr(item, "callspec", None)
+    if callspec is not None and argname in callspec.params:
+        return False
+    return fixturedef.scope != "function"
+
+
+def _is_batchable(item: pytest.Item) -> bool:
+    return (
+        isinstance(item, pytest.Function)
+        and item.get_closest_marker("concurrent") is not None
+        and inspect.iscoroutinefunction(item.obj)
+        and all(
+            argname == "request" or _fixture_is_shared(item, argname)
+            for argname in item._fixtureinfo.argnames  # pylint: disable=protected-access
+        )
+    )
+
+
+def _runs_body(item: pytest.Item) -> bool:
+    """Тело варианта выполнится: его skip/xfail(run=False) не сработали"""
+    if evaluate_skip_marks(item) is not None:
+        return False
+    xfailed = evaluate_xfail_marks(item)
+    return xfailed is None or xfailed.run
+
+
+def _queued_items(item: pytest.Function) -> Iterator[pytest.Item]:
+    """Тесты после item, которые запустит этот процесс.
+
+    Воркер xdist собирает все тесты, а запускает только присланные
+    планировщиком: следующий и очередь WorkerInteractor.
+    """
+    if not hasattr(item.config, "workerinput"):
+        items = item.session.items
+        yield from items[items.index(item) + 1 :]
+        return
+    # WorkerInteractor xdist: его модуль исполняется через execnet и не
+    # импортируется как xdist.remote, поэтому ищем по атрибутам
+    interactor = next(
+        plugin
+        for plugin in item.config.pluginmanager.get_plugins()
+        if hasattr(plugin, "torun") and hasattr(plugin, "nextitem_index")
+    )
+    # torun и nextitem_index - внутреннее состояние xdist, очередь читается под её блокировкой
+    with interactor.torun.lock() as queue:
+        indices = [interactor.nextitem_index, *queue]
+    items = item.session.items
+    yield from (items[index] for index in indices if isinstance(index, int))
+
+
+def _collect_batch(item: pytest.Function) -> List[pytest.Function]:
+    """Ещё не запущенные варианты того же параметризованного теста"""
+    batch = [item]
+    if not _is_batchable(item):
+        return batch
+    results = item.config.stash[concurrent_results_key]
+    for other in _queued_items(item):
+        if (
+            other.parent is item.parent
+            and getattr(other, "originalname", None) == item.originalname
+            and other.nodeid not in results
+            and _is_batchable(other)
+            and _runs_body(other)
+        ):
+            batch.append(other)
+    return batch
+
+
+def _kwargs(item: pytest.Function, first: pytest.Function) -> dict:
+    callspec = getattr(item, "callspec", None)
+    params = callspec.params if callspec is not None else {}
+    kwargs = {}
+    for argname in item._fixtureinfo.argnames:  # pylint: disable=protected-access
+        if argname == "request":
+            kwargs[argname] = item._request  # pylint: disable=protected-access
+        elif argname in params:
+            kwargs[argname] = params[argname]
+        else:
+            # session/module-фикстуры у вариантов одного теста общие
+            kwargs[argname] = first.funcargs[argname]
+    return kwargs
+
+
+async def _run_batch(batch: List[pytest.Function], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: pytest.Function):
+        async with semaphore:
+            try:
+                await item.obj(**_kwargs(item, batch[0]))
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                # pytest.skip/xfail/fail - тоже BaseException
+                return exc
+            return None
+
+    outcomes = await asyncio.gather(*(run(item) for item in batch))
+    return {item.nodeid: outcome for item, outcome in zip(batch, outcomes)}
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: pytest.Function):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    results = pyfuncitem.config.stash[concurrent_results_key]
+    if pyfuncitem.nodeid not in results:
+        # первый вариант запускает тела всех вариантов, остальные
+        # при своём вызове только забирают готовый результат
+        batch = _collect_batch(pyfuncitem)
+        concurrency = pyfuncitem.config.getoption("async_concurrency")
+        results.update(asyncio.run(_run_batch(batch, concurrency)))
+    outcome = results.pop(pyfuncitem.nodeid)
+    if outcome is not None:
+        raise outcome
+    return True
@@ -18,8 +18,7 @@ def city():
     return random.choice(list(City)).value
 
 
-@pytest.fixture
-def payment() -> dict:
+def make_payment() -> dict:
     value = fake.pyfloat(left_digits=7, right_digits=2, min_value=0)
     if value:
         vat_rate = random.choice([0, 5, 7, 10, 12, 20])
@@ -30,25 +29,86 @@ def payment() -> dict:
     return payment
 
 
+def make_items(weight: int, payment: dict) -> list:
+    max_item_weight = int(weight / 100)
+    item_list = []
+    item_count = fake.pyint(min_value=1, max_value=10)
+    for item_id in range(item_count):
+        item = {
+                "name": fake.bothify("Item ##??"),
+                "amount": fake.pyint(min_value=1, max_value=10),
+                "item_id": str(item_id),
+                "feacn_code": str(fake.random_number(digits=10, fix_len=True)),
+                "ware_key": str(fake.random_number(digits=fake.pyint(min_value=6, max_value=12), fix_len=True)),
+                "payment": payment,
+                "cost": payment["value"],
+                "weight": fake.pyint(min_value=DEFAULT_WEIGHT_MIN_G, max_value=max_item_weight, step=10),
+            }
+        item_list.append(item)
+    return item_list
+
+
+def make_packages(weight: int, item_list: list) -> list:
+    package_list = []
+    package_count = fake.pyint(min_value=1, max_value=10)
+    for number in range(package_count):
+        package = {
+            "number": str(number),
+            "weight": weight,
+            "length": 30,
+            "width": 50,
+            "height": 20,
+            "package_id": 1,
+            "comment": "For lovely user",
+            "items": item_list,
+        }
+        package_list.append(package)
+    return package_list
+
+
+def make_recipient() -> dict:
+    return {
+        "name": "Vov Swan",
+        "phones": [{"number": "88005553535"}],
+    }
+
+
+def make_sender() -> dict:
+    return {
+        "name": "Swan Vov",
+        "company": "ООО Рога и Копыта",
+        "phones": [{"number": "88005553535"}],
+    }
+
+
+def make_location(city: CityModel) -> dict:
+    return {"code": city.code, "city": city.city, "address": fake.street_address()}
+
+
+def make_order(
+    from_city: CityModel, to_city: CityModel, tariff_code: int, weight: int
+) -> dict:
+    """Тело POST /v2/orders; функции без фикстур нужны пулу заказов в фоновом потоке"""
+    return {
+        "type": 1,
+        "tariff_code": tariff_code,
+        "from_location": make_location(from_city),
+        "to_location": make_location(to_city),
+        "packages": make_packages(weight, make_items(weight, make_payment())),
+        "recipient": make_recipient(),
+        "sender": make_sender(),
+    }
+
+
+@pytest.fixture
+def payment() -> dict:
+    return make_payment()
+
+
 @pytest.fixture
 def items(payment):
     def _items(weight):
-        max_item_weight = int(weight / 100)
-        item_list = []
-        item_count = fake.pyint(min_value=1, max_value=10)
-        for item_id in range(item_count):
-            item = {
-                    "name": fake.bothify("Item ##??"),
-                    "amount": fake.pyint(min_value=1, max_value=10),
-                    "item_id": str(item_id),
-                    "feacn_code": str(fake.random_number(digits=10, fix_len=True)),
-                    "ware_key": str(fake.random_number(digits=fake.pyint(min_value=6, max_value=12), fix_len=True)),
-                    "payment": payment,
-                    "cost": payment["value"],
-                    "weight": fake.pyint(min_value=DEFAULT_WEIGHT_MIN_G, max_value=max_item_weight, step=10),
-                }
-            item_list.append(item)
-        return item_list
+        return make_items(weight, payment)
     return _items
 
 
@@ -56,22 +116,7 @@ def items(payment):
 def packages(packages_weight, items):
     def _packages(city_from: CityModel, city_to: CityModel):
         weight = packages_weight(city_from, city_to)
-        item_list = items(weight)
-        package_list = []
-        package_count = fake.pyint(min_value=1, max_value=10)
-        for number in range(package_count):
-            package = {
-                "number": str(number),
-                "weight": weight,
-                "length": 30,
-                "width": 50,
-                "height": 20,
-                "package_id": 1,
-                "comment": "For lovely user",
-                "items": item_list,
-            }
-            package_list.append(package)
-        return package_list
+        return make_packages(weight, items(weight))
     return _packages
 
     return [
@@ -101,16 +146,9 @@ def packages(packages_weight, items):
 
 @pytest.fixture
 def recipient():
-    return {
-        "name": "Vov Swan",
-        "phones": [{"number": "88005553535"}],
-    }
+    return make_recipient()
 
 
 @pytest.fixture
 def sender():
-    return {
-        "name": "Swan Vov",
-        "company": "ООО Рога и Копыта",
-        "phones": [{"number": "88005553535"}],
-    }
+    return make_sender()
@@ -1,6 +1,7 @@
 # pylint: disable=redefined-outer-name
 import pytest
-from database.db_session import ScopedSession, engine
+import database.db_session
+from database.db_session import ScopedSession
 from database.repository import (
     CityRepository,
     DeliveryModeRepository,
@@ -13,7 +14,8 @@ from database.repository import (
 
 @pytest.fixture(scope="session")
 def db_session():
-    connection = engine.connect()
+    # engine мог быть заменён после импорта: bind_engine() для --stand-in
+    connection = database.db_session.engine.connect()
     session = ScopedSession(bind=connection)
 
     yield session
@@ -1,9 +1,11 @@
 # pylint: disable=redefined-outer-name
-from typing import List
+from itertools import permutations
+from typing import Dict, Iterator, List, Mapping, Tuple
 from faker import Faker
 import pytest
 from database.models import CityModel, DeliveryPointModel
 from tests.api.constants import DEFAULT_WEIGHT_MAX_G, DEFAULT_WEIGHT_MIN_G
+from tests.api.fixtures.location_manager import LocationManager
 
 fake = Faker("ru_RU")
 
@@ -20,14 +22,75 @@ def get_city_weight_range(points: List[DeliveryPointModel]):
     max_weight = min(max_weight_list) if max_weight_list else DEFAULT_WEIGHT_MAX_G
     return (min_weight, max_weight)
 
+
+def envelope_to_weight_range(weight_min, weight_max) -> Tuple[int, int]:
+    """То же, что get_city_weight_range, но по уже агрегированным weight_min/weight_max"""
+    min_weight = int(weight_min) * 1000 if weight_min else DEFAULT_WEIGHT_MIN_G
+    max_weight = int(weight_max) * 1000 if weight_max else DEFAULT_WEIGHT_MAX_G
+    return (min_weight, max_weight)
+
+
+class WeightEnvelopes:
+    """Диапазоны веса отправления (г) по городам, посчитанные один раз на сессию"""
+
+    def __init__(
+        self,
+        location_manager: LocationManager,
+        envelopes: Mapping[int, Tuple[float | None, float | None]],
+    ) -> None:
+        self.location_manager = location_manager
+        self._envelopes = envelopes
+        self._weight_ranges: Dict[int, Tuple[int, int]] = {}
+
+    def get(self, city: CityModel) -> Tuple[int, int]:
+        weight_range = self._weight_ranges.get(city.code)
+        if weight_range is None:
+            envelope = self._envelopes.get(city.code)
+            if envelope is None:
+                # офисы города ещё не загружены: загружаем и считаем один раз
+                points = self.location_manager.find_city_points(city)
+                weight_range = get_city_weight_range(points)
+            else:
+                weight_range = envelope_to_weight_range(*envelope)
+            self._weight_ranges[city.code] = weight_range
+        return weight_range
+
+    def get_route_range(self, from_city: CityModel, to_city: CityModel) -> Tuple[int, int]:
+        from_min_weight, from_max_weight = self.get(from_city)
+        to_min_weight, to_max_weight = self.get(to_city)
+        return (max(from_min_weight, to_min_weight), min(from_max_weight, to_max_weight))
+
+    def feasible_city_pairs(self, weight: int) -> Iterator[Tuple[int, int]]:
+        """Все пары (from city_code, to city_code), между которыми проходит вес weight.
+
+        Пересечение диапазонов двух городов считается на лету, поэтому
+        матрица пар целиком в памяти не строится.
+        """
+        weight_ranges = {
+            city_code: envelope_to_weight_range(*envelope)
+            for city_code, envelope in self._envelopes.items()
+        }
+        weight_ranges.update(self._weight_ranges)
+        city_codes = [
+            city_code
+            for city_code, (min_weight, max_weight) in weight_ranges.items()
+            if min_weight <= weight <= max_weight
+        ]
+        return permutations(city_codes, 2)
+
+
+@pytest.fixture(scope="session")
+def weight_envelopes(location_manager, delivery_point_repository, reference_snapshot):
+    if reference_snapshot is not None:
+        envelopes = reference_snapshot.weight_envelopes
+    else:
+        envelopes = delivery_point_repository.get_weight_envelopes()
+    return WeightEnvelopes(location_manager, envelopes)
+
+
 @pytest.fixture
-def packages_weight(get_city_delivery_points):
+def packages_weight(weight_envelopes: WeightEnvelopes):
     def _packages_weight(from_city: CityModel, to_city: CityModel):
-        from_points = get_city_delivery_points(from_city)
-        to_points = get_city_delivery_points(to_city)
-        from_min_weight, from_max_weight = get_city_weight_range(from_points)
-        to_min_weight, to_max_weight = get_city_weight_range(to_points)
-        min_weight = from_min_weight if from_min_weight > to_min_weight else to_min_weight
-        max_weight = from_max_weight if from_max_weight < to_max_weight else to_max_weight
+        min_weight, max_weight = weight_envelopes.get_route_range(from_city, to_city)
         return fake.pyint(min_value=min_weight, max_value=max_weight, step=10)
     return _packages_weight
@@ -5,6 +5,8 @@ import os
 import allure
 import pytest
 
+from tests.api.coordination import is_xdist_worker, state_root, state_root_key
+
 
 @pytest.hookimpl(tryfirst=True)
 def pytest_sessionstart(session):
@@ -16,6 +18,30 @@ def pytest_sessionstart(session):
     os.makedirs(allure_results, exist_ok=True)
 
 
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # без кэша pytest воркеры делят временный каталог управляющего процесса
+    if getattr(node.config, "cache", None) is None:
+        node.workerinput["state_root"] = str(state_root(node.config))
+
+
+def pytest_unconfigure(config):
+    root = config.stash.get(state_root_key, None)
+    if root is not None and not is_xdist_worker():
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = yield
+    # xdist пересылает отчёты управляющему процессу, а Response не
+    # сериализуется; для allure он остаётся в item.user_properties
+    report.user_properties = [
+        (name, value) for name, value in report.user_properties if name != "response"
+    ]
+    return report
+
+
 # item == request.node в тесте
 def pytest_runtest_teardown(item, nextitem):
     if hasattr(item, "callspec"):
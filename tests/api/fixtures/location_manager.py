@@ -4,31 +4,60 @@
 
 import json
 import random
-from typing import Callable, List
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
 import pytest
 import requests
-from constants import DEFAULT_REQUEST_TIMEOUT_S
 from database.models import CityModel, DeliveryPointModel
 from database.repository import CityRepository, DeliveryPointRepository
-from tests.api.fixtures.token_manager import TokenManager
+from database.snapshot import ReferenceSnapshot
+from tests.api.api_client import ApiClient
+from tests.api.constants import DELIVERY_POINTS_BATCH_SIZE, STREAM_CHUNK_SIZE
+from tests.api.coordination import get_seed_dir, seed
+from tests.api.json_stream import iter_json_array
+
+# lazy - весь ответ /v2/deliverypoints через response.json()
+# stream - поэлементный разбор ответа и запись в базу пачками
+# prefetch - один запрос за всеми офисами на старте сессии, без запросов из тестов
+POINTS_MODES = ("lazy", "stream", "prefetch")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--delivery-points",
+        action="store",
+        default="lazy",
+        choices=POINTS_MODES,
+        help="How delivery points are fetched from API and stored to database",
+    )
 
 
 class LocationManager:
     def __init__(
         self,
-        token_manager: TokenManager,
+        api_client: ApiClient,
         city_repository: CityRepository,
         delivery_point_repository: DeliveryPointRepository,
+        points_mode: str = "lazy",
+        snapshot: ReferenceSnapshot | None = None,
     ) -> None:
         self.city_repo = city_repository
         self.point_repo = delivery_point_repository
-        self.token_manager = token_manager
+        self.api_client = api_client
+        self.points_mode = points_mode
+        self.snapshot = snapshot
         self._city_payloads = None
+        # набор атрибутов критерия -> значения атрибутов -> первый подходящий город
+        self._city_indexes: Dict[Tuple[str, ...], Dict[tuple, CityModel]] = {}
 
     def get_city_payloads(self) -> List[CityModel]:
         # если уже получали ранее, берём полученное
         if self._city_payloads:
             return self._city_payloads
+        # снимок отдаёт строки без создания ORM-объектов
+        if self.snapshot is not None and len(self.snapshot.cities):
+            self._city_payloads = self.snapshot.cities
+            return self._city_payloads
         # пытаемся взять из базы
         city_payloads = self.city_repo.all()
         # если нет в базе, делаем запрос к API и записываем в базу
@@ -39,28 +68,80 @@ class LocationManager:
 
     def find_city_payload(self, **criteria) -> CityModel | None:
         payloads = self.get_city_payloads()
-        if criteria:
+        if not criteria:
+            return random.choice(payloads)
+        keys = tuple(sorted(criteria))
+        try:
+            return self._get_city_index(keys).get(tuple(criteria[key] for key in keys))
+        except TypeError:
+            # нехешируемое значение в критерии - ищем перебором
             for payload in payloads:
                 if all(getattr(payload, key) == value for key, value in criteria.items()):
                     return payload
             return None
-        return random.choice(payloads)
+
+    def _get_city_index(self, keys: Tuple[str, ...]) -> Dict[tuple, CityModel]:
+        index = self._city_indexes.get(keys)
+        if index is None:
+            index = {}
+            for payload in self.get_city_payloads():
+                # setdefault сохраняет поведение перебора: первый найденный город
+                index.setdefault(tuple(getattr(payload, key) for key in keys), payload)
+            self._city_indexes[keys] = index
+        return index
 
     def find_city_points(self, city: CityModel) -> List[DeliveryPointModel]:
-        delivery_point_payloads = city.delivery_points
+        if self.snapshot is not None:
+            # города, офисы которых не попали в снимок, догружаются через базу
+            delivery_point_payloads = self.snapshot.city_points(
+                city.code
+            ) or self.point_repo.get_city_points(city.code)
+        else:
+            delivery_point_payloads = city.delivery_points
         if not delivery_point_payloads:
+            if self.points_mode == "prefetch":
+                # всё, что есть у API, уже загружено в prefetch_points
+                return []
+            if self.points_mode == "stream":
+                points = self._stream_city_points(city.code)
+            else:
+                points = self._fetch_city_points(city.code)
             delivery_point_payloads = self.point_repo.write_points(
-                self._fetch_city_points(city.code), city.code
+                points, city.code, batch_size=DELIVERY_POINTS_BATCH_SIZE
             )
         return delivery_point_payloads
 
+    def prefetch_points(self) -> None:
+        city_codes = {city.code for city in self.get_city_payloads()}
+        points_by_city = defaultdict(list)
+        for point in self._stream_points():
+            city_code = (point.get("location") or {}).get("city_code")
+            # офисы городов, которых нет в cities, не пройдут внешний ключ
+            if city_code in city_codes:
+                points_by_city[city_code].append(point)
+        self.point_repo.write_points_by_city(
+            points_by_city, batch_size=DELIVERY_POINTS_BATCH_SIZE
+        )
+
+    def _stream_city_points(self, city_code):
+        return self._stream_points({"city_code": city_code})
+
+    def _stream_points(self, params=None):
+        with self.api_client.get(
+            url=self.api_client.endpoints.delivery_points(),
+            params=params,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            yield from iter_json_array(
+                response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            )
+
     def _fetch_city_points(self, city_code):
         try:
-            response = requests.get(
-                url=self.token_manager.endpoints.delivery_points(),
-                headers=self.token_manager.auth_header,
+            response = self.api_client.get(
+                url=self.api_client.endpoints.delivery_points(),
                 params={"city_code": city_code},
-                timeout=DEFAULT_REQUEST_TIMEOUT_S,
             )
             response.raise_for_status()
             return response.json()
@@ -71,11 +152,7 @@ class LocationManager:
 
     def _fetch_city_payloads(self):
         try:
-            response = requests.get(
-                url=self.token_manager.endpoints.cities(),
-                headers=self.token_manager.auth_header,
-                timeout=DEFAULT_REQUEST_TIMEOUT_S,
-            )
+            response = self.api_client.get(url=self.api_client.endpoints.cities())
             response.raise_for_status()
             return response.json()
         except requests.RequestException:
@@ -86,11 +163,34 @@ class LocationManager:
 
 @pytest.fixture(scope="session")
 def location_manager(
-    token_manager: TokenManager,
+    api_client: ApiClient,
     city_repository: CityRepository,
     delivery_point_repository: DeliveryPointRepository,
+    pytestconfig: pytest.Config,
+    warmup,
+    reference_snapshot,
 ):
-    return LocationManager(token_manager, city_repository, delivery_point_repository)
+    warmup.wait("cities", city_repository.session)
+    manager = LocationManager(
+        api_client,
+        city_repository,
+        delivery_point_repository,
+        points_mode=pytestconfig.getoption("delivery_points"),
+        snapshot=reference_snapshot,
+    )
+    seed_dir = get_seed_dir(pytestconfig)
+    if seed_dir is not None:
+        # под xdist пустую таблицу cities заполняет один воркер
+        seed(seed_dir, "cities", manager.get_city_payloads, city_repository.session)
+    if manager.points_mode == "prefetch" and reference_snapshot is None:
+        if not warmup.wait("delivery_points", delivery_point_repository.session):
+            seed(
+                seed_dir,
+                "delivery_points",
+                manager.prefetch_points,
+                delivery_point_repository.session,
+            )
+    return manager
 
 
 @pytest.fixture(scope="session")
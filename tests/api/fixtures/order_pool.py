@@ -0,0 +1,451 @@
+# pylint: disable=redefined-outer-name
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+import pytest
+import requests
+from sqlalchemy.orm import Session
+from yarl import URL
+
+from database.db_session import ScopedSession
+from database.models import ORDER_STATES, OrderModel
+from database.repository import (
+    CityRepository,
+    DeliveryModeRepository,
+    DeliveryPointRepository,
+    OrderRepository,
+    TokenRepository,
+)
+from tests.api.api_client import ApiClient, get_circuit_breakers, get_http_client
+from tests.api.circuit_breaker import SharedCircuitBreaker
+from tests.api.constants import (
+    ORDER_CLAIM_POLL_S,
+    ORDER_CLAIM_TIMEOUT_S,
+    ORDER_LEASE_S,
+    ORDER_POLL_INTERVAL_S,
+    ORDER_POOL_SIZE,
+    ORDER_REVALIDATE_TIMEOUT_S,
+)
+from tests.api.coordination import get_seed_dir, seed, state_dir
+from tests.api.file_lock import FileLock
+from tests.api.fixtures.data_generators import fake, make_order
+from tests.api.fixtures.helpers import WeightEnvelopes
+from tests.api.fixtures.location_manager import LocationManager
+from tests.api.fixtures.tariff_calculator import TariffCalculator
+from tests.api.fixtures.token_manager import TOKEN_CACHE_DIR, TokenManager
+from tests.api.order_poller import NOT_FOUND, OrderStatePoller
+from tests.api.webhooks import WebhookReceiver, delete_webhook, register_webhook
+
+ORDER_POOL_DIR = "order-pool"
+# заказ, который ещё может стать SUCCESSFUL или уже им стал
+LIVE_STATES = ("ACCEPTED", "WAITING", "SUCCESSFUL")
+PENDING_STATES = ("ACCEPTED", "WAITING")
+ORDER_FIXTURES = {
+    "order_pool",
+    "order_poller",
+    "claim_order",
+    "successful_order",
+    "get_order_uuid",
+}
+
+
+class OrderPool:
+    """Заказы, созданные заранее в фоне и выдаваемые тестам в аренду.
+
+    Фоновый поток каждого воркера раз в ORDER_POLL_INTERVAL_S пытается
+    стать ведущим (FileLock без ожидания): ведущий досоздаёт свободные
+    заказы до size, ставит необработанные в OrderStatePoller и записывает
+    их новые состояния. Тесты берут заказ из orders через
+    SELECT ... FOR UPDATE SKIP LOCKED.
+
+    С webhook_address пул подписывается на ORDER_STATUS и получает
+    состояния событиями, опрос остаётся на случай потерянных событий.
+    """
+
+    def __init__(
+        self,
+        base_url: URL,
+        size: int = ORDER_POOL_SIZE,
+        http_client: ApiClient | None = None,
+        token_cache_dir: Path | None = None,
+        lock_dir: Path | None = None,
+        points_mode: str = "lazy",
+        seed_dir: Path | None = None,
+        webhook_address: Tuple[str, int] | None = None,
+        webhook_url: str | None = None,
+        circuit_breakers: Dict[str, SharedCircuitBreaker] | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.size = size
+        self.http_client = http_client
+        self.token_cache_dir = token_cache_dir
+        self.points_mode = points_mode
+        self.seed_dir = seed_dir
+        self.worker_id = f"{os.getenv('PYTEST_XDIST_WORKER', 'main')}:{os.getpid()}"
+        self.last_error: Exception | None = None
+        self._leader_lock = FileLock(Path(lock_dir or ".") / "leader.lock")
+        self._stopped = threading.Event()
+        # будит поток пула, как только поллер получил новое состояние
+        self._wakeup = threading.Event()
+        self.poller = OrderStatePoller(on_update=self._wakeup.set)
+        self.webhook_receiver = None
+        if webhook_address is not None:
+            self.webhook_receiver = WebhookReceiver(self.poller.publish, *webhook_address)
+        self.webhook_url = webhook_url
+        # эндпоинты, без которых заказ не создать
+        self.circuit_breakers = circuit_breakers or {}
+        self._webhook_uuid = None
+        self._thread = None
+        self._api_client = None
+        self._order_factory = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="order-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.poller.stop()
+
+    def claim(
+        self,
+        order_repository: OrderRepository,
+        states: Iterable[str],
+        timeout_s: float = ORDER_CLAIM_TIMEOUT_S,
+    ) -> OrderModel | None:
+        states = tuple(states)
+        deadline = time.monotonic() + timeout_s
+        while True:
+            order = order_repository.claim_order(states, self.worker_id, ORDER_LEASE_S)
+            if order is not None:
+                if self._revalidate(order_repository, order, states):
+                    return order
+                continue
+            if time.monotonic() >= deadline or self.open_circuit():
+                return None
+            # заказы досоздаёт и обновляет ведущий пул, возможно в другом воркере
+            time.sleep(ORDER_CLAIM_POLL_S)
+
+    def _revalidate(
+        self, order_repository: OrderRepository, order: OrderModel, states: Tuple[str, ...]
+    ) -> bool:
+        """Заказ всё ещё в states у API.
+
+        В orders остаются заказы прошлых запусков, в том числе с другого
+        стенда или из очищенной песочницы. Ведущий пул перепроверяет только
+        незавершённые, поэтому заказ, которого этот процесс ещё не видел,
+        перед выдачей запрашивается у API. Непригодный заказ получает
+        актуальное состояние и возвращается в пул.
+        """
+        status = self.poller.status(order.uuid)
+        if status is None:
+            try:
+                status = self.poller.wait(order.uuid, ORDER_STATES, ORDER_REVALIDATE_TIMEOUT_S)
+            except TimeoutError:
+                # API не ответил: выдаём как есть, ошибку покажет тест
+                return True
+        elif status.state != NOT_FOUND:
+            return True
+        state = "INVALID" if status.state == NOT_FOUND else status.state
+        if state != order.state or status.cdek_number != order.cdek_number:
+            order_repository.update_state(order.uuid, state, status.cdek_number)
+        if state in states:
+            return True
+        order_repository.release_order(order.uuid)
+        return False
+
+    def open_circuit(self) -> str | None:
+        """Эндпоинт с открытым размыкателем, из-за которого заказы сейчас не создать"""
+        for endpoint, breaker in self.circuit_breakers.items():
+            if breaker.stats().state == "open":
+                return endpoint
+        return None
+
+    def _run(self) -> None:
+        # ScopedSession отдаёт потоку свою сессию
+        session = ScopedSession()
+        try:
+            self.poller.start(self._client(session))
+            self._subscribe()
+            while not self._stopped.is_set():
+                if self._leader_lock.acquire(blocking=False):
+                    try:
+                        self._top_up(session)
+                        self._refresh_states(session)
+                        self.last_error = None
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        # не роняем поток: тест, не дождавшийся заказа, покажет ошибку
+                        session.rollback()
+                        self.last_error = e
+                    finally:
+                        self._leader_lock.release()
+                self._wakeup.wait(ORDER_POLL_INTERVAL_S)
+                self._wakeup.clear()
+        finally:
+            self._unsubscribe()
+            ScopedSession.remove()
+
+    def _subscribe(self) -> None:
+        if self.webhook_receiver is None:
+            return
+        self.webhook_receiver.start()
+        try:
+            # под xdist подписка на аккаунт одна: события получает последний
+            # подписавшийся воркер, остальные узнают состояния опросом
+            self._webhook_uuid = register_webhook(
+                self._api_client, self.webhook_url or self.webhook_receiver.url
+            )
+        except (requests.RequestException, ValueError, LookupError) as e:
+            self.last_error = e
+
+    def _unsubscribe(self) -> None:
+        if self.webhook_receiver is None:
+            return
+        try:
+            if self._webhook_uuid is not None:
+                delete_webhook(self._api_client, self._webhook_uuid)
+        except requests.RequestException:
+            pass
+        finally:
+            self.webhook_receiver.stop()
+
+    def _top_up(self, session: Session) -> None:
+        order_repository = OrderRepository(session)
+        missing = self.size - order_repository.count_available(LIVE_STATES)
+        for _ in range(missing):
+            response = self._client(session).post(
+                url=self._client(session).endpoints.orders(),
+                json=self._new_order(session),
+            )
+            response.raise_for_status()
+            body = response.json()
+            order_repository.create_order(
+                {"uuid": body["entity"]["uuid"], "state": body["requests"][0]["state"]}
+            )
+            self.poller.watch(body["entity"]["uuid"])
+
+    def _refresh_states(self, session: Session) -> None:
+        order_repository = OrderRepository(session)
+        for order in order_repository.get_orders_in_states(PENDING_STATES):
+            status = self.poller.status(order.uuid)
+            if status is None or not status.final:
+                # заказы других воркеров и оставшиеся с прошлого запуска
+                self.poller.watch(order.uuid)
+            if status is None:
+                continue
+            # заказа больше нет у API (например, очищена песочница)
+            state = "INVALID" if status.state == NOT_FOUND else status.state
+            if state != order.state or status.cdek_number != order.cdek_number:
+                order_repository.update_state(order.uuid, state, status.cdek_number)
+
+    def _client(self, session: Session) -> ApiClient:
+        if self._api_client is None:
+            token_manager = TokenManager(
+                self.base_url,
+                TokenRepository(session),
+                self.http_client,
+                cache_dir=self.token_cache_dir,
+                background_refresh=False,
+            )
+            self._api_client = token_manager.http_client.with_auth(
+                lambda: token_manager.auth_header
+            )
+        return self._api_client
+
+    def _new_order(self, session: Session) -> dict:
+        if self._order_factory is None:
+            self._order_factory = self._create_order_factory(session)
+        return self._order_factory()
+
+    def _create_order_factory(self, session: Session) -> Callable[[], dict]:
+        api_client = self._client(session)
+        location_manager = LocationManager(
+            api_client,
+            CityRepository(session),
+            DeliveryPointRepository(session),
+            points_mode=self.points_mode,
+        )
+        # под xdist справочники могут в этот момент загружать другие воркеры
+        seed(self.seed_dir, "cities", location_manager.get_city_payloads, session)
+        cities = location_manager.get_city_payloads()
+        weight_envelopes = WeightEnvelopes(
+            location_manager, DeliveryPointRepository(session).get_weight_envelopes()
+        )
+        tariff_calculator = TariffCalculator(DeliveryModeRepository(session), api_client)
+        seed(
+            self.seed_dir,
+            "delivery_modes",
+            tariff_calculator.get_delivery_mode_payload_list,
+            session,
+        )
+
+        def _order() -> dict:
+            while True:
+                from_city, to_city = random.sample(list(cities), 2)
+                min_weight, max_weight = weight_envelopes.get_route_range(from_city, to_city)
+                if min_weight <= max_weight:
+                    break
+            weight = fake.pyint(min_value=min_weight, max_value=max_weight, step=10)
+            return make_order(
+                from_city, to_city, tariff_calculator.get_random_tariff_code(), weight
+            )
+
+        return _order
+
+
+order_pool_key = pytest.StashKey[OrderPool]()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--order-pool",
+        action="store",
+        type=int,
+        default=ORDER_POOL_SIZE,
+        help="Number of free orders kept ready in background for order tests",
+    )
+    parser.addoption(
+        "--webhooks",
+        action="store_true",
+        default=False,
+        help="Receive ORDER_STATUS webhooks on a local listener, polling stays as fallback",
+    )
+    parser.addoption(
+        "--webhook-host",
+        action="store",
+        default="127.0.0.1",
+        help="Address the webhook listener binds to",
+    )
+    parser.addoption(
+        "--webhook-port",
+        action="store",
+        type=int,
+        default=0,
+        help="Port of the webhook listener, 0 picks a free one",
+    )
+    parser.addoption(
+        "--webhook-url",
+        action="store",
+        default=None,
+        help="Public URL forwarded to the webhook listener, by default its local address",
+    )
+
+
+def create_order_pool(config: pytest.Config) -> OrderPool:
+    base_url = URL(os.getenv("API_BASE_URL"))
+    breakers = get_circuit_breakers(config, base_url)
+    pool = OrderPool(
+        base_url,
+        size=config.getoption("order_pool"),
+        http_client=get_http_client(config),
+        token_cache_dir=state_dir(config, TOKEN_CACHE_DIR),
+        lock_dir=state_dir(config, ORDER_POOL_DIR),
+        points_mode=config.getoption("delivery_points"),
+        seed_dir=get_seed_dir(config),
+        webhook_address=(
+            (config.getoption("webhook_host"), config.getoption("webhook_port"))
+            if config.getoption("webhooks")
+            else None
+        ),
+        webhook_url=config.getoption("webhook_url"),
+        circuit_breakers=(
+            {endpoint: breakers.breakers[endpoint] for endpoint in ("v2/oauth", "v2/orders")}
+            if breakers is not None
+            else None
+        ),
+    )
+    config.stash[order_pool_key] = pool
+    return pool
+
+
+def pytest_collection_finish(session):
+    config = session.config
+    # под xdist пул запускают воркеры; без тестов на заказы пул не нужен
+    if (
+        config.option.collectonly
+        or config.pluginmanager.has_plugin("dsession")
+        or config.getoption("order_pool") <= 0
+    ):
+        return
+    if any(ORDER_FIXTURES.intersection(item.fixturenames) for item in session.items):
+        create_order_pool(config).start()
+
+
+def pytest_sessionfinish(session):
+    pool = session.config.stash.get(order_pool_key, None)
+    if pool is not None:
+        pool.stop()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    pool = config.stash.get(order_pool_key, None)
+    if pool is None or pool.webhook_receiver is None:
+        return
+    stats = pool.webhook_receiver.stats
+    terminalreporter.write_sep("-", "order webhooks")
+    terminalreporter.write_line(
+        f"events: {stats['received']}, ignored: {stats['ignored']}, "
+        f"subscribed: {pool.webhook_url or pool.webhook_receiver.url}"
+    )
+
+
+@pytest.fixture(scope="session")
+def order_pool(pytestconfig: pytest.Config, token_manager) -> OrderPool:
+    # token_manager: токен получает и пишет в auth_tokens основной поток,
+    # фоновый поток пула берёт его из файлового кэша
+    pool = pytestconfig.stash.get(order_pool_key, None)
+    if pool is None:
+        pool = create_order_pool(pytestconfig)
+        pool.size = max(pool.size, 1)
+    if not pool.running:
+        pool.start()
+    return pool
+
+
+@pytest.fixture
+def claim_order(order_pool: OrderPool, order_repository: OrderRepository):
+    claimed: List[OrderModel] = []
+
+    def _claim_order(states: Iterable[str] = LIVE_STATES) -> OrderModel:
+        order = order_pool.claim(order_repository, states)
+        if order is None:
+            endpoint = order_pool.open_circuit()
+            reason = (
+                f"circuit breaker of {endpoint} is open"
+                if endpoint
+                else f"within {ORDER_CLAIM_TIMEOUT_S}s"
+            )
+            pytest.fail(
+                f"No order in states {tuple(states)}: {reason}, "
+                f"last order pool error: {order_pool.last_error!r}"
+            )
+        claimed.append(order)
+        return order
+
+    yield _claim_order
+
+    # заказ возвращается в пул для следующих тестов и воркеров
+    for order in claimed:
+        order_repository.release_order(order.uuid)
+
+
+@pytest.fixture
+def successful_order(claim_order) -> OrderModel:
+    return claim_order(("SUCCESSFUL",))
+
+
+@pytest.fixture(scope="session")
+def order_poller(order_pool: OrderPool) -> OrderStatePoller:
+    """Общий цикл опроса для тестов, которые сами создают заказы"""
+    return order_pool.poller
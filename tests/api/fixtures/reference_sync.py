@@ -0,0 +1,46 @@
+import pytest
+
+from tests.api.coordination import SEED_DIR, RunOnce, state_dir
+from tests.api.fixtures.snapshot import snapshot_path
+from tests.api.reference_sync import sync_reference
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--sync-reference",
+        action="store",
+        default="off",
+        choices=("off", "due", "force"),
+        help="Incrementally sync cities and delivery points with API before tests: "
+        "when the last sync is older than the interval (due) or always (force)",
+    )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def reference_sync(pytestconfig: pytest.Config, request: pytest.FixtureRequest):
+    mode = pytestconfig.getoption("sync_reference")
+    if mode == "off":
+        return []
+    # фикстуры берём только при включённой синхронизации, иначе autouse
+    # потребовал бы токен даже для тестов без API
+    warmup = request.getfixturevalue("warmup")
+    db_session = request.getfixturevalue("db_session")
+    warmup.wait("cities")
+    warmup.wait("delivery_points", db_session)
+    tables = []
+
+    def _sync():
+        tables.extend(
+            sync_reference(
+                request.getfixturevalue("api_client"),
+                db_session,
+                force=mode == "force",
+                snapshot_path=snapshot_path(pytestconfig),
+            )
+        )
+
+    # под xdist синхронизирует один воркер, остальные ждут его результата
+    RunOnce(state_dir(pytestconfig, SEED_DIR), "reference-sync").run(_sync)
+    # новая транзакция увидит то, что записал синхронизировавший воркер
+    db_session.commit()
+    return tables
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from pathlib import Path
+import pytest
+
+from tests.api.coordination import is_xdist_worker, namespaced
+from tests.api.durations import DURATIONS_CACHE_KEY, DurationStore
+from tests.api.sharding import parse_shard, partition, partition_key
+
+durations_key = pytest.StashKey[DurationStore]()
+scheduler_key = pytest.StashKey[object]()
+shard_summary_key = pytest.StashKey[str]()
+
+
+class DurationRecorder:
+    """Пишет в DurationStore длительность каждого теста: setup + call + teardown"""
+
+    def __init__(self, store: DurationStore) -> None:
+        self.store = store
+        self._running = defaultdict(float)
+
+    def pytest_runtest_logreport(self, report):
+        self._running[report.nodeid] += report.duration
+        if report.when == "teardown":
+            self.store.observe(report.nodeid, self._running.pop(report.nodeid))
+
+    def pytest_sessionfinish(self, session):
+        self.store.save()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--lpt",
+        action="store_true",
+        default=False,
+        help="Hand out xdist tests longest first, by durations of previous runs",
+    )
+    parser.addoption(
+        "--shard",
+        action="store",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="Run only shard i of N, tests are split by durations of previous runs",
+    )
+    parser.addoption(
+        "--durations-file",
+        action="store",
+        type=Path,
+        default=None,
+        help="JSON file with test durations instead of pytest cache; shards must "
+        "share the same file to split tests identically",
+    )
+
+
+def pytest_configure(config):
+    path = config.getoption("durations_file")
+    cache = getattr(config, "cache", None)
+    if path is None and cache is None:
+        # -p no:cacheprovider: длительности хранить негде
+        if config.getoption("lpt") or config.getoption("shard"):
+            raise pytest.UsageError("--lpt and --shard need the pytest cache or --durations-file")
+        return
+    store = DurationStore(cache, path=path, key=namespaced(config, DURATIONS_CACHE_KEY))
+    config.stash[durations_key] = store
+    # под xdist отчёты всех воркеров приходят в управляющий процесс
+    if not is_xdist_worker():
+        config.pluginmanager.register(DurationRecorder(store), "duration-recorder")
+
+
+def pytest_collection_modifyitems(config, items):
+    shard = config.getoption("shard")
+    if shard is None:
+        return
+    index, count = shard
+    store = config.stash[durations_key]
+
+    def weight(nodeid: str) -> float:
+        return store.estimate(nodeid)[0]
+
+    nodeids = [item.nodeid for item in items]
+    selected_ids = set(partition(nodeids, count, weight)[index - 1])
+    selected = [item for item in items if item.nodeid in selected_ids]
+    deselected = [item for item in items if item.nodeid not in selected_ids]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = selected
+    config.stash[shard_summary_key] = (
+        f"shard {index}/{count}: {len(selected)} of {len(nodeids)} tests, "
+        f"estimated {sum(map(weight, selected_ids)):.1f}s of {sum(map(weight, nodeids)):.1f}s, "
+        f"partition key {partition_key(nodeids, weight)}"
+    )
+
+
+@pytest.hookimpl(tryfirst=True, optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if not config.getoption("lpt"):
+        return None
+    # xdist нужен только здесь, без него плагин должен загружаться
+    from tests.api.lpt_scheduling import LPTScheduling  # pylint: disable=import-outside-toplevel
+
+    scheduler = LPTScheduling(config, log, config.stash[durations_key])
+    config.stash[scheduler_key] = scheduler
+    return scheduler
+
+
+def pytest_report_collectionfinish(config):
+    # ключ разбиения должен совпадать у всех шардов, иначе тесты теряются
+    return config.stash.get(shard_summary_key, None)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    scheduler = config.stash.get(scheduler_key, None)
+    if scheduler is None or scheduler.predicted_makespan is None:
+        return
+    terminalreporter.write_sep("-", "LPT scheduling")
+    sources = ", ".join(
+        f"{source}: {count}" for source, count in scheduler.estimate_sources.most_common()
+    )
+    terminalreporter.write_line(
+        f"predicted makespan: {scheduler.predicted_makespan:.2f}s, "
+        f"actual: {scheduler.actual_makespan:.2f}s ({sources})"
+    )
+    busy = sorted(scheduler.node_busy_s.items())
+    terminalreporter.write_line(
+        "busy: " + ", ".join(f"{worker} {busy_s:.2f}s" for worker, busy_s in busy)
+    )
@@ -0,0 +1,76 @@
+# pylint: disable=redefined-outer-name
+import hashlib
+import os
+from pathlib import Path
+import pytest
+from sqlalchemy.orm import Session
+
+import database.db_session
+from database.repository import CityRepository, DeliveryModeRepository, DeliveryPointRepository
+from database.snapshot import ReferenceSnapshot, source_marker, write_snapshot
+from tests.api.coordination import SEED_DIR, RunOnce, is_xdist_worker, state_dir
+from tests.api.fixtures.location_manager import LocationManager
+from tests.api.fixtures.tariff_calculator import TariffCalculator
+
+SNAPSHOT_DIR = "reference-snapshot"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--reference-snapshot",
+        action="store_true",
+        default=False,
+        help="Serve reference data from a memory-mapped snapshot in pytest cache, "
+        "write the snapshot from database if it is missing or the database has "
+        "changed since; always on under xdist",
+    )
+
+
+def snapshot_path(config: pytest.Config) -> Path:
+    """Снимок своего окружения: у разных API и баз файлы разные"""
+    environment = hashlib.sha256(
+        f"{os.getenv('API_BASE_URL')} {database.db_session.engine.url}".encode()
+    )
+    return state_dir(config, SNAPSHOT_DIR) / f"{environment.hexdigest()[:16]}.snap"
+
+
+def seed_snapshot(request: pytest.FixtureRequest, session: Session, path: Path) -> None:
+    """Загрузить в базу все справочники и записать из неё снимок"""
+    warmup = request.getfixturevalue("warmup")
+    api_client = request.getfixturevalue("api_client")
+    warmup.wait("cities", session)
+    warmup.wait("delivery_modes", session)
+    location_manager = LocationManager(
+        api_client, CityRepository(session), DeliveryPointRepository(session)
+    )
+    location_manager.get_city_payloads()
+    # снимок читают все воркеры, поэтому офисы загружаются целиком
+    if not warmup.wait("delivery_points", session):
+        location_manager.prefetch_points()
+    TariffCalculator(DeliveryModeRepository(session), api_client).get_delivery_mode_payload_list()
+    write_snapshot(session, path)
+
+
+@pytest.fixture(scope="session")
+def reference_snapshot(pytestconfig: pytest.Config, db_session, request: pytest.FixtureRequest):
+    if not pytestconfig.getoption("reference_snapshot") and not is_xdist_worker():
+        yield None
+        return
+    path = snapshot_path(pytestconfig)
+    snapshot = ReferenceSnapshot.open(path)
+    if snapshot is not None and snapshot.marker != source_marker(db_session):
+        # базу заново заполнили или синхронизировали после записи снимка
+        snapshot = None
+    if snapshot is None and is_xdist_worker():
+        # снимок пишет один воркер, остальные ждут его на блокировке и
+        # открывают тот же файл: страницы mmap общие для всех процессов
+        RunOnce(state_dir(pytestconfig, SEED_DIR), "snapshot").run(
+            lambda: seed_snapshot(request, db_session, path)
+        )
+        snapshot = ReferenceSnapshot.open(path)
+
+    yield snapshot
+
+    # снимка не было: сохраняем то, что сессия загрузила в базу
+    if snapshot is None:
+        write_snapshot(db_session, path)
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import pytest
+
+import database.db_session
+from database.models import Base
+from tests.api.coordination import state_namespace_key
+from tests.api.fixtures.snapshot import snapshot_path
+from tests.api.stand_in import Latency, StandInConfig, StandInServer
+
+stand_in_key = pytest.StashKey[StandInServer]()
+stand_in_db_dir_key = pytest.StashKey[Path]()
+# каталоги общего состояния в кэше pytest: stand-in-rate-limit и т.п.
+STAND_IN_NAMESPACE = "stand-in"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--stand-in",
+        action="store_true",
+        default=False,
+        help="Run tests against local CDEK API stand-in instead of API_BASE_URL, "
+        "with a temporary SQLite database instead of DB_URL",
+    )
+    parser.addoption(
+        "--stand-in-latency",
+        action="store",
+        type=Latency.parse,
+        default=Latency(),
+        help="Stand-in response latency: fixed:MS, uniform:LO:HI, exp:MEAN, lognormal:MU:SIGMA",
+    )
+    parser.addoption(
+        "--stand-in-error-rate",
+        action="store",
+        type=float,
+        default=0.0,
+        help="Share of stand-in responses answered with 500",
+    )
+    parser.addoption(
+        "--stand-in-throttle-rate",
+        action="store",
+        type=float,
+        default=0.0,
+        help="Share of stand-in responses answered with 429",
+    )
+    parser.addoption(
+        "--stand-in-rate-limit",
+        action="store",
+        type=float,
+        default=0.0,
+        help="Stand-in requests per second, requests above it are answered with 429",
+    )
+    parser.addoption(
+        "--stand-in-order-delay",
+        action="store",
+        type=float,
+        default=5.0,
+        help="Seconds before stand-in order becomes SUCCESSFUL",
+    )
+    parser.addoption(
+        "--stand-in-webhook-loss-rate",
+        action="store",
+        type=float,
+        default=0.0,
+        help="Share of stand-in webhook events that are never delivered",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if not config.getoption("stand_in", False):
+        return
+    # синтетические города, заказы, токены и состояние размыкателей не
+    # должны попасть в базу и кэш прогонов на настоящем API
+    config.stash[state_namespace_key] = STAND_IN_NAMESPACE
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None and "stand_in_url" in workerinput:
+        # воркеры xdist ходят в сервер и базу управляющего процесса: заказы,
+        # вебхуки и счётчики общие на весь запуск
+        os.environ["API_BASE_URL"] = workerinput["stand_in_url"]
+        database.db_session.bind_engine(workerinput["stand_in_db_url"])
+        return
+    db_dir = Path(tempfile.mkdtemp(prefix="stand-in-db-"))
+    config.stash[stand_in_db_dir_key] = db_dir
+    database.db_session.bind_engine(f"sqlite:///{db_dir / 'stand-in.sqlite'}")
+    Base.metadata.create_all(database.db_session.engine)
+    server = StandInServer(
+        StandInConfig(
+            latency=config.getoption("stand_in_latency"),
+            error_rate=config.getoption("stand_in_error_rate"),
+            throttle_rate=config.getoption("stand_in_throttle_rate"),
+            rate_limit_rps=config.getoption("stand_in_rate_limit"),
+            order_delay_s=config.getoption("stand_in_order_delay"),
+            webhook_loss_rate=config.getoption("stand_in_webhook_loss_rate"),
+        )
+    ).start()
+    config.stash[stand_in_key] = server
+    # клиенты и фикстуры берут адрес API из окружения
+    os.environ["API_BASE_URL"] = server.url
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    server = node.config.stash.get(stand_in_key, None)
+    if server is not None:
+        node.workerinput["stand_in_url"] = server.url
+        node.workerinput["stand_in_db_url"] = str(database.db_session.engine.url)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    server = config.stash.get(stand_in_key, None)
+    if server is None:
+        return
+    stats = server.state.stats
+    terminalreporter.write_sep("-", "CDEK API stand-in")
+    terminalreporter.write_line(
+        f"requests: {stats['requests']}, 429: {stats['throttled']}, "
+        f"500: {stats['errors']}, "
+        f"injected latency: {server.state.injected_latency_s:.2f}s"
+    )
+    if server.state.webhooks or stats["webhooks_sent"]:
+        terminalreporter.write_line(
+            f"webhook events sent: {stats['webhooks_sent']}, "
+            f"lost: {stats['webhooks_lost']}, failed: {stats['webhook_errors']}"
+        )
+
+
+def pytest_unconfigure(config):
+    server = config.stash.get(stand_in_key, None)
+    if server is not None:
+        server.stop()
+    db_dir = config.stash.get(stand_in_db_dir_key, None)
+    if db_dir is not None:
+        # снимок временной базы следующему запуску не пригодится
+        snapshot_path(config).unlink(missing_ok=True)
+        database.db_session.engine.dispose()
+        shutil.rmtree(db_dir, ignore_errors=True)
@@ -6,27 +6,34 @@ import pytest
 
 from database.models import DeliveryModeModel
 from database.repository import DeliveryModeRepository
-from tests.api.constants import DEFAULT_REQUEST_TIMEOUT_S
-from tests.api.fixtures.token_manager import TokenManager
+from database.snapshot import ReferenceSnapshot
+from tests.api.api_client import ApiClient
+from tests.api.coordination import get_seed_dir, seed
 
 
 class TariffCalculator:
     def __init__(
         self,
         mode_repo: DeliveryModeRepository,
-        token_manager: TokenManager,
+        api_client: ApiClient,
+        snapshot: ReferenceSnapshot | None = None,
     ) -> None:
         self.mode_repo = mode_repo
-        self.token_manager = token_manager
+        self.api_client = api_client
+        self.snapshot = snapshot
         self._mode_payload_list = None
 
     def get_delivery_mode_payload_list(self) -> List[DeliveryModeModel]:
         if self._mode_payload_list:
             return self._mode_payload_list
+        if self.snapshot is not None and len(self.snapshot.delivery_modes):
+            self._mode_payload_list = self.snapshot.delivery_modes
+            return self._mode_payload_list
         mode_payload_list = self.mode_repo.all()
         if not mode_payload_list:
             mode_payload_list = self.mode_repo.write_mode_list(self._fetch_mode_payload_list())
-        return mode_payload_list
+        self._mode_payload_list = mode_payload_list
+        return self._mode_payload_list
 
     def get_random_tariff_code(self):
         code_list = []
@@ -39,11 +46,7 @@ class TariffCalculator:
     def _fetch_mode_payload_list(self):
         try:
             mode_list = []
-            response = requests.get(
-                url=self.token_manager.endpoints.all_tariffs(),
-                headers=self.token_manager.auth_header,
-                timeout=DEFAULT_REQUEST_TIMEOUT_S,
-            )
+            response = self.api_client.get(url=self.api_client.endpoints.all_tariffs())
             for tariff in response.json()["tariff_codes"]:
                 mode_list.extend(tariff["delivery_modes"])
             return mode_list
@@ -52,8 +55,23 @@ class TariffCalculator:
 
 
 @pytest.fixture
-def tariff_calculator(token_manager, delivery_mode_repository):
-    return TariffCalculator(delivery_mode_repository, token_manager)
+def tariff_calculator(
+    api_client, delivery_mode_repository, warmup, reference_snapshot, pytestconfig
+):
+    warmup.wait("delivery_modes", delivery_mode_repository.session)
+    calculator = TariffCalculator(
+        delivery_mode_repository, api_client, snapshot=reference_snapshot
+    )
+    seed_dir = get_seed_dir(pytestconfig)
+    if seed_dir is not None:
+        # под xdist пустую таблицу delivery_modes заполняет один воркер
+        seed(
+            seed_dir,
+            "delivery_modes",
+            calculator.get_delivery_mode_payload_list,
+            delivery_mode_repository.session,
+        )
+    return calculator
 
 
 @pytest.fixture
@@ -1,64 +1,185 @@
 # pylint: disable=redefined-outer-name
 # pyright: reportArgumentType=false
+import hashlib
+import json
 import os
+import threading
+import time
+from pathlib import Path
 import pytest
 import requests
 
 from yarl import URL
 from database.repository import TokenRepository
+from tests.api.api_client import ApiClient
 from tests.api.api_urls import ApiUrls
-from tests.api.constants import DEFAULT_REQUEST_TIMEOUT_S
+from tests.api.coordination import state_dir
+from tests.api.constants import TOKEN_EXPIRY_MARGIN_S, TOKEN_REFRESH_AHEAD_S, TOKEN_RETRY_S
+from tests.api.file_lock import FileLock, write_atomic
 
+TOKEN_CACHE_DIR = "token"
 
-class TokenManager:
 
-    def __init__(self, base_url: URL, token_repository: TokenRepository):
+class TokenError(requests.RequestException):
+    """Не удалось получить токен OAuth.
+
+    Обычное исключение, а не pytest.fail: токен обновляют и фоновые потоки
+    пула заказов и опроса состояний, которые ловят ошибки запросов.
+    """
+
+
+class TokenManager:
+    """Токен OAuth, общий для потоков процесса и воркеров xdist.
+
+    Токен хранится в памяти, в файле cache_dir (общем для процессов) и в
+    auth_tokens. Обновляет токен один поток под FileLock, остальные ждут и
+    берут его результат; таймер обновляет токен за TOKEN_REFRESH_AHEAD_S до
+    истечения, поэтому тесты на OAuth не ждут.
+    """
+
+    def __init__(
+        self,
+        base_url: URL,
+        token_repository: TokenRepository,
+        http_client: ApiClient | None = None,
+        cache_dir: Path | None = None,
+        background_refresh: bool = True,
+    ):
         self.base_url = base_url
         self.token_repo = token_repository
         self.endpoints = ApiUrls(base_url)
+        self.http_client = http_client or ApiClient(base_url)
+        self.background_refresh = background_refresh
         self._token = None
-        self._auth_header = None
+        self._expired_at = 0.0
+        self._lock = threading.Lock()
+        self._timer = None
+        # сессия SQLAlchemy не потокобезопасна: в auth_tokens ходит только
+        # поток, создавший менеджер, таймер обходится файлом
+        self._owner_thread = threading.get_ident()
+        self._cache_file = None
+        self._file_lock = None
+        if cache_dir is not None:
+            account = hashlib.sha256(f"{base_url} {os.getenv('ACCOUNT')}".encode())
+            name = account.hexdigest()[:16]
+            self._cache_file = Path(cache_dir) / f"{name}.json"
+            self._file_lock = FileLock(Path(cache_dir) / f"{name}.lock")
 
     def get_token(self) -> str | None:
-        auth_token = self.token_repo.get_last_token()
-        if auth_token:
-            return auth_token
-        token_payload = self._fetch_new_token()
-        if token_payload and token_payload.get("access_token"):
-            self.token_repo.write_token(token_payload)
-            return token_payload["access_token"]
-        return None
+        return self._get_token(foreground=True)
 
     @property
     def token(self) -> str:
-        if self._token is None:
-            self._token = self.get_token()
-            if not self._token:
-                raise ValueError("Authorization token not available")
-        return self._token
+        if self._is_fresh(self._expired_at, TOKEN_EXPIRY_MARGIN_S):
+            return self._token
+        token = self.get_token()
+        if not token:
+            raise ValueError("Authorization token not available")
+        return token
 
     @property
     def auth_header(self) -> dict[str, str]:
-        if self._auth_header is None:
-            self._auth_header = {"Authorization": f"Bearer {self.token}"}
-        return self._auth_header.copy()
+        # собирается на каждый вызов, чтобы не отдавать устаревший токен
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    @staticmethod
+    def _is_fresh(expired_at: float, margin_s: float) -> bool:
+        return time.time() < expired_at - margin_s
+
+    def _get_token(self, foreground: bool) -> str | None:
+        # single flight в процессе: остальные потоки дождутся этого обновления
+        with self._lock:
+            margin = TOKEN_EXPIRY_MARGIN_S if foreground else TOKEN_REFRESH_AHEAD_S
+            if not self._is_fresh(self._expired_at, margin):
+                if self._file_lock is None:
+                    self._refresh(foreground, margin)
+                else:
+                    # и между процессами: токен запрашивает один воркер
+                    with self._file_lock:
+                        self._refresh(foreground, margin)
+            return self._token
+
+    def _refresh(self, foreground: bool, margin: float) -> None:
+        cached = self._read_cache()
+        if cached and self._is_fresh(cached["expired_at"], margin):
+            self._adopt(cached["access_token"], cached["expired_at"])
+            return
+        can_use_db = threading.get_ident() == self._owner_thread
+        if can_use_db:
+            token_row = self.token_repo.get_last_token_row()
+            if token_row and self._is_fresh(token_row.expired_at.timestamp(), margin):
+                self._store(str(token_row.access_token), token_row.expired_at.timestamp())
+                return
+        requested_at = time.time()
+        token_payload = self._fetch_new_token() if foreground else self._request_token()
+        if token_payload and token_payload.get("access_token"):
+            if can_use_db:
+                self.token_repo.write_token(dict(token_payload))
+            self._store(
+                token_payload["access_token"],
+                requested_at + int(token_payload["expires_in"]),
+            )
+
+    def _store(self, token: str, expired_at: float) -> None:
+        if self._cache_file is not None:
+            write_atomic(
+                self._cache_file,
+                json.dumps({"access_token": token, "expired_at": expired_at}).encode(),
+            )
+        self._adopt(token, expired_at)
+
+    def _adopt(self, token: str, expired_at: float) -> None:
+        self._token = token
+        self._expired_at = expired_at
+        if self.background_refresh:
+            self._schedule(expired_at - TOKEN_REFRESH_AHEAD_S - time.time())
+
+    def _schedule(self, delay_s: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay_s, 0), self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self._get_token(foreground=False)
+        except (requests.RequestException, ValueError, KeyError):
+            # тесты ещё работают со старым токеном, пробуем позже
+            with self._lock:
+                self._schedule(TOKEN_RETRY_S)
+
+    def _read_cache(self) -> dict | None:
+        if self._cache_file is None:
+            return None
+        try:
+            return json.loads(self._cache_file.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def _request_token(self) -> dict:
+        response = self.http_client.post(
+            url=self.endpoints.token(),
+            params={
+                "grant_type": "client_credentials",
+                "client_id": os.getenv("ACCOUNT"),
+                "client_secret": os.getenv("PASSWORD"),
+            },
+        )
+        response.raise_for_status()
+        return response.json()
 
     def _fetch_new_token(self) -> dict:
         try:
-            response = requests.post(
-                url=self.endpoints.token(),
-                params={
-                    "grant_type": "client_credentials",
-                    "client_id": os.getenv("ACCOUNT"),
-                    "client_secret": os.getenv("PASSWORD"),
-                },
-                timeout=DEFAULT_REQUEST_TIMEOUT_S,
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._request_token()
         except (requests.RequestException, ValueError) as e:
-            pytest.fail(f"Failed to fetch token: {e}")
-            return None
+            raise TokenError(f"Failed to fetch token: {e}") from e
 
 
 @pytest.fixture(scope="session")
@@ -72,18 +193,30 @@ def endpoints(api_base_url) -> ApiUrls:
 
 
 @pytest.fixture(scope="session")
-def token_manager(api_base_url: URL, token_repository: TokenRepository) -> TokenManager:
-    return TokenManager(api_base_url, token_repository)
-
-
-@pytest.fixture(scope="session")
-def token(token_manager: TokenManager) -> str:
-    auth_token = token_manager.get_token()
-    if not auth_token:
-        pytest.fail("Failed to obtain authentification token")
-    return auth_token
-
-
-@pytest.fixture(scope="session")
-def auth_header(token: str) -> dict[str, str]:
-    return {"Authorization": f"Bearer {token}"}
+def token_manager(
+    api_base_url: URL,
+    token_repository: TokenRepository,
+    http_client,
+    warmup,
+    pytestconfig: pytest.Config,
+) -> TokenManager:
+    warmup.wait("token", token_repository.session)
+    manager = TokenManager(
+        api_base_url,
+        token_repository,
+        http_client,
+        cache_dir=state_dir(pytestconfig, TOKEN_CACHE_DIR),
+    )
+
+    yield manager
+
+    manager.close()
+
+
+@pytest.fixture
+def auth_header(token_manager: TokenManager) -> dict[str, str]:
+    # на каждый тест: фоновое обновление меняет токен в течение сессии
+    try:
+        return token_manager.auth_header
+    except TokenError as e:
+        pytest.fail(str(e))
@@ -0,0 +1,172 @@
+# pylint: disable=redefined-outer-name
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict
+import pytest
+from sqlalchemy.orm import Session
+from yarl import URL
+
+from database.db_session import ScopedSession
+from database.repository import (
+    CityRepository,
+    DeliveryModeRepository,
+    DeliveryPointRepository,
+    TokenRepository,
+)
+from tests.api.api_client import ApiClient, get_http_client
+from tests.api.coordination import get_seed_dir, seed, state_dir
+from tests.api.fixtures.location_manager import LocationManager
+from tests.api.fixtures.tariff_calculator import TariffCalculator
+from tests.api.fixtures.token_manager import TOKEN_CACHE_DIR, TokenManager
+
+WARMUP_MAX_WORKERS = 4
+
+
+class WarmUp:
+    """Параллельная загрузка справочных данных в базу, пока pytest собирает тесты.
+
+    С seed_dir (воркеры xdist) каждую таблицу загружает один воркер,
+    остальные ждут его и читают уже заполненную базу.
+    """
+
+    def __init__(
+        self,
+        base_url: URL,
+        points_mode: str = "lazy",
+        http_client: ApiClient | None = None,
+        token_cache_dir: Path | None = None,
+        seed_dir: Path | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.points_mode = points_mode
+        self.http_client = http_client
+        self.token_cache_dir = token_cache_dir
+        self.seed_dir = seed_dir
+        self._executor = None
+        self._futures: Dict[str, Future] = {}
+
+    def start(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=WARMUP_MAX_WORKERS, thread_name_prefix="warmup"
+        )
+        # порядок важен: задачи ниже ждут токен и города через wait()
+        self._submit("token", self._load_token)
+        self._submit("cities", self._once("cities", self._load_cities))
+        self._submit("delivery_modes", self._once("delivery_modes", self._load_delivery_modes))
+        if self.points_mode == "prefetch":
+            self._submit(
+                "delivery_points", self._once("delivery_points", self._load_delivery_points)
+            )
+
+    def wait(self, name: str, session: Session | None = None) -> bool:
+        future = self._futures.get(name)
+        if future is None:
+            return False
+        future.result()
+        if session is not None:
+            # закрываем уже открытую транзакцию, иначе при REPEATABLE READ
+            # не будет видно данных, записанных прогревом
+            session.commit()
+        return True
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, name: str, task: Callable[[Session], None]) -> None:
+        self._futures[name] = self._executor.submit(self._run, task)
+
+    def _once(
+        self, name: str, task: Callable[[Session], None]
+    ) -> Callable[[Session], None]:
+        return lambda session: seed(self.seed_dir, name, lambda: task(session))
+
+    @staticmethod
+    def _run(task: Callable[[Session], None]) -> None:
+        # ScopedSession отдаёт каждому потоку свою сессию
+        session = ScopedSession()
+        try:
+            task(session)
+        finally:
+            ScopedSession.remove()
+
+    def _token_manager(self, session: Session) -> TokenManager:
+        # фоновое обновление - забота менеджера из фикстуры token_manager
+        return TokenManager(
+            self.base_url,
+            TokenRepository(session),
+            self.http_client,
+            cache_dir=self.token_cache_dir,
+            background_refresh=False,
+        )
+
+    def _api_client(self, session: Session) -> ApiClient:
+        token_manager = self._token_manager(session)
+        return token_manager.http_client.with_auth(lambda: token_manager.auth_header)
+
+    def _location_manager(self, session: Session) -> LocationManager:
+        return LocationManager(
+            self._api_client(session),
+            CityRepository(session),
+            DeliveryPointRepository(session),
+            points_mode=self.points_mode,
+        )
+
+    def _load_token(self, session: Session) -> None:
+        _ = self._token_manager(session).token
+
+    def _load_cities(self, session: Session) -> None:
+        self.wait("token")
+        self._location_manager(session).get_city_payloads()
+
+    def _load_delivery_modes(self, session: Session) -> None:
+        self.wait("token")
+        TariffCalculator(
+            DeliveryModeRepository(session), self._api_client(session)
+        ).get_delivery_mode_payload_list()
+
+    def _load_delivery_points(self, session: Session) -> None:
+        self.wait("cities")
+        self._location_manager(session).prefetch_points()
+
+
+warmup_key = pytest.StashKey[WarmUp]()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--warmup",
+        action="store_true",
+        default=False,
+        help="Load token and reference data in background threads at session start",
+    )
+
+
+def pytest_sessionstart(session):
+    config = session.config
+    # под xdist прогревать нужно воркеры, а не управляющий процесс
+    if not config.getoption("warmup") or config.pluginmanager.has_plugin("dsession"):
+        return
+    warmup = WarmUp(
+        URL(os.getenv("API_BASE_URL")),
+        points_mode=config.getoption("delivery_points"),
+        # пул соединений общий с фикстурами
+        http_client=get_http_client(config),
+        token_cache_dir=state_dir(config, TOKEN_CACHE_DIR),
+        seed_dir=get_seed_dir(config),
+    )
+    warmup.start()
+    config.stash[warmup_key] = warmup
+
+
+def pytest_sessionfinish(session):
+    warmup = session.config.stash.get(warmup_key, None)
+    if warmup is not None:
+        warmup.shutdown()
+
+
+@pytest.fixture(scope="session")
+def warmup(pytestconfig: pytest.Config, api_base_url: URL) -> WarmUp:
+    # без --warmup задачи не запущены и wait() сразу возвращает False
+    return pytestconfig.stash.get(warmup_key, WarmUp(api_base_url))
@@ -0,0 +1,158 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+import requests
+from requests.adapters import BaseAdapter
+
+from tests.api.cassettes import interaction_key, normalize_url
+from tests.api.constants import HTTP_CACHE_MAX_RESPONSE_MB
+from tests.api.response_store import dump_response, load_response, open_sqlite
+
+
+class HttpCacheStore:
+    """Кэш GET-ответов в sqlite, общий для воркеров xdist, с LRU-вытеснением по размеру"""
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._connection = open_sqlite(self.path)
+        self._lock = threading.Lock()
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                status INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+            """
+        )
+
+    def get(self, key: str):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT stored_at, etag, last_modified, status, reason, headers, body "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def touch(self, key: str, revalidated: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._connection.execute(
+                    "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                    (now, now, key),
+                )
+            else:
+                self._connection.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+
+    def put(self, key: str, response: requests.Response) -> None:
+        status, reason, headers, body = dump_response(response)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    normalize_url(response.request.url),
+                    now,
+                    now,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    status,
+                    reason,
+                    headers,
+                    body,
+                    len(body),
+                ),
+            )
+            # давно не читанные ответы сверх лимита удаляются одним запросом
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY accessed_at DESC ROWS UNBOUNDED PRECEDING) AS total "
+                "FROM responses) WHERE total > ?)",
+                (self.max_bytes,),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class CachingAdapter(BaseAdapter):
+    """Транспорт requests с кэшем GET-ответов справочных эндпоинтов.
+
+    Свежий по TTL ответ отдаётся без запроса, устаревший перепроверяется
+    через If-None-Match/If-Modified-Since, остальные запросы уходят в
+    transport без изменений. Потоковые (stream=True) и большие ответы не
+    сохраняются.
+    """
+
+    def __init__(
+        self,
+        store: HttpCacheStore,
+        transport: BaseAdapter,
+        ttl: Callable[[str], float | None],
+        max_response_bytes: int = HTTP_CACHE_MAX_RESPONSE_MB * 1024 * 1024,
+    ) -> None:
+        super().__init__()
+        self.store = store
+        self.transport = transport
+        # url -> время жизни ответа в секундах или None, если не кэшируем
+        self.ttl = ttl
+        self.max_response_bytes = max_response_bytes
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        ttl = self.ttl(request.url)
+        if request.method != "GET" or ttl is None:
+            return self.transport.send(request, *args, **kwargs)
+        # справочники одинаковы для любой учётной записи, поэтому токен
+        # в ключ не входит
+        key = interaction_key(request)
+        cached = self.store.get(key)
+        if cached is not None:
+            stored_at, etag, last_modified, *response_row = cached
+            if time.time() - stored_at < ttl:
+                self.store.touch(key)
+                return load_response(request, *response_row)
+            if etag or last_modified:
+                request = request.copy()
+                if etag:
+                    request.headers["If-None-Match"] = etag
+                if last_modified:
+                    request.headers["If-Modified-Since"] = last_modified
+        response = self.transport.send(request, *args, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            self.store.touch(key, revalidated=True)
+            return load_response(request, *response_row)
+        if self._storable(response, kwargs.get("stream", args[0] if args else False)):
+            self.store.put(key, response)
+        return response
+
+    def _storable(self, response: requests.Response, stream: bool) -> bool:
+        if response.status_code != 200 or "no-store" in response.headers.get(
+            "Cache-Control", ""
+        ):
+            return False
+        # потоковый ответ читает вызывающий код по частям, сохранение
+        # прочитало бы его в память целиком
+        if stream:
+            return False
+        return len(response.content) <= self.max_response_bytes
+
+    def close(self) -> None:
+        self.transport.close()
+        self.store.close()
@@ -0,0 +1,67 @@
+import codecs
+import json
+from typing import Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789.eE+-"
+
+
+def iter_json_array(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator:
+    """Поэлементный разбор JSON-массива верхнего уровня из потока байт.
+
+    В памяти держится только текущий кусок потока и один элемент массива.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    started = False
+    finished = False
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        buffer, started, finished, items = _drain(decoder, buffer, started)
+        yield from items
+        if finished:
+            return
+    buffer += text_decoder.decode(b"", final=True)
+    buffer, started, finished, items = _drain(decoder, buffer + " ", started)
+    yield from items
+    if not finished:
+        raise ValueError("Unexpected end of JSON array stream")
+
+
+def _drain(decoder: json.JSONDecoder, buffer: str, started: bool):
+    items = []
+    pos = 0
+    while True:
+        pos = _skip(buffer, pos, WHITESPACE)
+        if pos == len(buffer):
+            break
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError(f"Expected JSON array, got {buffer[pos]!r}")
+            started = True
+            pos += 1
+            continue
+        pos = _skip(buffer, pos, WHITESPACE + ",")
+        if pos == len(buffer):
+            break
+        if buffer[pos] == "]":
+            return "", started, True, items
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # элемент ещё не дочитан из потока
+            break
+        if _skip(buffer, end, NUMBER_CHARS) == len(buffer):
+            # число в конце куска может продолжиться в следующем:
+            # "12" из "12.5" или "1" из "1e3"
+            break
+        items.append(item)
+        pos = end
+    return buffer[pos:], started, False, items
+
+
+def _skip(buffer: str, pos: int, chars: str) -> int:
+    while pos < len(buffer) and buffer[pos] in chars:
+        pos += 1
+    return pos
@@ -0,0 +1,83 @@
+from collections import Counter
+from typing import Dict
+import pytest
+from xdist.scheduler import LoadScheduling
+
+from tests.api.concurrent_scheduling import FamilyBatching
+from tests.api.durations import DurationStore, lpt_makespan
+
+# воркер запускает тест, только когда знает следующий (или получил shutdown)
+NODE_QUEUE = 2
+
+
+class ConcurrentLoadScheduling(FamilyBatching, LoadScheduling):
+    """Обычная раздача xdist (--dist load), но concurrent-тесты не делятся между воркерами"""
+
+
+class LPTScheduling(FamilyBatching, LoadScheduling):
+    """Раздача тестов воркерам xdist по убыванию ожидаемой длительности.
+
+    Очередь отсортирована по оценкам DurationStore, освободившийся воркер
+    берёт самый длинный из оставшихся тестов (LPT). Оценки уточняются по
+    ходу запуска: store обновляется из pytest_runtest_logreport, и после
+    каждого теста очередь пересортировывается.
+    """
+
+    def __init__(self, config: pytest.Config, log, store: DurationStore) -> None:
+        super().__init__(config, log)
+        self.store = store
+        self.predicted_makespan = None
+        self.estimate_sources = Counter()
+        self.node_busy_s: Dict[str, float] = {}
+
+    def schedule(self) -> None:
+        assert self.collection_is_completed
+        if self.collection is not None:
+            for node in self.nodes:
+                self.check_schedule(node)
+            return
+        if not self._check_nodes_have_same_collection():
+            self.log("**Different tests collected, aborting run**")
+            return
+        self.collection = next(iter(self.node2collection.values()))
+        self.pending[:] = range(len(self.collection))
+        if not self.collection:
+            return
+
+        estimates = []
+        for nodeid in self.collection:
+            duration, source = self.store.estimate(nodeid)
+            estimates.append(duration)
+            self.estimate_sources[source] += 1
+        self.predicted_makespan = lpt_makespan(estimates, len(self.nodes))
+        self._sort_pending()
+        # по кругу, чтобы самые длинные тесты начали разные воркеры
+        for _ in range(NODE_QUEUE):
+            for node in self.nodes:
+                self._send_tests(node, 1)
+        if not self.pending:
+            for node in self.nodes:
+                node.shutdown()
+
+    def mark_test_complete(self, node, item_index: int, duration: float = 0) -> None:
+        worker = node.gateway.id
+        self.node_busy_s[worker] = self.node_busy_s.get(worker, 0.0) + duration
+        self._sort_pending()
+        super().mark_test_complete(node, item_index, duration)
+
+    def check_schedule(self, node, duration: float = 0) -> None:
+        if node.shutting_down:
+            return
+        if self.pending:
+            self._send_tests(node, max(NODE_QUEUE - len(self.node2pending[node]), 0))
+        else:
+            node.shutdown()
+
+    @property
+    def actual_makespan(self) -> float:
+        return max(self.node_busy_s.values(), default=0.0)
+
+    def _sort_pending(self) -> None:
+        self.pending.sort(
+            key=lambda index: self.store.estimate(self.collection[index])[0], reverse=True
+        )
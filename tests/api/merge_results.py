@@ -0,0 +1,178 @@
+"""Сведение результатов шардов (--shard i/N) в один отчёт.
+
+    python -m tests.api.merge_results allure-results shard-1/allure-results shard-2/allure-results \\
+        --durations shard-1/durations.json shard-2/durations.json \\
+        --durations-base durations.json --durations-output durations.json
+
+Файлы allure копируются в общий каталог; одинаковые файлы пишутся один
+раз, а при совпадении имён с разным содержимым файл получает новый uuid,
+и ссылки на него в результатах и контейнерах шарда переписываются.
+"""
+import argparse
+import json
+import re
+import shutil
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from tests.api.file_lock import write_atomic
+
+ALLURE_FILE = re.compile(r"^(?P<uuid>.+)-(?P<kind>result\.json|container\.json|attachment.*)$")
+
+
+class AllureMerger:
+    def __init__(self, output: Path) -> None:
+        self.output = Path(output)
+        self.stats = Counter()
+        self._environment: Dict[str, List[str]] = defaultdict(list)
+        self._categories: Dict[str, dict] = {}
+
+    def add_shard(self, shard: Path) -> None:
+        shard = Path(shard)
+        renamed: Dict[str, str] = {}
+        json_files = []
+        for path in sorted(shard.iterdir()):
+            if path.is_dir():
+                # history из прошлого отчёта: берём первую копию
+                shutil.copytree(path, self.output / path.name, dirs_exist_ok=True)
+            elif path.name == "environment.properties":
+                self._add_environment(path)
+            elif path.name == "categories.json":
+                for category in json.loads(path.read_bytes()):
+                    self._categories.setdefault(category.get("name"), category)
+            elif path.name == "executor.json":
+                # запуск один, хватит описания первого шарда
+                if not (self.output / path.name).exists():
+                    shutil.copyfile(path, self.output / path.name)
+            elif path.name.endswith(("-result.json", "-container.json")):
+                json_files.append(path)
+            else:
+                self._copy(path.name, path.read_bytes(), renamed)
+        # имена вложений известны, переписываем ссылки и копируем JSON;
+        # результаты раньше контейнеров, которые ссылаются на них в children
+        json_files.sort(key=lambda path: path.name.endswith("-container.json"))
+        for path in json_files:
+            data = json.loads(path.read_bytes())
+            match = ALLURE_FILE.match(path.name)
+            new_uuid = self._free_uuid(path.name, match, data, renamed)
+            self._rewrite(data, renamed)
+            content = json.dumps(data, ensure_ascii=False).encode()
+            self._copy(f"{new_uuid}-{match['kind']}", content, renamed)
+
+    def finish(self) -> None:
+        if self._environment:
+            lines = [f"{key}={', '.join(values)}" for key, values in self._environment.items()]
+            (self.output / "environment.properties").write_text("\n".join(lines) + "\n")
+        if self._categories:
+            (self.output / "categories.json").write_text(
+                json.dumps(list(self._categories.values()), ensure_ascii=False, indent=2)
+            )
+
+    def _free_uuid(self, name: str, match, data: dict, renamed: Dict[str, str]) -> str:
+        """uuid результата или контейнера, свободный в общем каталоге"""
+        old_uuid = match["uuid"]
+        target = self.output / name
+        if target.exists() and json.loads(target.read_bytes()) != self._rewritten(data, renamed):
+            new_uuid = str(uuid.uuid4())
+            renamed[old_uuid] = new_uuid
+            self.stats["renamed"] += 1
+            return new_uuid
+        return renamed.get(old_uuid, old_uuid)
+
+    def _rewritten(self, data: dict, renamed: Dict[str, str]) -> dict:
+        data = json.loads(json.dumps(data))
+        self._rewrite(data, renamed)
+        return data
+
+    def _rewrite(self, node, renamed: Dict[str, str]) -> None:
+        if isinstance(node, list):
+            for child in node:
+                self._rewrite(child, renamed)
+            return
+        if not isinstance(node, dict):
+            return
+        for key in ("uuid", "source"):
+            if node.get(key) in renamed:
+                node[key] = renamed[node[key]]
+        if isinstance(node.get("children"), list):
+            node["children"] = [renamed.get(child, child) for child in node["children"]]
+        for value in node.values():
+            if isinstance(value, (list, dict)):
+                self._rewrite(value, renamed)
+
+    def _copy(self, name: str, content: bytes, renamed: Dict[str, str]) -> None:
+        target = self.output / name
+        if target.exists():
+            if target.read_bytes() == content:
+                self.stats["duplicates"] += 1
+                return
+            match = ALLURE_FILE.match(name)
+            if match is None:
+                raise ValueError(f"Conflicting {name} in shards, can't rename it")
+            # другое вложение с тем же именем: новое имя и ссылка на него
+            new_name = f"{uuid.uuid4()}-{match['kind']}"
+            renamed[name] = new_name
+            target = self.output / new_name
+            self.stats["renamed"] += 1
+        target.write_bytes(content)
+        self.stats["files"] += 1
+
+    def _add_environment(self, path: Path) -> None:
+        for line in path.read_text().splitlines():
+            key, sep, value = line.partition("=")
+            if sep and value.strip() not in self._environment[key.strip()]:
+                self._environment[key.strip()].append(value.strip())
+
+
+def merge_durations(paths: List[Path], base: Path | None = None) -> Dict[str, float]:
+    """Длительности из файлов шардов.
+
+    Каждый шард сохраняет весь файл, но обновляет только свои тесты:
+    берётся значение, отличное от base, иначе среднее по шардам.
+    """
+    base_durations = json.loads(Path(base).read_bytes()) if base and Path(base).exists() else {}
+    values: Dict[str, List[float]] = defaultdict(list)
+    changed: Dict[str, List[float]] = defaultdict(list)
+    for path in paths:
+        for nodeid, duration in json.loads(Path(path).read_bytes()).items():
+            values[nodeid].append(duration)
+            if base_durations.get(nodeid) != duration:
+                changed[nodeid].append(duration)
+    return {
+        nodeid: sum(changed.get(nodeid) or found) / len(changed.get(nodeid) or found)
+        for nodeid, found in values.items()
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path, help="Merged allure-results directory")
+    parser.add_argument("shards", type=Path, nargs="*", help="allure-results of shards")
+    parser.add_argument("--durations", type=Path, nargs="*", default=[])
+    parser.add_argument("--durations-base", type=Path, default=None)
+    parser.add_argument("--durations-output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    if args.shards:
+        args.output.mkdir(parents=True, exist_ok=True)
+        merger = AllureMerger(args.output)
+        for shard in args.shards:
+            merger.add_shard(shard)
+        merger.finish()
+        print(
+            f"{args.output}: {merger.stats['files']} files from {len(args.shards)} shards, "
+            f"{merger.stats['duplicates']} duplicates skipped, {merger.stats['renamed']} renamed"
+        )
+    if args.durations:
+        durations = merge_durations(args.durations, args.durations_base)
+        output = args.durations_output or args.durations_base
+        if output is None:
+            parser.error("--durations needs --durations-output or --durations-base")
+        write_atomic(output, json.dumps(durations, indent=2, sort_keys=True).encode())
+        print(f"{output}: durations of {len(durations)} tests")
+
+
+if __name__ == "__main__":
+    main()
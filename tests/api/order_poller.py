@@ -0,0 +1,212 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+import requests
+
+from tests.api.api_client import ApiClient
+from tests.api.constants import (
+    ORDER_CLAIM_TIMEOUT_S,
+    ORDER_POLL_CONCURRENCY,
+    ORDER_POLL_INITIAL_S,
+    ORDER_POLL_MAX_S,
+    ORDER_WATCH_TIMEOUT_S,
+)
+
+# заказа нет у API: 404 на GET v2/orders/{uuid}
+NOT_FOUND = "NOT_FOUND"
+FINAL_STATES = ("SUCCESSFUL", "INVALID", NOT_FOUND)
+
+
+class OrderStatus(NamedTuple):
+    state: str
+    cdek_number: str | None = None
+
+    @property
+    def final(self) -> bool:
+        return self.state in FINAL_STATES
+
+
+def order_status(body: dict) -> OrderStatus:
+    state = body["requests"][0]["state"]
+    cdek_number = body["entity"].get("cdek_number")
+    if state == "SUCCESSFUL" and not cdek_number:
+        # номер СДЕК присваивается позже; без него заказ ещё не готов
+        state = "WAITING"
+    return OrderStatus(state, cdek_number)
+
+
+@dataclass
+class _Tracked:
+    deadline: float
+    attempt: int = 0
+
+
+class OrderStatePoller:
+    """Один цикл опроса состояний заказов на процесс.
+
+    Каждый uuid опрашивается с экспоненциальной задержкой и jitter до
+    конечного состояния или дедлайна. Все uuid, у которых подошёл срок,
+    опрашиваются одной пачкой параллельно (у API нет запроса состояний
+    нескольких заказов), ожидающие wait() просыпаются сразу после ответа.
+    publish() принимает состояние извне (вебхук) и будит их без опроса.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = ORDER_POLL_CONCURRENCY,
+        initial_s: float = ORDER_POLL_INITIAL_S,
+        max_s: float = ORDER_POLL_MAX_S,
+        on_update: Callable[[], None] | None = None,
+    ) -> None:
+        self.concurrency = concurrency
+        self.initial_s = initial_s
+        self.max_s = max_s
+        self.on_update = on_update
+        self.last_error: Exception | None = None
+        self._cond = threading.Condition()
+        self._due: List[Tuple[float, str]] = []
+        self._tracked: Dict[str, _Tracked] = {}
+        self._statuses: Dict[str, OrderStatus] = {}
+        self._stopped = False
+        self._api_client = None
+        self._executor = None
+        self._thread = None
+
+    def start(self, api_client: ApiClient) -> None:
+        self._api_client = api_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="order-poller"
+        )
+        self._thread = threading.Thread(target=self._run, name="order-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+            self._thread = None
+
+    def status(self, uuid: str) -> OrderStatus | None:
+        with self._cond:
+            return self._statuses.get(uuid)
+
+    def watch(self, uuid: str, timeout_s: float = ORDER_WATCH_TIMEOUT_S) -> None:
+        """Опрашивать заказ не дольше timeout_s, результат смотреть в status()"""
+        with self._cond:
+            self._track(uuid, time.monotonic() + timeout_s)
+
+    def wait(
+        self,
+        uuid: str,
+        states: Iterable[str],
+        timeout_s: float = ORDER_CLAIM_TIMEOUT_S,
+    ) -> OrderStatus:
+        """Состояние заказа, как только оно попадёт в states или станет конечным"""
+        states = tuple(states)
+        deadline = time.monotonic() + timeout_s
+        with self._cond:
+            self._track(uuid, deadline)
+            while True:
+                status = self._statuses.get(uuid)
+                if status is not None and (status.state in states or status.final):
+                    return status
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"Order {uuid} not in states {states} within {timeout_s}s, "
+                        f"last status: {status}, last poll error: {self.last_error!r}"
+                    )
+                self._cond.wait(remaining)
+
+    def publish(self, uuid: str, status: OrderStatus) -> None:
+        """Состояние из события: ожидающие просыпаются, опрос остаётся запасным"""
+        with self._cond:
+            updated = self._set_status(uuid, status)
+            self._cond.notify_all()
+        if updated and self.on_update is not None:
+            self.on_update()
+
+    def _track(self, uuid: str, deadline: float) -> None:
+        status = self._statuses.get(uuid)
+        if status is not None and status.final:
+            return
+        tracked = self._tracked.get(uuid)
+        if tracked is not None:
+            tracked.deadline = max(tracked.deadline, deadline)
+            return
+        self._tracked[uuid] = _Tracked(deadline)
+        heapq.heappush(self._due, (time.monotonic(), uuid))
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            statuses = list(self._executor.map(self._poll, batch))
+            with self._cond:
+                updated = [self._record(uuid, status) for uuid, status in zip(batch, statuses)]
+                self._cond.notify_all()
+            if any(updated) and self.on_update is not None:
+                self.on_update()
+
+    def _next_batch(self) -> List[str] | None:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                now = time.monotonic()
+                batch = []
+                while self._due and self._due[0][0] <= now:
+                    _, uuid = heapq.heappop(self._due)
+                    tracked = self._tracked.get(uuid)
+                    if tracked is None:
+                        # конечное состояние пришло через publish()
+                        continue
+                    if now < tracked.deadline:
+                        batch.append(uuid)
+                    else:
+                        # дедлайн вышел: ожидающие сами завершатся по своему
+                        del self._tracked[uuid]
+                if batch:
+                    return batch
+                self._cond.wait(self._due[0][0] - now if self._due else None)
+
+    def _poll(self, uuid: str) -> OrderStatus | None:
+        try:
+            response = self._api_client.get(url=self._api_client.endpoints.order(uuid))
+            if response.status_code == 404:
+                return OrderStatus(NOT_FOUND)
+            response.raise_for_status()
+            return order_status(response.json())
+        except (requests.RequestException, ValueError, LookupError) as e:
+            # повторим по обычному расписанию
+            self.last_error = e
+            return None
+
+    def _record(self, uuid: str, status: OrderStatus | None) -> bool:
+        updated = status is not None and self._set_status(uuid, status)
+        tracked = self._tracked.get(uuid)
+        if tracked is None:
+            return updated
+        delay = min(self.max_s, self.initial_s * 2**tracked.attempt)
+        tracked.attempt += 1
+        heapq.heappush(self._due, (time.monotonic() + random.uniform(delay / 2, delay), uuid))
+        return updated
+
+    def _set_status(self, uuid: str, status: OrderStatus) -> bool:
+        current = self._statuses.get(uuid)
+        # опрос и событие могут прийти в любом порядке, конечное не откатываем
+        if current == status or (current is not None and current.final):
+            return False
+        self._statuses[uuid] = status
+        if status.final:
+            self._tracked.pop(uuid, None)
+        return True
@@ -0,0 +1,183 @@
+import email.utils
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Tuple
+from requests.adapters import BaseAdapter
+
+from tests.api.constants import (
+    RATE_LIMIT_BACKOFF,
+    RATE_LIMIT_DEFAULT_RETRY_AFTER_S,
+    RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_RECOVERY_S,
+    RATE_LIMIT_RETRIES,
+)
+from tests.api.file_lock import SharedState
+
+# tat, base_rate, throttled_at, blocked_until, requests, waited_s, throttled
+BUCKET_STATE = struct.Struct("<ddddqdq")
+
+
+class RateLimit(NamedTuple):
+    rate: float  # запросов в секунду на все воркеры
+    burst: int
+
+
+class BucketStats(NamedTuple):
+    requests: int
+    waited_s: float
+    throttled: int
+    rate: float
+
+
+def parse_rate_limit(value: str) -> Tuple[str, RateLimit]:
+    """--rate-limit orders=5 или orders=5:10 -> ("orders", RateLimit(5.0, 10))"""
+    group, sep, spec = value.partition("=")
+    try:
+        rate, _, burst = spec.partition(":")
+        limit = RateLimit(float(rate), int(burst) if burst else max(int(float(rate)), 1))
+    except ValueError:
+        raise ValueError(f"Expected --rate-limit GROUP=RPS[:BURST], got {value!r}") from None
+    if not sep or not group or limit.rate <= 0 or limit.burst < 1:
+        raise ValueError(f"Expected --rate-limit GROUP=RPS[:BURST], got {value!r}")
+    return group, limit
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After в секундах или HTTP-датой -> сколько ждать"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class SharedTokenBucket:
+    """Token bucket группы эндпоинтов, общий для воркеров xdist.
+
+    Состояние - несколько чисел в файле, который читается и пишется под
+    FileLock. Запрос резервирует время отправки (GCRA): если запаса нет,
+    он ждёт вне блокировки ровно до своей очереди. После 429 все воркеры
+    ждут Retry-After, скорость умножается на RATE_LIMIT_BACKOFF и затем
+    растёт на свою величину за каждые RATE_LIMIT_RECOVERY_S до limit.rate.
+    """
+
+    def __init__(self, path: Path, limit: RateLimit) -> None:
+        self.limit = limit
+        # первый запрос группы: полный запас и скорость limit.rate
+        self.state = SharedState(path, BUCKET_STATE, [0.0, limit.rate, 0.0, 0.0, 0, 0.0, 0])
+
+    def acquire(self) -> float:
+        """Ждёт очереди на запрос, возвращает время ожидания"""
+
+        def reserve(state: list, now: float) -> float:
+            rate = self._rate(state, now)
+            tat = max(state[0], now)
+            wait = max(tat - self._tolerance(rate) - now, 0.0)
+            state[0] = tat + 1 / rate
+            state[4] += 1
+            state[5] += wait
+            return wait
+
+        wait = self.state.update(lambda state: reserve(state, time.time()))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after_s: float | None) -> None:
+        """Ответ 429: пауза для всех воркеров и снижение скорости"""
+        retry_after_s = RATE_LIMIT_DEFAULT_RETRY_AFTER_S if retry_after_s is None else retry_after_s
+
+        def slow_down(state: list, now: float) -> None:
+            # 429 на запросы, отправленные до паузы, скорость повторно не снижают
+            if now >= state[3]:
+                state[1] = max(self._rate(state, now) * RATE_LIMIT_BACKOFF, RATE_LIMIT_MIN_RPS)
+                state[2] = now
+            state[3] = max(state[3], now + retry_after_s)
+            state[0] = max(state[0], state[3] + self._tolerance(self._rate(state, now)))
+            state[6] += 1
+
+        self.state.update(lambda state: slow_down(state, time.time()))
+
+    def stats(self) -> BucketStats:
+        state = self.state.read()
+        return BucketStats(state[4], state[5], state[6], self._rate(state, time.time()))
+
+    def _rate(self, state: list, now: float) -> float:
+        recovered = state[1] * (1 + max(now - state[2], 0.0) / RATE_LIMIT_RECOVERY_S)
+        return min(self.limit.rate, recovered)
+
+    def _tolerance(self, rate: float) -> float:
+        return (self.limit.burst - 1) / rate
+
+
+class RateLimiter:
+    """Token bucket'ы групп эндпоинтов в каталоге, общем для воркеров"""
+
+    def __init__(
+        self,
+        directory: Path,
+        limits: Dict[str, RateLimit],
+        group: Callable[[str], str | None],
+    ) -> None:
+        self.directory = Path(directory)
+        # url -> группа эндпоинта или None, если запросы не ограничены
+        self.group = group
+        self.buckets = {
+            name: SharedTokenBucket(self.directory / f"{name}.bucket", limit)
+            for name, limit in limits.items()
+        }
+
+    def bucket(self, url: str) -> SharedTokenBucket | None:
+        return self.buckets.get(self.group(url))
+
+    def reset(self) -> None:
+        """Новый запуск начинает с полного запаса и без счётчиков прошлого"""
+        for bucket in self.buckets.values():
+            bucket.state.reset()
+
+    def stats(self) -> Dict[str, BucketStats]:
+        return {
+            name: bucket.stats()
+            for name, bucket in self.buckets.items()
+            if bucket.state.path.exists()
+        }
+
+
+class RateLimitingAdapter(BaseAdapter):
+    """Транспорт requests, который держит темп запросов в пределах лимитов.
+
+    На 429 запрос повторяется до retries раз после паузы из Retry-After:
+    сервер его не обработал, поэтому повтор безопасен и для POST.
+    """
+
+    def __init__(
+        self, limiter: RateLimiter, transport: BaseAdapter, retries: int = RATE_LIMIT_RETRIES
+    ) -> None:
+        super().__init__()
+        self.limiter = limiter
+        self.transport = transport
+        self.retries = retries
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        bucket = self.limiter.bucket(request.url)
+        if bucket is None:
+            return self.transport.send(request, *args, **kwargs)
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            response = self.transport.send(request, *args, **kwargs)
+            if response.status_code != 429:
+                return response
+            bucket.throttled(parse_retry_after(response.headers.get("Retry-After")))
+            if attempt < self.retries:
+                response.close()
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
@@ -0,0 +1,174 @@
+"""Инкрементальная синхронизация справочников cities и delivery_points с API.
+
+    python -m tests.api.reference_sync [--force] [--snapshot PATH]
+
+Каждая строка хэшируется (content_hash), в базу пишутся только новые и
+изменившиеся строки, пропавшие из API удаляются. Время и итоги
+синхронизации записываются в sync_state.
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+from yarl import URL
+
+from database.models import CityModel, DeliveryPointModel
+from database.repository import (
+    CityRepository,
+    DeliveryPointRepository,
+    SyncStateRepository,
+    TokenRepository,
+    table_row,
+)
+from database.snapshot import write_snapshot
+from tests.api.api_client import ApiClient
+from tests.api.fixtures.token_manager import TokenManager
+from tests.api.constants import (
+    DELIVERY_POINTS_BATCH_SIZE,
+    REFERENCE_SYNC_INTERVAL_S,
+    STREAM_CHUNK_SIZE,
+)
+from tests.api.json_stream import iter_json_array
+
+
+@dataclass
+class TableSync:
+    name: str
+    rows: int = 0
+    upserted: int = 0
+    deleted: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.upserted or self.deleted)
+
+
+class ReferenceSync:
+    def __init__(
+        self,
+        api_client: ApiClient,
+        session: Session,
+        batch_size: int = DELIVERY_POINTS_BATCH_SIZE,
+    ) -> None:
+        self.api_client = api_client
+        self.session = session
+        self.batch_size = batch_size
+        self.city_repo = CityRepository(session)
+        self.point_repo = DeliveryPointRepository(session)
+        self.state_repo = SyncStateRepository(session)
+
+    def is_due(self, interval_s: float = REFERENCE_SYNC_INTERVAL_S) -> bool:
+        state = self.state_repo.get("delivery_points")
+        if state is None:
+            return True
+        return datetime.now() - state.synced_at >= timedelta(seconds=interval_s)
+
+    def sync(self) -> List[TableSync]:
+        """Одна транзакция: города, офисы, затем удаление пропавших строк"""
+        try:
+            cities = TableSync("cities")
+            stored_cities = self.city_repo.get_content_hashes()
+            city_rows = [table_row(CityModel, city) for city in self._stream("cities")]
+            city_codes = {row["code"] for row in city_rows}
+            cities.rows = len(city_rows)
+            self.city_repo.upsert_cities(
+                self._changed(city_rows, "city_uuid", stored_cities, cities),
+                self.batch_size,
+            )
+
+            points = TableSync("delivery_points")
+            stored_points = self.point_repo.get_content_hashes()
+            point_rows = self._point_rows(city_codes, points)
+            self.point_repo.upsert_points(
+                self._changed(point_rows, "code", stored_points, points),
+                self.batch_size,
+            )
+
+            # после обхода в stored_* остались только ключи, которых нет в API;
+            # офисы удаляются раньше городов из-за внешнего ключа
+            points.deleted = len(stored_points)
+            self.point_repo.delete_by_codes(list(stored_points), self.batch_size)
+            cities.deleted = len(stored_cities)
+            self.city_repo.delete_by_uuids(list(stored_cities), self.batch_size)
+
+            for table in (cities, points):
+                self.state_repo.record(table.name, table.rows, table.upserted, table.deleted)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return [cities, points]
+
+    @staticmethod
+    def _changed(
+        rows, key: str, stored: Dict[str, str | None], table: TableSync
+    ) -> Iterator[dict]:
+        for row in rows:
+            if stored.pop(row[key], None) != row["content_hash"]:
+                table.upserted += 1
+                yield row
+
+    def _point_rows(self, city_codes: set, table: TableSync) -> Iterator[dict]:
+        for point in self._stream("delivery_points"):
+            city_code = (point.get("location") or {}).get("city_code")
+            # как и в prefetch: офисы городов, которых нет в cities, не пройдут внешний ключ
+            if city_code in city_codes:
+                table.rows += 1
+                yield table_row(DeliveryPointModel, {**point, "city_code": city_code})
+
+    def _stream(self, endpoint: str) -> Iterator[dict]:
+        url = getattr(self.api_client.endpoints, endpoint)()
+        with self.api_client.get(url=url, stream=True) as response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
+def sync_reference(
+    api_client: ApiClient,
+    session: Session,
+    force: bool = False,
+    snapshot_path: Path | None = None,
+) -> List[TableSync]:
+    """Синхронизация, если прошло REFERENCE_SYNC_INTERVAL_S, и перезапись снимка"""
+    reference_sync = ReferenceSync(api_client, session)
+    if not force and not reference_sync.is_due():
+        return []
+    tables = reference_sync.sync()
+    snapshot_path = Path(snapshot_path) if snapshot_path else None
+    # время синхронизации есть в отметке снимка: без перезаписи он устарел бы
+    if snapshot_path is not None and snapshot_path.exists():
+        write_snapshot(session, snapshot_path)
+    return tables
+
+
+def main(argv=None) -> None:
+    # engine создаётся при импорте из DB_URL, поэтому после load_dotenv()
+    from database.db_session import ScopedSession  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="Ignore sync interval")
+    parser.add_argument("--snapshot", type=Path, default=None, help="Reference snapshot to rewrite")
+    args = parser.parse_args(argv)
+
+    session = ScopedSession()
+    base_url = URL(os.getenv("API_BASE_URL"))
+    token_manager = TokenManager(base_url, TokenRepository(session), background_refresh=False)
+    api_client = token_manager.http_client.with_auth(lambda: token_manager.auth_header)
+    try:
+        tables = sync_reference(api_client, session, args.force, args.snapshot)
+    finally:
+        api_client.close()
+        ScopedSession.remove()
+    if not tables:
+        print("Reference data is up to date, use --force to sync anyway")
+    for table in tables:
+        print(f"{table.name}: {table.rows} rows, {table.upserted} upserted, {table.deleted} deleted")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
@@ -0,0 +1,59 @@
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Tuple
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+SQLITE_TIMEOUT_S = 30
+# urllib3 уже распаковал тело, а длина после распаковки другая
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def open_sqlite(path: Path) -> sqlite3.Connection:
+    """sqlite-файл, который одновременно читают и пишут несколько воркеров xdist"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(
+        path, timeout=SQLITE_TIMEOUT_S, check_same_thread=False, isolation_level=None
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def dump_response(response: requests.Response) -> Tuple[int, str, str, bytes]:
+    """status, reason, заголовки в JSON и сжатое тело для записи в sqlite"""
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name.lower() not in DROPPED_HEADERS
+    }
+    return (
+        response.status_code,
+        response.reason or "",
+        json.dumps(headers, ensure_ascii=False),
+        zlib.compress(response.content),
+    )
+
+
+def load_response(
+    request: requests.PreparedRequest,
+    status: int,
+    reason: str,
+    headers: str,
+    body: bytes,
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(json.loads(headers))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    # тело уже в памяти: iter_content/json() работают как после чтения потока
+    response._content = zlib.decompress(body)  # pylint: disable=protected-access
+    response._content_consumed = True  # pylint: disable=protected-access
+    return response
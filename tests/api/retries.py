@@ -0,0 +1,162 @@
+import random
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple
+import requests
+from requests.adapters import BaseAdapter
+
+from tests.api.circuit_breaker import CircuitBreakers, CircuitOpenError
+from tests.api.constants import (
+    RETRY_BUDGET,
+    RETRY_BUDGET_RATIO,
+    RETRY_MAX_BACKOFF_S,
+    RETRY_STATUSES,
+)
+from tests.api.file_lock import SharedState
+
+# повтор этих запросов не меняет результат, даже если первый дошёл до сервера
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# tokens, retries, denied
+BUDGET_STATE = struct.Struct("<dqq")
+# не общий random: в режиме кассет его зерно задаёт данные тестов
+jitter = random.Random()
+
+
+class RetryPolicy(NamedTuple):
+    attempts: int  # всего, вместе с первой
+    backoff_s: float  # пауза перед первым повтором, дальше вдвое больше
+    # POST и PATCH эндпоинта ничего не меняют и повторяются как GET
+    idempotent: bool = False
+
+
+class RetryBudget:
+    """Общий для воркеров запас повторов.
+
+    Повтор тратит токен, каждый запрос добавляет ratio токена, но не выше
+    budget. Когда API лежит целиком, повторы быстро кончаются и не
+    умножают время ожидания на число попыток.
+    """
+
+    def __init__(
+        self, path: Path, budget: float = RETRY_BUDGET, ratio: float = RETRY_BUDGET_RATIO
+    ) -> None:
+        self.budget = budget
+        self.ratio = ratio
+        self.state = SharedState(path, BUDGET_STATE, [budget, 0, 0])
+        # пополнение копится в процессе и пишется в файл пачкой
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._pending += 1
+            flush = self._pending * self.ratio >= 1
+        if flush:
+            self._update(0)
+
+    def withdraw(self) -> bool:
+        return self._update(1)
+
+    def stats(self) -> tuple:
+        """Повторов сделано и отклонено бюджетом"""
+        state = self.state.read()
+        return state[1], state[2]
+
+    def reset(self) -> None:
+        self.state.reset()
+
+    def _update(self, cost: int) -> bool:
+        with self._lock:
+            pending, self._pending = self._pending, 0
+
+        def change(state: list) -> bool:
+            state[0] = min(self.budget, state[0] + pending * self.ratio)
+            if not cost:
+                return True
+            if state[0] < cost:
+                state[2] += 1
+                return False
+            state[0] -= cost
+            state[1] += 1
+            return True
+
+        return self.state.update(change)
+
+
+class RetryingAdapter(BaseAdapter):
+    """Транспорт requests с повторами по политике эндпоинта и размыкателями.
+
+    Ошибка - 5xx из RETRY_STATUSES, таймаут или обрыв соединения. POST и
+    PATCH эндпоинтов, которые меняют данные, повторяются, только если
+    соединение не установилось. Пока размыкатель эндпоинта открыт, запросы
+    сразу падают с CircuitOpenError. Размыкатель получает один исход на
+    запрос, после всех его попыток.
+    """
+
+    def __init__(
+        self,
+        transport: BaseAdapter,
+        policies: Dict[str, RetryPolicy],
+        endpoint: Callable[[str], str | None],
+        budget: RetryBudget,
+        breakers: CircuitBreakers | None = None,
+    ) -> None:
+        super().__init__()
+        self.transport = transport
+        self.policies = policies
+        # url -> префикс эндпоинта из policies или None
+        self.endpoint = endpoint
+        self.budget = budget
+        self.breakers = breakers
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        endpoint = self.endpoint(request.url)
+        if endpoint is None:
+            return self.transport.send(request, *args, **kwargs)
+        policy = self.policies[endpoint]
+        breaker = self.breakers.get(request.url) if self.breakers is not None else None
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(
+                f"Circuit breaker of {endpoint} is open after repeated failures, "
+                f"{request.method} {request.url} was not sent",
+                request=request,
+            )
+        self.budget.deposit()
+        for attempt in range(policy.attempts):
+            response = error = None
+            try:
+                response = self.transport.send(request, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            failed = error is not None or response.status_code in RETRY_STATUSES
+            if (
+                not failed
+                or attempt + 1 == policy.attempts
+                or not self._retryable(request, error, policy)
+                # размыкатель открыли другие запросы: эндпоинт лежит
+                or (breaker is not None and breaker.stats().state == "open")
+                or not self.budget.withdraw()
+            ):
+                break
+            if response is not None:
+                response.close()
+            backoff_s = min(policy.backoff_s * 2**attempt, RETRY_MAX_BACKOFF_S)
+            time.sleep(jitter.uniform(backoff_s / 2, backoff_s))
+        if breaker is not None:
+            # один исход на запрос: его повторы не приближают размыкание
+            breaker.record(not failed)
+        if error is not None:
+            raise error
+        return response
+
+    @staticmethod
+    def _retryable(request, error: Exception | None, policy: RetryPolicy) -> bool:
+        if policy.idempotent or request.method in IDEMPOTENT_METHODS:
+            return True
+        # запрос точно не дошёл до сервера
+        return isinstance(error, requests.ConnectTimeout)
+
+    def close(self) -> None:
+        self.transport.close()
@@ -0,0 +1,42 @@
+import hashlib
+import heapq
+import json
+from typing import Callable, List, Sequence, Tuple
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """--shard i/N -> (i, N), шарды нумеруются с 1"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected --shard i/N, got {value!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard {value!r} out of range, expected 1 <= i <= N")
+    return index, count
+
+
+def partition(
+    nodeids: Sequence[str], count: int, weight: Callable[[str], float]
+) -> List[List[str]]:
+    """Разбиение тестов на count шардов с близкой суммарной длительностью.
+
+    Жадный LPT по (убыванию веса, nodeid): результат зависит только от
+    набора nodeid и весов, а не от порядка сбора, поэтому все машины
+    получают одно и то же разбиение.
+    """
+    weighted = sorted(
+        ((weight(nodeid), nodeid) for nodeid in set(nodeids)), key=lambda w: (-w[0], w[1])
+    )
+    shards: List[List[str]] = [[] for _ in range(count)]
+    loads = [(0.0, index) for index in range(count)]
+    for duration, nodeid in weighted:
+        load, index = heapq.heappop(loads)
+        shards[index].append(nodeid)
+        heapq.heappush(loads, (load + duration, index))
+    return shards
+
+
+def partition_key(nodeids: Sequence[str], weight: Callable[[str], float]) -> str:
+    """Отпечаток входа partition(): у всех шардов одного запуска должен совпадать"""
+    content = json.dumps(sorted((nodeid, weight(nodeid)) for nodeid in set(nodeids)))
+    return hashlib.sha256(content.encode()).hexdigest()[:12]
@@ -0,0 +1,609 @@
+"""Локальная замена СДЕК API для прогонов и замеров фреймворка без сети.
+
+    python -m tests.api.stand_in --port 8081 --latency lognormal:3:0.5 --error-rate 0.01
+
+Отдаёт синтетические справочники (или записанные ответы из кассеты),
+умеет задержки по распределению, ошибки 5xx, 429 с Retry-After,
+переводит заказы ACCEPTED -> WAITING -> SUCCESSFUL по времени и шлёт
+события ORDER_STATUS на зарегистрированные вебхуки.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+import requests
+
+from enums.city import City
+from enums.region import Region
+from tests.api.cassettes import CassetteStore, interaction_key
+
+TOKEN_LIFETIME_S = 3600
+STATS_PATH = "/_stand_in/stats"
+REFERENCE_PATHS = {
+    "v2/location/regions",
+    "v2/location/cities",
+    "v2/calculator/alltariffs",
+    "v2/deliverypoints",
+}
+# регионы городов из enums, чтобы поиск по региону в тестах находил их
+CITY_REGIONS = {
+    City.MOSCOW.value: "Москва",
+    City.SAINT_PETERSBURG.value: "Санкт-Петербург",
+    City.EKATERINBURG.value: "Свердловская область",
+    City.PSKOV.value: Region.PSKOV_REGION.value,
+}
+
+
+@dataclass
+class Latency:
+    """Задержка ответа: fixed:MS, uniform:LO:HI, exp:MEAN, lognormal:MU:SIGMA (мс)"""
+
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, *params = spec.split(":")
+        if kind.replace(".", "", 1).isdigit():
+            return cls("fixed", (float(kind),))
+        if kind not in ("fixed", "uniform", "exp", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        return cls(kind, tuple(float(param) for param in params))
+
+    def sample_s(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "exp":
+            ms = rng.expovariate(1 / self.params[0]) if self.params[0] else 0.0
+        else:
+            ms = rng.lognormvariate(*self.params)
+        return max(ms, 0.0) / 1000
+
+
+@dataclass
+class StandInConfig:
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_s: int = 1
+    # лимит запросов в секунду на сервер, сверх него 429 (0 - без лимита)
+    rate_limit_rps: float = 0.0
+    rate_limit_burst: int = 1
+    city_count: int = 200
+    points_per_city: int = 20
+    order_delay_s: float = 5.0
+    token_lifetime_s: int = TOKEN_LIFETIME_S
+    invalid_order_rate: float = 0.0
+    # доля событий вебхуков, которые не доставляются
+    webhook_loss_rate: float = 0.0
+    seed: int = 0
+    cassette_path: Path | None = None
+
+
+class StandInData:
+    """Детерминированные по seed справочники в формате ответов СДЕК"""
+
+    def __init__(self, config: StandInConfig) -> None:
+        rng = random.Random(config.seed)
+        regions = [region.value for region in Region]
+        names = [city.value for city in City]
+        names += [f"Город {number}" for number in range(len(names), config.city_count)]
+        self.cities = []
+        for code, name in enumerate(names, start=1):
+            region_code = rng.randint(1, 89)
+            self.cities.append(
+                {
+                    "city_uuid": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "code": code,
+                    "country_code": "RU",
+                    "city": name,
+                    "fias_guid": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "region": CITY_REGIONS.get(name) or rng.choice(regions),
+                    "region_code": region_code,
+                    "fias_region_guid": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "sub_region": None,
+                    "longitude": round(rng.uniform(20, 180), 6),
+                    "latitude": round(rng.uniform(41, 77), 6),
+                    "time_zone": "Europe/Moscow",
+                    "payment_limit": -1.0,
+                    "country": "Россия",
+                    "kladr_code": rng.randint(10**12, 10**13 - 1),
+                }
+            )
+        self.regions = [
+            {"country_code": "RU", "region": region, "region_code": code}
+            for code, region in enumerate(regions, start=1)
+        ]
+        self.points: List[dict] = []
+        self.points_by_city: Dict[int, List[dict]] = {}
+        for city in self.cities:
+            city_points = []
+            for number in range(config.points_per_city):
+                point = {
+                    "code": f"{city['code']}-{number}",
+                    "name": f"ПВЗ {city['city']} {number}",
+                    "uuid": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "work_time": "Пн-Вс 09:00-21:00",
+                    "phones": [{"number": "+78005553535"}],
+                    "type": rng.choice(["PVZ", "POSTAMAT"]),
+                    "owner_code": "CDEK",
+                    "take_only": False,
+                    "is_handout": True,
+                    "is_reception": True,
+                    "is_dressing_room": rng.random() < 0.5,
+                    "have_cashless": True,
+                    "have_cash": True,
+                    "allowed_cod": True,
+                    "weight_min": float(rng.choice([0, 0, 1, 2])),
+                    "weight_max": float(rng.choice([15, 30, 50, 0])),
+                    "location": {
+                        "country_code": "RU",
+                        "region_code": city["region_code"],
+                        "city_code": city["code"],
+                        "city": city["city"],
+                        "postal_code": f"{100000 + city['code']}",
+                        "longitude": city["longitude"],
+                        "latitude": city["latitude"],
+                        "address": f"ул. Тестовая, {number + 1}",
+                    },
+                }
+                city_points.append(point)
+            self.points_by_city[city["code"]] = city_points
+            self.points.extend(city_points)
+        self.tariffs = [
+            {
+                "tariff_name": f"Тариф {code}",
+                "weight_min": 0,
+                "weight_max": 30,
+                "delivery_modes": [
+                    {
+                        "delivery_mode": str(mode),
+                        "delivery_mode_name": f"Режим {mode}",
+                        "tariff_code": code * 10 + mode,
+                    }
+                    for mode in (1, 2)
+                ],
+            }
+            for code in range(1, 11)
+        ]
+
+
+class StandInState:
+    """Заказы, счётчики и источник случайности сервера"""
+
+    def __init__(self, config: StandInConfig) -> None:
+        self.config = config
+        self.data = StandInData(config)
+        self.cassette = CassetteStore(config.cassette_path) if config.cassette_path else None
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.orders: Dict[str, dict] = {}
+        self.orders_by_cdek_number: Dict[str, str] = {}
+        self.webhooks: Dict[str, dict] = {}
+        self.cassette_ordinals = Counter()
+        self.stats = Counter()
+        self.injected_latency_s = 0.0
+        self.tokens = float(config.rate_limit_burst)
+        self.tokens_at = time.monotonic()
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def take_token(self) -> float:
+        """0, если запрос укладывается в rate_limit_rps, иначе через сколько секунд придёт токен"""
+        rate = self.config.rate_limit_rps
+        if not rate:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.config.rate_limit_burst, self.tokens + (now - self.tokens_at) * rate
+            )
+            self.tokens_at = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / rate
+            self.tokens -= 1
+            return 0.0
+
+    def latency_s(self) -> float:
+        with self.lock:
+            delay = self.config.latency.sample_s(self.rng)
+            self.injected_latency_s += delay
+        return delay
+
+    def create_order(self, payload: dict) -> dict:
+        order_uuid = str(uuid.uuid4())
+        with self.lock:
+            invalid = self.rng.random() < self.config.invalid_order_rate
+            self.orders[order_uuid] = {
+                "uuid": order_uuid,
+                "created_at": time.monotonic(),
+                "invalid": invalid,
+                "payload": payload,
+                "cdek_number": None,
+            }
+            has_webhooks = any(w["type"] == "ORDER_STATUS" for w in self.webhooks.values())
+        if has_webhooks:
+            # событие в момент, когда заказ станет INVALID или SUCCESSFUL
+            delay = self.config.order_delay_s / 2 if invalid else self.config.order_delay_s
+            timer = threading.Timer(delay, self.post_order_status, (order_uuid,))
+            timer.daemon = True
+            timer.start()
+        return self.order_body(order_uuid)
+
+    def order_state(self, order: dict) -> str:
+        if order["invalid"]:
+            return "INVALID"
+        elapsed = time.monotonic() - order["created_at"]
+        if elapsed >= self.config.order_delay_s:
+            return "SUCCESSFUL"
+        if elapsed >= self.config.order_delay_s / 2:
+            return "WAITING"
+        return "ACCEPTED"
+
+    def order_body(self, order_uuid: str) -> dict | None:
+        with self.lock:
+            order = self.orders.get(order_uuid)
+            if order is None:
+                return None
+            state = self.order_state(order)
+            if state == "SUCCESSFUL" and order["cdek_number"] is None:
+                order["cdek_number"] = str(10**9 + len(self.orders_by_cdek_number))
+                self.orders_by_cdek_number[order["cdek_number"]] = order_uuid
+        entity = {"uuid": order_uuid, **order["payload"]}
+        if order["cdek_number"]:
+            entity["cdek_number"] = order["cdek_number"]
+        return {
+            "entity": entity,
+            "requests": [
+                {
+                    "request_uuid": order_uuid,
+                    "type": "CREATE",
+                    "state": state,
+                    "date_time": time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime()),
+                    "errors": [{"code": "v2_invalid_order"}] if state == "INVALID" else [],
+                }
+            ],
+        }
+
+
+    def add_webhook(self, payload: dict) -> dict:
+        webhook_uuid = str(uuid.uuid4())
+        with self.lock:
+            self.webhooks[webhook_uuid] = {
+                "uuid": webhook_uuid,
+                "type": payload.get("type"),
+                "url": payload.get("url"),
+            }
+        return {
+            "entity": {"uuid": webhook_uuid},
+            "requests": [{"request_uuid": webhook_uuid, "type": "CREATE", "state": "SUCCESSFUL"}],
+        }
+
+    def post_order_status(self, order_uuid: str) -> None:
+        body = self.order_body(order_uuid)
+        state = body["requests"][0]["state"]
+        cdek_number = body["entity"].get("cdek_number")
+        event = {
+            "type": "ORDER_STATUS",
+            "date_time": time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime()),
+            "uuid": order_uuid,
+            "attributes": {
+                "is_return": False,
+                "cdek_number": cdek_number,
+                "code": {"SUCCESSFUL": "CREATED", "INVALID": "INVALID"}.get(state, "ACCEPTED"),
+                "status_date_time": time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime()),
+            },
+        }
+        with self.lock:
+            urls = [w["url"] for w in self.webhooks.values() if w["type"] == "ORDER_STATUS"]
+        for url in urls:
+            if self.random() < self.config.webhook_loss_rate:
+                self._count("webhooks_lost")
+                continue
+            try:
+                requests.post(url, json=event, timeout=5).raise_for_status()
+                self._count("webhooks_sent")
+            except requests.RequestException:
+                self._count("webhook_errors")
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+    protocol_version = "HTTP/1.1"
+    # заголовки и тело уходят разными send(): без TCP_NODELAY keep-alive
+    # клиент ждёт delayed ACK ~40 мс на каждый ответ
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._handle()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._handle()
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        self._handle()
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._handle()
+
+    def _handle(self):
+        state = self.server.state
+        parts = urlsplit(self.path)
+        path = parts.path.strip("/")
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if parts.path == STATS_PATH:
+            with state.lock:
+                stats = dict(state.stats, injected_latency_s=state.injected_latency_s)
+            return self._send(200, stats)
+
+        with state.lock:
+            state.stats["requests"] += 1
+            state.stats[path] += 1
+        time.sleep(state.latency_s())
+        token_wait_s = state.take_token()
+        if token_wait_s:
+            with state.lock:
+                state.stats["throttled"] += 1
+            return self._send(
+                429,
+                {"errors": [{"code": "v2_too_many_requests"}]},
+                {"Retry-After": str(math.ceil(token_wait_s))},
+            )
+        if state.random() < state.config.throttle_rate:
+            with state.lock:
+                state.stats["throttled"] += 1
+            return self._send(
+                429,
+                {"errors": [{"code": "v2_too_many_requests"}]},
+                {"Retry-After": str(state.config.retry_after_s)},
+            )
+        if state.random() < state.config.error_rate:
+            with state.lock:
+                state.stats["errors"] += 1
+            return self._send(500, {"errors": [{"code": "v2_internal_error"}]})
+        if path != "v2/oauth/token" and not self.headers.get("Authorization"):
+            return self._send(401, {"errors": [{"code": "v2_unauthorized"}]})
+        if state.cassette is not None and self._send_recorded(body):
+            return None
+
+        payload = json.loads(body) if body else {}
+        status, response = self._route(self.command, path, query, payload)
+        if self.command == "GET" and status == 200 and path in REFERENCE_PATHS:
+            return self._send_reference(response)
+        return self._send(status, response)
+
+    def _send_reference(self, response):
+        # справочники отдаются с ETag и поддерживают условный GET
+        content = json.dumps(response, ensure_ascii=False).encode()
+        etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send_raw(304, b"", {"ETag": etag})
+        return self._send_raw(
+            200, content, {"Content-Type": "application/json;charset=UTF-8", "ETag": etag}
+        )
+
+    def _send_recorded(self, body: bytes) -> bool:
+        state = self.server.state
+        request = requests.Request(
+            self.command, f"http://stand-in{self.path}", data=body or None
+        ).prepare()
+        key = interaction_key(request)
+        with state.lock:
+            ordinal = state.cassette_ordinals[key]
+            state.cassette_ordinals[key] += 1
+        recorded = state.cassette.get(request, key, ordinal)
+        if recorded is None:
+            return False
+        self._send_raw(recorded.status_code, recorded.content, dict(recorded.headers))
+        return True
+
+    def _route(self, method: str, path: str, query: dict, payload: dict):
+        state = self.server.state
+        data = state.data
+        if path == "v2/oauth/token" and method == "POST":
+            return 200, {
+                "access_token": uuid.uuid4().hex,
+                "token_type": "bearer",
+                "expires_in": state.config.token_lifetime_s,
+                "scope": "order:all payment:all",
+                "jti": str(uuid.uuid4()),
+            }
+        if path == "v2/location/regions":
+            return 200, data.regions
+        if path == "v2/location/cities":
+            return 200, data.cities
+        if path == "v2/location/suggest/cities":
+            name = query.get("name", "").casefold()
+            return 200, [
+                {"city_uuid": city["city_uuid"], "code": city["code"], "full_name": city["city"]}
+                for city in data.cities
+                if city["city"].casefold().startswith(name)
+            ]
+        if path == "v2/location/postalcodes":
+            code = int(query.get("code", 0))
+            return 200, {"code": code, "postal_codes": [f"{100000 + code}"]}
+        if path == "v2/deliverypoints":
+            if "city_code" in query:
+                return 200, data.points_by_city.get(int(query["city_code"]), [])
+            return 200, data.points
+        if path == "v2/calculator/alltariffs":
+            return 200, {"tariff_codes": data.tariffs}
+        if path in ("v2/calculator/tariff", "v2/calculator/tariffAndService"):
+            return 200, self._calculation(payload)
+        if path == "v2/calculator/tarifflist":
+            return 200, {
+                "tariff_codes": [
+                    {"tariff_code": mode["tariff_code"], **self._calculation(payload)}
+                    for tariff in data.tariffs
+                    for mode in tariff["delivery_modes"]
+                ]
+            }
+        if path == "v2/international/package/restrictions":
+            return 200, {"restrictions": []}
+        if path == "v2/orders" and method == "POST":
+            return 202, state.create_order(payload)
+        if path == "v2/orders" and method == "GET":
+            with state.lock:
+                order_uuid = state.orders_by_cdek_number.get(query.get("cdek_number"))
+            if order_uuid is None:
+                return 404, {"errors": [{"code": "v2_entity_not_found"}]}
+            return 200, state.order_body(order_uuid)
+        if path.startswith("v2/orders/"):
+            order = state.order_body(path.rsplit("/", 1)[-1])
+            if order is None:
+                return 404, {"errors": [{"code": "v2_entity_not_found"}]}
+            return 200, order
+        if path == "v2/webhooks" and method == "POST":
+            return 200, state.add_webhook(payload)
+        if path == "v2/webhooks" and method == "GET":
+            with state.lock:
+                return 200, list(state.webhooks.values())
+        if path.startswith("v2/webhooks/") and method == "DELETE":
+            with state.lock:
+                webhook = state.webhooks.pop(path.rsplit("/", 1)[-1], None)
+            if webhook is None:
+                return 404, {"errors": [{"code": "v2_entity_not_found"}]}
+            return 200, {"entity": {"uuid": webhook["uuid"]}}
+        return 404, {"errors": [{"code": "v2_entity_not_found"}]}
+
+    def _calculation(self, payload: dict) -> dict:
+        weight = sum(package.get("weight", 0) for package in payload.get("packages") or [])
+        delivery_sum = round(250 + weight * 0.05, 2)
+        return {
+            "delivery_sum": delivery_sum,
+            "period_min": 1,
+            "period_max": 3,
+            "weight_calc": weight,
+            "total_sum": delivery_sum,
+            "currency": "RUB",
+        }
+
+    def _send(self, status: int, body, headers: dict | None = None):
+        self._send_raw(
+            status,
+            json.dumps(body, ensure_ascii=False).encode(),
+            {"Content-Type": "application/json;charset=UTF-8", **(headers or {})},
+        )
+
+    def _send_raw(self, status: int, content: bytes, headers: dict):
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ("content-length", "connection"):
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        with self.server.state.lock:
+            self.server.state.stats[f"status_{status}"] += 1
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: StandInConfig, host: str = "127.0.0.1", port: int = 0):
+        self.state = StandInState(config)
+        super().__init__((host, port), StandInHandler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="stand-in", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address) -> None:
+        # клиент закрыл соединение из пула, например после повтора 500
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            with self.state.lock:
+                self.state.stats["connections_reset"] += 1
+            return
+        super().handle_error(request, client_address)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=Latency.parse, default=Latency())
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--rate-limit-burst", type=int, default=1)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--points-per-city", type=int, default=20)
+    parser.add_argument("--order-delay", type=float, default=5.0)
+    parser.add_argument("--invalid-order-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-loss-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cassette", type=Path, default=None)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_s=args.retry_after,
+        rate_limit_rps=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        city_count=args.cities,
+        points_per_city=args.points_per_city,
+        order_delay_s=args.order_delay,
+        invalid_order_rate=args.invalid_order_rate,
+        webhook_loss_rate=args.webhook_loss_rate,
+        seed=args.seed,
+        cassette_path=args.cassette,
+    )
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    server = StandInServer(config_from_args(args), args.host, args.port)
+    print(f"CDEK API stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
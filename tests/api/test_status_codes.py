@@ -1,23 +1,19 @@
-from time import sleep
 import allure
 import pytest
-import requests
 from enums.city import City
-from tests.api.constants import DEFAULT_REQUEST_TIMEOUT_S, DEFAULT_WAIT_TIMEOUT_S
 
 
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Локации")
 @allure.title("Проверка подборки локации по названию города")
+@pytest.mark.concurrent
 @pytest.mark.parametrize("city", [city.value for city in City])
-def test_location_suggest_cities(auth_header, endpoints, city, request):
+async def test_location_suggest_cities(async_api_client, endpoints, city, request):
     with allure.step("Отправка запроса к API"):
         request_params = {"name": city}
-        response = requests.get(
+        response = await async_api_client.get(
             url=endpoints.suggest_cities(),
-            headers=auth_header,
             params=request_params,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -29,12 +25,10 @@ def test_location_suggest_cities(auth_header, endpoints, city, request):
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Локации")
 @allure.title("Проверка получения списка регионов")
-def test_location_regions(auth_header, endpoints, request):
+def test_location_regions(api_client, endpoints, request):
     with allure.step("Отправка запроса к API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.regions(),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -45,14 +39,12 @@ def test_location_regions(auth_header, endpoints, request):
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Локации")
 @allure.title("Проверка получения почтовых индексов города")
-def test_location_postal_codes(auth_header, endpoints, city_payload, city, request):
+def test_location_postal_codes(api_client, endpoints, city_payload, city, request):
     with allure.step("Отправка запроса к API"):
         request_params = {"code": city_payload(city=city).code}
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.postal_codes(),
-            headers=auth_header,
             params=request_params,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -64,12 +56,10 @@ def test_location_postal_codes(auth_header, endpoints, city_payload, city, reque
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Локации")
 @allure.title("Проверка получения списка населённых пунктов")
-def test_location_cities(auth_header, endpoints, request):
+def test_location_cities(api_client, endpoints, request):
     with allure.step("Отправка запроса к API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.cities(),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -80,12 +70,10 @@ def test_location_cities(auth_header, endpoints, request):
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Локации")
 @allure.title("Проверка получения списка офисов")
-def test_delivery_points(auth_header, endpoints, request):
+def test_delivery_points(api_client, endpoints, request):
     with allure.step("Отправка запроса к API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.delivery_points(),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -96,7 +84,7 @@ def test_delivery_points(auth_header, endpoints, request):
 @allure.feature("Валидация http статус-кодов СДЕК API")
 @allure.story("Расчёт стоимости доставки")
 @allure.title("Проверка расчёта по доступным тарифам")
-def test_calculate_tariff_list(auth_header, endpoints, city_payload, packages, request):
+def test_calculate_tariff_list(api_client, endpoints, city_payload, packages, request):
     with allure.step("Отправка запроса к API"):
         from_location = city_payload()
         to_location = city_payload()
@@ -106,11 +94,9 @@ def test_calculate_tariff_list(auth_header, endpoints, city_payload, packages, r
             "to_location": to_location.to_dict(),
             "packages": delivery_packages,
         }
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.tariff_list(),
-            headers=auth_header,
             json=request_params,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
     with allure.step("Проверка: статус-код < 400"):
         assert response.ok
@@ -123,7 +109,7 @@ def test_calculate_tariff_list(auth_header, endpoints, city_payload, packages, r
 @allure.story("Расчёт стоимости доставки")
 @allure.title("Проверка расчёта по коду тарифа")
 def test_calculate_tariff(
-    auth_header,
+    api_client,
     endpoints,
     city_payload,
     tariff_code,
@@ -143,11 +129,9 @@ def test_calculate_tariff(
         }
         print(request_params["packages"])
         request.node.user_properties.append(("request_params", request_params))
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.tariff(),
-            headers=auth_header,
             json=request_params,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
         print(response.json())
         errors = response.json().get("errors")
@@ -163,22 +147,20 @@ def test_calculate_tariff(
 
 
 def test_calculate_tariff_and_service(
-    auth_header, endpoints, get_random_city, packages, attach_info
+    api_client, endpoints, get_random_city, packages, attach_info
 ):
     with allure.step("Collect data: location from, location to"):
         from_location = get_random_city()
         to_location = get_random_city()
     with allure.step("Send request to API"):
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.tariff_and_service(),
-            headers=auth_header,
             json={
                 "services": [{"code": "CARTON_BOX_XS", "parameter": 1}],
                 "from_location": from_location,
                 "to_location": to_location,
                 "packages": packages,
             },
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
 
     with allure.step("Check Status Code < 400"):
@@ -187,12 +169,10 @@ def test_calculate_tariff_and_service(
     attach_info(response)
 
 
-def test_all_tariffs(auth_header, endpoints, delivery_mode_repository):
+def test_all_tariffs(api_client, endpoints, delivery_mode_repository):
     with allure.step("Send request to API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.all_tariffs(),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
         # print(response.json()["tariff_codes"])
         mode_list = []
@@ -205,23 +185,21 @@ def test_all_tariffs(auth_header, endpoints, delivery_mode_repository):
 
 
 def test_international_package_restrictions(
-    auth_header, endpoints, get_random_city, get_tariff_code, packages, attach_info
+    api_client, endpoints, get_random_city, get_tariff_code, packages, attach_info
 ):
     with allure.step("Collect data: tariff_code, location from, location to, packages"):
         from_location = get_random_city()
         to_location = get_random_city()
         tariff_code = get_tariff_code(from_location, to_location)
     with allure.step("Send request to API"):
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.restrictions(),
-            headers=auth_header,
             json={
                 "tariff_code": int(tariff_code),
                 "from_location": from_location,
                 "to_location": to_location,
                 "packages": packages,
             },
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
 
     with allure.step("Check Status Code < 400"):
@@ -231,7 +209,7 @@ def test_international_package_restrictions(
 
 
 def test_register_order(
-    auth_header,
+    api_client,
     endpoints,
     get_random_city,
     get_tariff_code,
@@ -246,9 +224,8 @@ def test_register_order(
         to_location = get_random_city()
         tariff_code = get_tariff_code(from_location, to_location)
     with allure.step("Send request to API"):
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.orders(),
-            headers=auth_header,
             json={
                 "type": 1,
                 "tariff_code": tariff_code,
@@ -258,7 +235,6 @@ def test_register_order(
                 "recipient": recipient,
                 "sender": sender,
             },
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
         order_repository.create_order(
             {
@@ -273,14 +249,12 @@ def test_register_order(
     attach_info(response)
 
 
-def test_order(auth_header, endpoints, get_order_uuid, attach_info):
+def test_order(api_client, endpoints, get_order_uuid, attach_info):
     with allure.step("Collect data: uuid"):
         uuid = get_order_uuid(City.MOSCOW.value)
     with allure.step("Send request to API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.order(uuid),
-            headers=auth_header,
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
 
     with allure.step("Check Status Code < 400"):
@@ -290,26 +264,18 @@ def test_order(auth_header, endpoints, get_order_uuid, attach_info):
 
 
 def test_get_orders(
-    auth_header,
+    api_client,
     endpoints,
-    get_order_uuid,
-    get_cdek_number,
-    get_order_state,
+    successful_order,
     attach_info,
 ):
-    with allure.step("Collect data: order_uuid, order_state, cdek_number"):
-        order_uuid = get_order_uuid(City.MOSCOW.value)
-        order_state = get_order_state(order_uuid)
-        while order_state != "SUCCESSFUL":
-            sleep(DEFAULT_WAIT_TIMEOUT_S)
-            order_state = get_order_state(order_uuid)
-        cdek_number = get_cdek_number(order_uuid)
+    with allure.step("Collect data: cdek_number"):
+        # пул отдаёт уже обработанный СДЕК заказ, ждать в тесте не нужно
+        cdek_number = successful_order.cdek_number
     with allure.step("Send request to API"):
-        response = requests.get(
+        response = api_client.get(
             url=endpoints.orders(),
-            headers=auth_header,
             params={"cdek_number": cdek_number},
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
 
     with allure.step("Check Status Code < 400"):
@@ -319,7 +285,7 @@ def test_get_orders(
 
 
 def test_change_order(
-    auth_header,
+    api_client,
     endpoints,
     get_random_city,
     get_tariff_code,
@@ -333,9 +299,8 @@ def test_change_order(
         to_location = get_random_city()
         tariff_code = get_tariff_code(from_location, to_location)
     with allure.step("Send request to API"):
-        response = requests.post(
+        response = api_client.post(
             url=endpoints.orders(),
-            headers=auth_header,
             json={
                 "type": 1,
                 "tariff_code": tariff_code,
@@ -345,7 +310,6 @@ def test_change_order(
                 "recipient": recipient,
                 "sender": sender,
             },
-            timeout=DEFAULT_REQUEST_TIMEOUT_S,
         )
 
     with allure.step("Check Status Code < 400"):
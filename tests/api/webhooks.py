@@ -0,0 +1,118 @@
+"""Приём вебхуков ORDER_STATUS от СДЕК API на локальном HTTP-сервере.
+
+Состояния заказов из событий передаются в OrderStatePoller.publish(), и
+ожидающие тесты просыпаются без опроса. Адрес должен быть доступен API:
+для настоящего API это публичный адрес туннеля (--webhook-url), для
+stand-in хватает локального.
+"""
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Tuple
+
+from tests.api.api_client import ApiClient
+from tests.api.order_poller import OrderStatus
+
+ORDER_STATUS = "ORDER_STATUS"
+# код статуса заказа из события -> состояние запроса на создание заказа;
+# остальные коды (доставка и т.д.) означают, что заказ уже создан
+WEBHOOK_STATES = {
+    "ACCEPTED": "ACCEPTED",
+    "CREATED": "SUCCESSFUL",
+    "INVALID": "INVALID",
+}
+
+
+def order_status_event(event: dict) -> Tuple[str, OrderStatus] | None:
+    """uuid заказа и его состояние из события ORDER_STATUS"""
+    if event.get("type") != ORDER_STATUS or not event.get("uuid"):
+        return None
+    attributes = event.get("attributes") or {}
+    cdek_number = attributes.get("cdek_number")
+    state = WEBHOOK_STATES.get(attributes.get("code"), "SUCCESSFUL")
+    if state == "SUCCESSFUL" and not cdek_number:
+        state = "WAITING"
+    return event["uuid"], OrderStatus(state, cdek_number)
+
+
+def register_webhook(api_client: ApiClient, url: str) -> str:
+    response = api_client.post(
+        url=api_client.endpoints.webhooks(), json={"type": ORDER_STATUS, "url": url}
+    )
+    response.raise_for_status()
+    return response.json()["entity"]["uuid"]
+
+
+def delete_webhook(api_client: ApiClient, webhook_uuid: str) -> None:
+    response = api_client.delete(url=api_client.endpoints.webhook(webhook_uuid))
+    # подписку могли перезаписать или удалить раньше
+    if response.status_code != 404:
+        response.raise_for_status()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: "WebhookReceiver"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            event = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send(400)
+            return
+        self.server.handle_event(event)
+        # СДЕК повторяет доставку, пока не получит 200
+        self._send(200)
+
+    def _send(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class WebhookReceiver(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        on_status: Callable[[str, OrderStatus], None],
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.on_status = on_status
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        super().__init__((host, port), WebhookHandler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def handle_event(self, event: dict) -> None:
+        order_event = order_status_event(event) if isinstance(event, dict) else None
+        with self._stats_lock:
+            self.stats["received" if order_event else "ignored"] += 1
+        if order_event is not None:
+            self.on_status(*order_event)
+
+    def start(self) -> "WebhookReceiver":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="webhook-receiver", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        # shutdown() ждёт serve_forever, которого без start() не было
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
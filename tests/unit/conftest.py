@@ -0,0 +1,71 @@
+import io
+from typing import Dict, List
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+
+class Clock:
+    """time.time и time.sleep без реального ожидания"""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeTransport(BaseAdapter):
+    """Транспорт requests с ответами по очереди вместо сети.
+
+    Ответ - код статуса, (код, тело), (код, тело, заголовки) или исключение,
+    которое будет выброшено. headers добавляются ко всем ответам.
+    """
+
+    def __init__(self, *outcomes, headers: Dict[str, str] | None = None) -> None:
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.headers = headers or {}
+        self.requests: List[requests.PreparedRequest] = []
+
+    @property
+    def sent(self) -> int:
+        return len(self.requests)
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        self.requests.append(request)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            outcome = (outcome, b"")
+        status, body, *headers = outcome
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK" if status < 400 else "Error"
+        response.headers.update(self.headers)
+        response.headers.update(*headers)
+        response.raw = io.BytesIO(body.encode() if isinstance(body, str) else body)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("time.time", clock.time)
+    monkeypatch.setattr("time.sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def fake_transport():
+    """Фабрика FakeTransport: fake_transport(503, 200)"""
+    return FakeTransport
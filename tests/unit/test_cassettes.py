@@ -0,0 +1,98 @@
+import json
+import pytest
+import requests
+
+from tests.api.cassettes import (
+    CassetteAdapter,
+    CassetteMissError,
+    CassetteStore,
+    body_hash,
+    interaction_key,
+    normalize_url,
+)
+
+JSON_HEADERS = {"Content-Type": "application/json", "Content-Length": "12"}
+
+
+@pytest.fixture
+def api(fake_transport):
+    """Отвечает номером запроса, чтобы было видно, откуда пришёл ответ"""
+    return fake_transport(
+        *((200, json.dumps({"sent": sent})) for sent in range(1, 10)), headers=JSON_HEADERS
+    )
+
+
+def prepare(method: str, url: str, body=None) -> requests.PreparedRequest:
+    return requests.Request(method, url, data=body).prepare()
+
+
+def cassette_session(tmp_path, mode: str, api) -> requests.Session:
+    session = requests.Session()
+    adapter = CassetteAdapter(CassetteStore(tmp_path / "cassette.sqlite"), mode, api)
+    session.mount("http://", adapter)
+    return session
+
+
+def test_normalize_url():
+    assert normalize_url("http://api/v2/location/cities?size=5&city=Москва") == (
+        "/v2/location/cities?city=%D0%9C%D0%BE%D1%81%D0%BA%D0%B2%D0%B0&size=5"
+    )
+    assert normalize_url("http://api/v2/oauth/token?client_secret=s&grant_type=x&client_id=i") == (
+        "/v2/oauth/token?grant_type=x"
+    )
+    assert normalize_url("http://api/v2/orders") == "/v2/orders"
+
+
+def test_body_hash_ignores_json_formatting():
+    assert body_hash('{"a": 1, "b": [1, 2]}') == body_hash(b'{"b":[1,2],"a":1}')
+    assert body_hash(None) == body_hash(b"")
+    assert body_hash("not json") != body_hash("not  json")
+
+
+def test_interaction_key():
+    key = interaction_key(prepare("GET", "http://api/v2/orders?b=2&a=1"))
+    assert key == interaction_key(prepare("GET", "https://other/v2/orders?a=1&b=2"))
+    assert key != interaction_key(prepare("DELETE", "http://api/v2/orders?a=1&b=2"))
+
+
+def test_store_falls_back_to_last_recorded(tmp_path, api):
+    store = CassetteStore(tmp_path / "cassette.sqlite")
+    request = prepare("GET", "http://api/v2/orders/1")
+    for ordinal in range(2):
+        store.put("key", ordinal, api.send(request))
+    assert store.get(request, "key", 0).json() == {"sent": 1}
+    assert store.get(request, "key", 5).json() == {"sent": 2}
+    assert store.get(request, "key", 5, exact=True) is None
+    assert store.get(request, "other", 0) is None
+    response = store.get(request, "key", 1, exact=True)
+    assert response.json() == {"sent": 2}
+    # длина тела после записи другая
+    assert "Content-Length" not in response.headers
+    store.close()
+
+
+def test_record_then_replay(tmp_path, api):
+    with cassette_session(tmp_path, "record", api) as session:
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 1}
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 2}
+    with cassette_session(tmp_path, "replay", api) as session:
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 1}
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 2}
+        # опрос дольше записанного получает последний ответ
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 2}
+        with pytest.raises(CassetteMissError):
+            session.get("http://api/v2/orders/2")
+    assert api.sent == 2
+
+
+def test_auto_sends_only_missing(tmp_path, api):
+    with cassette_session(tmp_path, "record", api) as session:
+        session.get("http://api/v2/orders/1")
+    with cassette_session(tmp_path, "auto", api) as session:
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 1}
+        # повторный опрос берёт новое состояние из API и дописывает кассету
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 2}
+    with cassette_session(tmp_path, "replay", api) as session:
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 1}
+        assert session.get("http://api/v2/orders/1").json() == {"sent": 2}
+    assert api.sent == 2
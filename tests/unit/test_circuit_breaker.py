@@ -0,0 +1,64 @@
+import pytest
+
+from tests.api.circuit_breaker import CircuitBreakers, SharedCircuitBreaker
+
+
+@pytest.fixture
+def breaker(tmp_path, clock):  # pylint: disable=unused-argument
+    return SharedCircuitBreaker(tmp_path / "orders.breaker", threshold=3, open_s=30)
+
+
+def fail(breaker: SharedCircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False)
+
+
+def test_opens_after_threshold_failures_in_a_row(breaker):
+    fail(breaker, 2)
+    breaker.record(True)
+    fail(breaker, 2)
+    assert breaker.stats().state == "closed"
+    fail(breaker, 1)
+    assert breaker.stats().state == "open"
+    assert not breaker.allow()
+    assert breaker.stats().rejected == 1
+    assert breaker.stats().trips == 1
+
+
+def test_half_open_probe_closes_on_success(breaker, clock):
+    fail(breaker, 3)
+    clock.sleep(30)
+    assert breaker.allow()
+    assert breaker.stats().state == "half-open"
+    # пока проба в полёте, остальные запросы не проходят
+    assert not breaker.allow()
+    breaker.record(True)
+    stats = breaker.stats()
+    assert (stats.state, stats.failures, stats.trips) == ("closed", 0, 1)
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_counts_trip(breaker, clock):
+    fail(breaker, 3)
+    clock.sleep(30)
+    fail(breaker, 1)
+    assert breaker.stats().state == "open"
+    assert breaker.stats().trips == 2
+    assert not breaker.allow()
+
+
+def test_late_success_does_not_close_open_breaker(breaker):
+    fail(breaker, 3)
+    # ответ на запрос, отправленный до открытия
+    breaker.record(True)
+    assert breaker.stats().state == "open"
+
+
+def test_breakers_by_endpoint(tmp_path):
+    breakers = CircuitBreakers(
+        tmp_path, ["v2/orders", "v2/oauth"], lambda url: url.split("/api/", 1)[1]
+    )
+    assert breakers.get("http://h/api/v2/orders") is breakers.breakers["v2/orders"]
+    breakers.get("http://h/api/v2/oauth").record(False)
+    assert set(breakers.stats()) == {"v2/oauth"}
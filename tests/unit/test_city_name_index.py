@@ -0,0 +1,42 @@
+from database.city_name_index import CityNameIndex, normalize_name
+
+ROWS = [
+    ("spb", "Санкт-Петербург", "Санкт-Петербург", 137),
+    ("msk", "Москва", "Москва", 44),
+    ("msk-region", "Московский", "Москва", 10),
+    ("orel", "Орёл", "Орловская область", 436),
+    ("orel-2", "Орел", "Курская область", 900),
+    ("pskov", "Псков", "Псковская область", 256),
+    ("pskov-village", "Псков", "Тверская область", 777),
+    ("empty", None, "Москва", 1),
+]
+
+
+def test_normalize_name():
+    assert normalize_name("  Санкт-Петербург ") == "санкт петербург"
+    assert normalize_name("ОРЁЛ") == "орел"
+    assert normalize_name("Ростов-на-Дону (обл.)") == "ростов на дону обл"
+
+
+def test_search_by_any_word():
+    index = CityNameIndex(ROWS)
+    assert index.search("петербург") == ["spb"]
+    assert index.search("санкт петер") == ["spb"]
+    assert index.search("казань") == []
+    assert index.search(" - ") == []
+    assert len(index) == 7
+
+
+def test_exact_match_before_prefix():
+    assert CityNameIndex(ROWS).search("Москва") == ["msk"]
+    assert CityNameIndex(ROWS).search("моск") == ["msk", "msk-region"]
+
+
+def test_regional_centre_first():
+    assert CityNameIndex(ROWS).search("Псков") == ["pskov", "pskov-village"]
+    assert CityNameIndex(ROWS).search("орел") == ["orel", "orel-2"]
+
+
+def test_region_filter_ranks_region_first():
+    assert CityNameIndex(ROWS).search("Псков", "Тверская") == ["pskov-village", "pskov"]
+    assert CityNameIndex(ROWS).search("Орёл", "курская область") == ["orel-2", "orel"]
@@ -0,0 +1,78 @@
+from pathlib import Path
+import pytest
+
+pytest_plugins = ["pytester"]
+
+ROOT = Path(__file__).parents[2]
+
+VARIANTS = """
+import asyncio
+from pathlib import Path
+import pytest
+
+running = []
+
+
+@pytest.mark.concurrent
+@pytest.mark.parametrize("n", range(6))
+async def test_variant(n):
+    running.append(n)
+    await asyncio.sleep(0.2)
+    with open(Path(__file__).with_name("peaks"), "a") as file:
+        file.write(f"{len(running)}\\n")
+    running.remove(n)
+
+
+def test_other():
+    pass
+"""
+
+
+@pytest.fixture
+def run_plugin(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", str(ROOT))
+
+    def run(*args):
+        return pytester.runpytest_subprocess("-p", "tests.api.fixtures.concurrency", *args)
+
+    return run
+
+
+@pytest.mark.parametrize("xdist", [[], ["-n", "1"], ["-n", "2"]], ids=["serial", "n1", "n2"])
+def test_variants_run_together(pytester, run_plugin, xdist):
+    pytester.makepyfile(test_variants=VARIANTS)
+    run_plugin(*xdist).assert_outcomes(passed=7)
+    peaks = [int(line) for line in (pytester.path / "peaks").read_text().split()]
+    # под xdist все варианты уходят одному воркеру и идут одной пачкой
+    assert max(peaks) == 6
+
+
+def test_skipped_variants_are_not_run(pytester, run_plugin):
+    pytester.makepyfile(
+        test_marks="""
+import pytest
+
+ran = []
+
+
+@pytest.mark.concurrent
+@pytest.mark.parametrize(
+    "x",
+    [
+        1,
+        pytest.param(2, marks=pytest.mark.skip),
+        pytest.param(3, marks=pytest.mark.xfail(run=False)),
+        pytest.param(4, marks=pytest.mark.xfail(strict=True)),
+        5,
+    ],
+)
+async def test_variant(x):
+    ran.append(x)
+    assert x != 4
+
+
+def test_after():
+    assert sorted(ran) == [1, 4, 5]
+"""
+    )
+    run_plugin().assert_outcomes(passed=3, skipped=1, xfailed=2)
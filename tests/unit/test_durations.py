@@ -0,0 +1,51 @@
+import pytest
+
+from tests.api.constants import DEFAULT_TEST_DURATION_S
+from tests.api.durations import DurationStore, lpt_makespan
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DurationStore(None, alpha=0.5, path=tmp_path / "durations.json")
+
+
+def test_first_observation_is_taken_as_is(store):
+    store.observe("test_a.py::test_a", 4.0)
+    assert store.estimate("test_a.py::test_a") == (4.0, "history")
+
+
+def test_ewma_update(store):
+    store.observe("test_a.py::test_a", 4.0)
+    store.observe("test_a.py::test_a", 2.0)
+    assert store.estimate("test_a.py::test_a") == (3.0, "history")
+
+
+def test_family_fallback_averages_parametrizations(store):
+    store.observe("test_a.py::test_a[1]", 2.0)
+    store.observe("test_a.py::test_a[2]", 4.0)
+    # повторное наблюдение заменяет вклад варианта в среднее семейства
+    store.observe("test_a.py::test_a[2]", 8.0)
+    assert store.estimate("test_a.py::test_a[3]") == (4.0, "family")
+
+
+def test_mean_and_default_fallback(store):
+    assert store.estimate("test_b.py::test_b") == (DEFAULT_TEST_DURATION_S, "default")
+    store.observe("test_a.py::test_a[1]", 2.0)
+    store.observe("test_c.py::test_c", 6.0)
+    assert store.estimate("test_b.py::test_b") == (4.0, "mean")
+
+
+def test_save_and_load(store, tmp_path):
+    store.observe("test_a.py::test_a[1]", 2.0)
+    store.save()
+    loaded = DurationStore(None, path=tmp_path / "durations.json")
+    assert loaded.estimate("test_a.py::test_a[1]") == (2.0, "history")
+    assert loaded.estimate("test_a.py::test_a[2]") == (2.0, "family")
+
+
+def test_lpt_makespan():
+    # 5 и 4 на разные воркеры, затем 3 к четырём и 3 к пяти: нагрузка 7 и 8
+    assert lpt_makespan([3, 5, 3, 4], 2) == 8
+    assert lpt_makespan([3, 5, 3, 4], 1) == 15
+    assert lpt_makespan([], 4) == 0
+    assert lpt_makespan([2.0], 0) == 2.0
@@ -0,0 +1,116 @@
+import random
+import pytest
+import requests
+
+from tests.api.http_cache import CachingAdapter, HttpCacheStore
+
+TTL_S = 60
+REFERENCE_URL = "http://api/v2/location/cities"
+
+
+def ttl(url: str) -> float | None:
+    return TTL_S if "/location/" in url else None
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HttpCacheStore(tmp_path / "http_cache.sqlite", max_bytes=1024)
+    yield store
+    store.close()
+
+
+def cached_session(store, transport, **kwargs) -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", CachingAdapter(store, transport, ttl, **kwargs))
+    return session
+
+
+@pytest.mark.usefixtures("clock")
+def test_fresh_response_is_served_from_cache(store, fake_transport):
+    transport = fake_transport((200, "first"), (200, "second"))
+    session = cached_session(store, transport)
+    assert session.get(REFERENCE_URL).text == "first"
+    response = session.get(REFERENCE_URL)
+    assert (response.status_code, response.text) == (200, "first")
+    assert transport.sent == 1
+
+
+def test_expired_response_is_fetched_again(store, fake_transport, clock):
+    transport = fake_transport((200, "first"), (200, "second"))
+    session = cached_session(store, transport)
+    session.get(REFERENCE_URL)
+    clock.sleep(TTL_S)
+    assert session.get(REFERENCE_URL).text == "second"
+    # без ETag и Last-Modified перепроверять нечем, запрос уходит как есть
+    assert "If-None-Match" not in transport.requests[-1].headers
+    assert session.get(REFERENCE_URL).text == "second"
+    assert transport.sent == 2
+
+
+def test_stale_response_is_revalidated(store, fake_transport, clock):
+    validators = {"ETag": '"v1"', "Last-Modified": "Wed, 01 Oct 2025 00:00:00 GMT"}
+    transport = fake_transport((200, "first", validators), 304, (200, "second"))
+    session = cached_session(store, transport)
+    session.get(REFERENCE_URL)
+    clock.sleep(TTL_S)
+    response = session.get(REFERENCE_URL)
+    assert (response.status_code, response.text) == (200, "first")
+    assert transport.requests[-1].headers["If-None-Match"] == '"v1"'
+    assert transport.requests[-1].headers["If-Modified-Since"] == validators["Last-Modified"]
+    # 304 продлевает свежесть сохранённого ответа
+    clock.sleep(TTL_S - 1)
+    assert session.get(REFERENCE_URL).text == "first"
+    assert transport.sent == 2
+
+
+def test_least_recently_used_is_evicted(store, fake_transport, clock):
+    # тело хранится сжатым, случайные байты не сжимаются
+    bodies = {name: random.Random(name).randbytes(400) for name in "abcd"}
+    transport = fake_transport(*((200, body) for body in bodies.values()))
+    session = cached_session(store, transport)
+    for name in ("a", "b"):
+        session.get(f"{REFERENCE_URL}?city={name}")
+        clock.sleep(1)
+    # чтение освежает "a", вытесняется давно не читанный "b"
+    session.get(f"{REFERENCE_URL}?city=a")
+    clock.sleep(1)
+    session.get(f"{REFERENCE_URL}?city=c")
+    assert transport.sent == 3
+    assert session.get(f"{REFERENCE_URL}?city=a").content == bodies["a"]
+    assert session.get(f"{REFERENCE_URL}?city=c").content == bodies["c"]
+    assert session.get(f"{REFERENCE_URL}?city=b").content == bodies["d"]
+    assert transport.sent == 4
+
+
+@pytest.mark.usefixtures("clock")
+@pytest.mark.parametrize(
+    "outcome",
+    [(500, "error"), (200, "private", {"Cache-Control": "no-store"}), (200, "x" * 101)],
+    ids=["error", "no-store", "oversized"],
+)
+def test_response_is_not_stored(store, fake_transport, outcome):
+    transport = fake_transport(outcome, (200, "fresh"))
+    session = cached_session(store, transport, max_response_bytes=100)
+    session.get(REFERENCE_URL)
+    assert session.get(REFERENCE_URL).text == "fresh"
+    assert transport.sent == 2
+
+
+@pytest.mark.usefixtures("clock")
+def test_streamed_response_is_not_stored(store, fake_transport):
+    transport = fake_transport((200, "streamed"), (200, "fresh"))
+    session = cached_session(store, transport)
+    with session.get(REFERENCE_URL, stream=True) as response:
+        assert b"".join(response.iter_content(3)) == b"streamed"
+    assert session.get(REFERENCE_URL).text == "fresh"
+    assert transport.sent == 2
+
+
+@pytest.mark.usefixtures("clock")
+def test_only_reference_gets_are_cached(store, fake_transport):
+    transport = fake_transport(*([200] * 4))
+    session = cached_session(store, transport)
+    for _ in range(2):
+        session.get("http://api/v2/orders/1")
+        session.post(REFERENCE_URL)
+    assert transport.sent == 4
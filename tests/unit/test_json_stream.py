@@ -0,0 +1,41 @@
+import json
+import pytest
+
+from tests.api.json_stream import iter_json_array
+
+ITEMS = [{"code": "MSK1", "name": "Пункт №1"}, 12.5, "строка, с ] и [", [1, [2]], None, True]
+
+
+def chunks(data: bytes, size: int):
+    return (data[i : i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_items_split_across_chunks(size):
+    # куски режут и многобайтные символы UTF-8, и числа
+    data = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode()
+    assert list(iter_json_array(chunks(data, size))) == ITEMS
+
+
+def test_number_at_chunk_end_is_not_cut():
+    assert list(iter_json_array([b"[12", b"34, 5", b"6]"])) == [1234, 56]
+    assert list(iter_json_array([b"[12", b".5, 1", b"e", b"3, -", b"2]"])) == [12.5, 1e3, -2]
+
+
+def test_empty_array():
+    assert list(iter_json_array([b" [ ", b"] "])) == []
+
+
+def test_stops_at_end_of_array():
+    # остаток потока после массива не читается
+    def stream():
+        yield b"[1, 2]"
+        raise AssertionError("read past the end of the array")
+
+    assert list(iter_json_array(stream())) == [1, 2]
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b"[1, 2", b'[{"a": '])
+def test_invalid_stream(data):
+    with pytest.raises(ValueError):
+        list(iter_json_array([data]))
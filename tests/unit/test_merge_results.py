@@ -0,0 +1,79 @@
+import json
+import pytest
+
+from tests.api.merge_results import AllureMerger, merge_durations
+
+
+def write_shard(directory, test_name: str, attachment: bytes) -> None:
+    # у шардов одинаковые uuid, но разные результаты и вложения
+    directory.mkdir()
+    result = {
+        "uuid": "r1",
+        "name": test_name,
+        "attachments": [{"name": "response", "source": "a1-attachment.json"}],
+    }
+    (directory / "r1-result.json").write_text(json.dumps(result))
+    (directory / "c1-container.json").write_text(json.dumps({"uuid": "c1", "children": ["r1"]}))
+    (directory / "a1-attachment.json").write_bytes(attachment)
+    (directory / "environment.properties").write_text(f"shard={directory.name}\n")
+
+
+@pytest.fixture
+def merged(tmp_path):
+    output = tmp_path / "merged"
+    output.mkdir()
+    write_shard(tmp_path / "shard-1", "test_a", b"first")
+    write_shard(tmp_path / "shard-2", "test_b", b"second")
+    merger = AllureMerger(output)
+    merger.add_shard(tmp_path / "shard-1")
+    merger.add_shard(tmp_path / "shard-2")
+    merger.finish()
+    return output, merger
+
+
+def read_json(directory, suffix: str) -> list:
+    return [json.loads(path.read_bytes()) for path in sorted(directory.glob(f"*{suffix}"))]
+
+
+def test_conflicting_uuids_are_renamed(merged):
+    output, merger = merged
+    results = read_json(output, "-result.json")
+    assert sorted(result["name"] for result in results) == ["test_a", "test_b"]
+    assert len({result["uuid"] for result in results}) == 2
+    # результат, его вложение и контейнер ссылаются друг на друга по новым именам
+    for result in results:
+        source = result["attachments"][0]["source"]
+        expected = b"first" if result["name"] == "test_a" else b"second"
+        assert (output / source).read_bytes() == expected
+        assert (output / f"{result['uuid']}-result.json").exists()
+    containers = read_json(output, "-container.json")
+    children = sorted(child for container in containers for child in container["children"])
+    assert children == sorted(result["uuid"] for result in results)
+    assert merger.stats["renamed"] == 3
+
+
+def test_environment_values_are_joined(merged):
+    output, _ = merged
+    assert (output / "environment.properties").read_text() == "shard=shard-1, shard-2\n"
+
+
+def test_identical_files_are_written_once(tmp_path):
+    output = tmp_path / "merged"
+    output.mkdir()
+    write_shard(tmp_path / "shard-1", "test_a", b"same")
+    merger = AllureMerger(output)
+    merger.add_shard(tmp_path / "shard-1")
+    merger.add_shard(tmp_path / "shard-1")
+    assert merger.stats["renamed"] == 0
+    assert merger.stats["duplicates"] == 3
+    assert len(list(output.glob("*-result.json"))) == 1
+
+
+def test_merge_durations_prefers_values_changed_by_shard(tmp_path):
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"a": 1.0, "b": 2.0, "c": 3.0}))
+    # каждый шард обновил только свои тесты
+    (tmp_path / "1.json").write_text(json.dumps({"a": 1.5, "b": 2.0, "c": 3.0}))
+    (tmp_path / "2.json").write_text(json.dumps({"a": 1.0, "b": 2.5, "c": 3.0, "d": 4.0}))
+    merged = merge_durations([tmp_path / "1.json", tmp_path / "2.json"], base)
+    assert merged == {"a": 1.5, "b": 2.5, "c": 3.0, "d": 4.0}
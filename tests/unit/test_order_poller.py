@@ -0,0 +1,138 @@
+import json
+import threading
+import pytest
+import requests
+
+from tests.api.order_poller import NOT_FOUND, OrderStatePoller, OrderStatus, order_status
+
+
+def order_body(state: str, cdek_number: str | None = None) -> dict:
+    return {"entity": {"cdek_number": cdek_number}, "requests": [{"state": state}]}
+
+
+class Endpoints:
+    @staticmethod
+    def order(uuid: str) -> str:
+        return f"http://api/v2/orders/{uuid}"
+
+
+class FakeApiClient:
+    """Отдаёт ответы по очереди, последний повторяется"""
+
+    endpoints = Endpoints()
+
+    def __init__(self, responses: dict) -> None:
+        self.responses = responses
+        self.polls = {uuid: 0 for uuid in responses}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> requests.Response:
+        uuid = url.rsplit("/", 1)[1]
+        with self._lock:
+            answers = self.responses[uuid]
+            answer = answers[min(self.polls[uuid], len(answers) - 1)]
+            self.polls[uuid] += 1
+        response = requests.Response()
+        if isinstance(answer, int):
+            response.status_code = answer
+            response._content = b""  # pylint: disable=protected-access
+        else:
+            response.status_code = 200
+            response._content = json.dumps(answer).encode()  # pylint: disable=protected-access
+        return response
+
+
+@pytest.fixture
+def start_poller():
+    pollers = []
+
+    def start(responses: dict, **kwargs) -> OrderStatePoller:
+        poller = OrderStatePoller(initial_s=0.01, max_s=0.02, **kwargs)
+        poller.start(FakeApiClient(responses))
+        pollers.append(poller)
+        return poller
+
+    yield start
+    for poller in pollers:
+        poller.stop()
+
+
+def test_order_status():
+    assert order_status(order_body("ACCEPTED")) == OrderStatus("ACCEPTED")
+    assert order_status(order_body("SUCCESSFUL", "123")) == OrderStatus("SUCCESSFUL", "123")
+    # без номера СДЕК заказ ещё не готов
+    assert order_status(order_body("SUCCESSFUL")) == OrderStatus("WAITING")
+
+
+def test_final_states():
+    assert OrderStatus("SUCCESSFUL", "123").final
+    assert OrderStatus("INVALID").final
+    assert OrderStatus(NOT_FOUND).final
+    assert not OrderStatus("ACCEPTED").final
+    assert not OrderStatus("WAITING").final
+
+
+def test_wait_polls_until_state(start_poller):
+    poller = start_poller(
+        {
+            "a": [
+                order_body("ACCEPTED"),
+                order_body("SUCCESSFUL"),
+                order_body("SUCCESSFUL", "123"),
+            ]
+        }
+    )
+    assert poller.wait("a", ["SUCCESSFUL"], timeout_s=5) == OrderStatus("SUCCESSFUL", "123")
+    assert poller.status("a") == OrderStatus("SUCCESSFUL", "123")
+
+
+def test_wait_returns_on_final_state(start_poller):
+    poller = start_poller({"gone": [404], "bad": [order_body("INVALID")]})
+    assert poller.wait("gone", ["SUCCESSFUL"], timeout_s=5) == OrderStatus(NOT_FOUND)
+    assert poller.wait("bad", ["SUCCESSFUL"], timeout_s=5) == OrderStatus("INVALID")
+
+
+def test_poll_errors_are_retried(start_poller):
+    poller = start_poller({"a": [500, order_body("SUCCESSFUL", "1")]})
+    assert poller.wait("a", ["SUCCESSFUL"], timeout_s=5).cdek_number == "1"
+    assert isinstance(poller.last_error, requests.HTTPError)
+
+
+def test_wait_timeout(start_poller):
+    poller = start_poller({"a": [order_body("ACCEPTED")]})
+    with pytest.raises(TimeoutError, match="ACCEPTED"):
+        poller.wait("a", ["SUCCESSFUL"], timeout_s=0.1)
+
+
+def test_final_state_stops_polling(start_poller):
+    poller = start_poller({"a": [order_body("INVALID")]})
+    poller.wait("a", ["INVALID"], timeout_s=5)
+    polls = poller._api_client.polls["a"]  # pylint: disable=protected-access
+    poller.watch("a")
+    poller.wait("a", ["INVALID"], timeout_s=0.1)
+    assert poller._api_client.polls["a"] == polls  # pylint: disable=protected-access
+
+
+def test_publish_wakes_waiters():
+    updates = []
+    poller = OrderStatePoller(on_update=lambda: updates.append(1))
+    waiter = threading.Thread(
+        target=lambda: updates.append(poller.wait("a", ["SUCCESSFUL"], timeout_s=5))
+    )
+    waiter.start()
+    poller.publish("a", OrderStatus("SUCCESSFUL", "123"))
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert OrderStatus("SUCCESSFUL", "123") in updates
+
+
+def test_publish_never_rolls_back_final_state():
+    updates = []
+    poller = OrderStatePoller(on_update=lambda: updates.append(1))
+    poller.publish("a", OrderStatus("ACCEPTED"))
+    poller.publish("a", OrderStatus("ACCEPTED"))
+    poller.publish("a", OrderStatus("SUCCESSFUL", "123"))
+    # опрос, отправленный до события, вернул старое состояние
+    poller.publish("a", OrderStatus("ACCEPTED"))
+    assert poller.status("a") == OrderStatus("SUCCESSFUL", "123")
+    assert len(updates) == 2
@@ -0,0 +1,93 @@
+import email.utils
+import pytest
+import requests
+
+from tests.api.constants import RATE_LIMIT_DEFAULT_RETRY_AFTER_S, RATE_LIMIT_RECOVERY_S
+from tests.api.rate_limit import (
+    RateLimit,
+    RateLimiter,
+    RateLimitingAdapter,
+    SharedTokenBucket,
+    parse_rate_limit,
+    parse_retry_after,
+)
+
+RETRY_AFTER = {"Retry-After": "3"}
+
+
+@pytest.fixture
+def bucket(tmp_path, clock):  # pylint: disable=unused-argument
+    return SharedTokenBucket(tmp_path / "orders.bucket", RateLimit(10.0, 3))
+
+
+def test_parse_rate_limit():
+    assert parse_rate_limit("orders=5") == ("orders", RateLimit(5.0, 5))
+    assert parse_rate_limit("orders=0.5") == ("orders", RateLimit(0.5, 1))
+    assert parse_rate_limit("orders=5:10") == ("orders", RateLimit(5.0, 10))
+    for value in ("orders", "=5", "orders=0", "orders=5:0", "orders=fast"):
+        with pytest.raises(ValueError):
+            parse_rate_limit(value)
+
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(email.utils.formatdate(clock.now + 5, usegmt=True)) == 5.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_burst_then_rate(bucket):
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits == pytest.approx([0, 0, 0, 0.1, 0.1])
+    assert bucket.stats().requests == 5
+    assert bucket.stats().waited_s == pytest.approx(0.2)
+
+
+def test_idle_bucket_refills(bucket, clock):
+    for _ in range(3):
+        bucket.acquire()
+    clock.sleep(1)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+
+def test_retry_after_pauses_and_halves_rate(bucket, clock):
+    bucket.acquire()
+    throttled_at = clock.now
+    bucket.throttled(2.0)
+    assert bucket.stats().rate == pytest.approx(5.0)
+    assert bucket.acquire() == pytest.approx(2.0)
+    assert bucket.stats().throttled == 1
+    # скорость возвращается к лимиту линейно за RATE_LIMIT_RECOVERY_S
+    clock.now = throttled_at + RATE_LIMIT_RECOVERY_S / 2
+    assert bucket.stats().rate == pytest.approx(7.5)
+    clock.now = throttled_at + RATE_LIMIT_RECOVERY_S
+    assert bucket.stats().rate == pytest.approx(10.0)
+
+
+def test_throttled_during_pause_does_not_slow_down_again(bucket):
+    bucket.throttled(None)
+    # ответы на запросы, отправленные до паузы
+    bucket.throttled(None)
+    assert bucket.stats().rate == pytest.approx(5.0)
+    assert bucket.acquire() == pytest.approx(RATE_LIMIT_DEFAULT_RETRY_AFTER_S)
+
+
+def test_adapter_retries_429(tmp_path, clock, fake_transport):
+    limiter = RateLimiter(tmp_path, {"orders": RateLimit(10.0, 1)}, lambda url: "orders")
+    session = requests.Session()
+    transport = fake_transport(429, 429, 200, headers=RETRY_AFTER)
+    session.mount("http://", RateLimitingAdapter(limiter, transport))
+    started = clock.now
+    assert session.get("http://api/v2/orders").status_code == 200
+    assert clock.now - started == pytest.approx(6.0)
+    assert limiter.stats()["orders"].throttled == 2
+
+
+@pytest.mark.usefixtures("clock")
+def test_adapter_gives_up_after_retries(tmp_path, fake_transport):
+    limiter = RateLimiter(tmp_path, {"orders": RateLimit(10.0, 1)}, lambda url: "orders")
+    session = requests.Session()
+    transport = fake_transport(429, 429, headers=RETRY_AFTER)
+    session.mount("http://", RateLimitingAdapter(limiter, transport, retries=1))
+    assert session.get("http://api/v2/orders").status_code == 429
@@ -0,0 +1,105 @@
+import json
+import pytest
+import requests
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+from yarl import URL
+
+from database.models import Base, CityModel, DeliveryPointModel, SyncStateModel
+from tests.api.api_client import ApiClient
+from tests.api.reference_sync import ReferenceSync
+
+MOSCOW = {"city_uuid": "a", "code": 44, "city": "Москва", "extra": "не в таблице"}
+NOVOSIBIRSK = {"city_uuid": "b", "code": 270, "city": "Новосибирск"}
+MSK1 = {"code": "MSK1", "type": "PVZ", "location": {"city_code": 44}}
+NSK1 = {"code": "NSK1", "type": "PVZ", "location": {"city_code": 270}}
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, _record):
+        # без PRAGMA SQLite не проверяет внешние ключи и порядок удаления не виден
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def sync(session, fake_transport, cities, points):
+    transport = fake_transport((200, json.dumps(cities)), (200, json.dumps(points)))
+    client = ApiClient(URL("http://api"), adapter=transport)
+    tables = ReferenceSync(client, session, batch_size=1).sync()
+    return {table.name: (table.rows, table.upserted, table.deleted) for table in tables}
+
+
+def stored(session, model, *columns):
+    return set(session.execute(select(*(getattr(model, name) for name in columns))).all())
+
+
+def test_first_sync_writes_everything(session, fake_transport):
+    result = sync(session, fake_transport, [MOSCOW, NOVOSIBIRSK], [MSK1, NSK1])
+    assert result == {"cities": (2, 2, 0), "delivery_points": (2, 2, 0)}
+    assert stored(session, CityModel, "code", "city") == {(44, "Москва"), (270, "Новосибирск")}
+    assert stored(session, DeliveryPointModel, "code", "city_code") == {("MSK1", 44), ("NSK1", 270)}
+    assert stored(session, SyncStateModel, "name", "rows", "upserted", "deleted") == {
+        ("cities", 2, 2, 0),
+        ("delivery_points", 2, 2, 0),
+    }
+
+
+def test_unchanged_rows_are_skipped(session, fake_transport):
+    sync(session, fake_transport, [MOSCOW, NOVOSIBIRSK], [MSK1, NSK1])
+    result = sync(session, fake_transport, [MOSCOW, NOVOSIBIRSK], [MSK1, NSK1])
+    assert result == {"cities": (2, 0, 0), "delivery_points": (2, 0, 0)}
+
+
+def test_changed_rows_are_upserted(session, fake_transport):
+    sync(session, fake_transport, [MOSCOW, NOVOSIBIRSK], [MSK1, NSK1])
+    result = sync(
+        session,
+        fake_transport,
+        [MOSCOW, {**NOVOSIBIRSK, "city": "Новосибирск-Главный"}],
+        [MSK1, {**NSK1, "type": "POSTAMAT"}],
+    )
+    assert result == {"cities": (2, 1, 0), "delivery_points": (2, 1, 0)}
+    assert session.get(CityModel, "b").city == "Новосибирск-Главный"
+    assert session.get(DeliveryPointModel, "NSK1").type == "POSTAMAT"
+
+
+def test_city_uuid_changes_under_same_code(session, fake_transport):
+    sync(session, fake_transport, [MOSCOW], [MSK1])
+    result = sync(session, fake_transport, [{**MOSCOW, "city_uuid": "a2"}], [MSK1])
+    # новый uuid - новая строка для синхронизации, но upsert идёт по code
+    assert result == {"cities": (1, 1, 1), "delivery_points": (1, 0, 0)}
+    session.expire_all()
+    assert stored(session, CityModel, "city_uuid", "code") == {("a2", 44)}
+    assert session.get(DeliveryPointModel, "MSK1").city_code == 44
+
+
+def test_points_of_unknown_cities_are_dropped(session, fake_transport):
+    orphan = {"code": "SPB1", "location": {"city_code": 137}}
+    result = sync(session, fake_transport, [MOSCOW], [MSK1, orphan, {"code": "NOWHERE"}])
+    assert result == {"cities": (1, 1, 0), "delivery_points": (1, 1, 0)}
+    assert stored(session, DeliveryPointModel, "code") == {("MSK1",)}
+
+
+def test_missing_rows_are_deleted(session, fake_transport):
+    sync(session, fake_transport, [MOSCOW, NOVOSIBIRSK], [MSK1, NSK1])
+    # город удаляется вместе со своим офисом: офис раньше, иначе упадёт внешний ключ
+    result = sync(session, fake_transport, [MOSCOW], [MSK1])
+    assert result == {"cities": (1, 0, 1), "delivery_points": (1, 0, 1)}
+    assert stored(session, CityModel, "code") == {(44,)}
+    assert stored(session, DeliveryPointModel, "code") == {("MSK1",)}
+
+
+def test_failed_sync_is_rolled_back(session, fake_transport):
+    sync(session, fake_transport, [MOSCOW], [MSK1])
+    transport = fake_transport((200, json.dumps([NOVOSIBIRSK])), 500)
+    client = ApiClient(URL("http://api"), adapter=transport)
+    with pytest.raises(requests.HTTPError):
+        ReferenceSync(client, session).sync()
+    assert stored(session, CityModel, "code") == {(44,)}
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import Base, CityModel, DeliveryModeModel, DeliveryPointModel
+from database.repository import (
+    DeliveryModeRepository,
+    DeliveryPointRepository,
+    table_row,
+    upsert,
+)
+
+
+@pytest.fixture(params=["sqlite", "other"])
+def session(request, monkeypatch):
+    """SQLite в памяти; "other" - диалект без upsert, строки пишутся по одной"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    if request.param != "sqlite":
+        monkeypatch.setattr(engine.dialect, "name", request.param)
+    with Session(engine) as session:
+        session.add(CityModel(city_uuid="a", code=44, city="Москва"))
+        session.commit()
+        yield session
+
+
+def modes(session):
+    return {
+        mode.tariff_code: (mode.id, mode.delivery_mode_name)
+        for mode in session.scalars(select(DeliveryModeModel))
+    }
+
+
+def test_upsert_by_unique_column(session):
+    # совпадение не по первичному ключу: uuid города сменился при том же code
+    upsert(session, CityModel, [{"city_uuid": "a2", "code": 44, "city": "Москва"}], ("code",))
+    upsert(session, CityModel, [{"city_uuid": "b", "code": 270, "city": "Новосибирск"}], ("code",))
+    session.commit()
+    session.expire_all()
+    assert set(session.execute(select(CityModel.city_uuid, CityModel.code)).all()) == {
+        ("a2", 44),
+        ("b", 270),
+    }
+
+
+def test_upsert_without_rows(session):
+    upsert(session, CityModel, [], ("code",))
+    assert session.scalars(select(CityModel.code)).all() == [44]
+
+
+def test_write_mode_list_keeps_ids(session):
+    repository = DeliveryModeRepository(session)
+    repository.write_mode_list(
+        [
+            {"delivery_mode": "1", "delivery_mode_name": "дверь-дверь", "tariff_code": 137},
+            {"delivery_mode": "2", "delivery_mode_name": "дверь-склад", "tariff_code": 136},
+        ]
+    )
+    ids = {code: mode_id for code, (mode_id, _) in modes(session).items()}
+    # повторная запись обновляет строку по tariff_code, автоинкрементный id не меняется
+    repository.write_mode_list(
+        [
+            {"delivery_mode": "2", "delivery_mode_name": "дверь-постамат", "tariff_code": 136},
+            {"delivery_mode": "3", "delivery_mode_name": "склад-дверь", "tariff_code": 138,
+             "id": 1},
+        ]
+    )
+    session.expire_all()
+    stored = modes(session)
+    assert stored[137] == (ids[137], "дверь-дверь")
+    assert stored[136] == (ids[136], "дверь-постамат")
+    assert stored[138][0] not in ids.values()
+
+
+def test_write_points_is_repeatable(session):
+    repository = DeliveryPointRepository(session)
+    point = {"code": "MSK1", "type": "PVZ", "location": {"city_code": 44}, "unknown": 1}
+    points = repository.write_points([point], 44)
+    assert [(stored.code, stored.city_code, stored.type) for stored in points] == [
+        ("MSK1", 44, "PVZ")
+    ]
+    points = repository.write_points([{**point, "type": "POSTAMAT"}, {"code": "MSK2"}], 44)
+    session.expire_all()
+    assert sorted((stored.code, stored.type) for stored in repository.get_city_points(44)) == [
+        ("MSK1", "POSTAMAT"),
+        ("MSK2", None),
+    ]
+    assert len(points) == 2
+
+
+def test_write_points_rolls_back(session):
+    repository = DeliveryPointRepository(session)
+    repository.write_points([{"code": "MSK1"}], 44)
+    duplicate_uuid = [{"code": "MSK2", "uuid": "u"}, {"code": "MSK3", "uuid": "u"}]
+    with pytest.raises(IntegrityError):
+        repository.write_points(duplicate_uuid, 44)
+    # сессия после ошибки рабочая, записанное ранее на месте
+    assert [point.code for point in repository.get_city_points(44)] == ["MSK1"]
+
+
+def test_table_row_hashes_only_columns():
+    row = table_row(DeliveryPointModel, {"code": "MSK1", "unknown": 1})
+    assert "unknown" not in row
+    assert row["content_hash"] == table_row(DeliveryPointModel, {"code": "MSK1"})["content_hash"]
+    assert row["content_hash"] != table_row(DeliveryPointModel, {"code": "MSK2"})["content_hash"]
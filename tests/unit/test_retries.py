@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+from tests.api.circuit_breaker import CircuitBreakers, CircuitOpenError
+from tests.api.retries import RetryBudget, RetryingAdapter, RetryPolicy
+
+
+@pytest.fixture
+def budget(tmp_path):
+    return RetryBudget(tmp_path / "budget.state", budget=2, ratio=0.5)
+
+
+def session_with(transport, budget, breakers=None, policy=RetryPolicy(3, 0.1)):
+    session = requests.Session()
+    adapter = RetryingAdapter(
+        transport, {"v2/orders": policy}, lambda url: "v2/orders", budget, breakers
+    )
+    session.mount("http://", adapter)
+    return session
+
+
+def test_budget_denies_when_empty(budget):
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    assert budget.stats() == (2, 1)
+
+
+def test_budget_refills_with_requests(budget):
+    budget.withdraw()
+    budget.withdraw()
+    # два запроса по 0.5 токена
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+@pytest.mark.usefixtures("clock")
+def test_retries_until_success(budget, fake_transport):
+    transport = fake_transport(503, requests.ConnectionError(), 200)
+    assert session_with(transport, budget).get("http://h/v2/orders").status_code == 200
+    assert transport.sent == 3
+
+
+@pytest.mark.usefixtures("clock")
+def test_retries_stop_when_budget_is_spent(tmp_path, fake_transport):
+    budget = RetryBudget(tmp_path / "budget.state", budget=1, ratio=0)
+    transport = fake_transport(500, 500, 200)
+    assert session_with(transport, budget).get("http://h/v2/orders").status_code == 500
+    assert transport.sent == 2
+    assert budget.stats() == (1, 1)
+
+
+@pytest.mark.usefixtures("clock")
+def test_post_is_retried_only_if_not_sent(budget, fake_transport):
+    transport = fake_transport(requests.ConnectTimeout(), 500, 200)
+    response = session_with(transport, budget).post("http://h/v2/orders", json={})
+    assert response.status_code == 500
+    assert transport.sent == 2
+
+
+@pytest.mark.usefixtures("clock")
+def test_idempotent_policy_retries_post(budget, fake_transport):
+    transport = fake_transport(500, 200)
+    session = session_with(transport, budget, policy=RetryPolicy(3, 0.1, idempotent=True))
+    assert session.post("http://h/v2/orders", json={}).status_code == 200
+
+
+@pytest.mark.usefixtures("clock")
+def test_breaker_counts_one_failure_per_request(tmp_path, budget, fake_transport):
+    breakers = CircuitBreakers(tmp_path, ["v2/orders"], lambda url: "v2/orders")
+    transport = fake_transport(*[500] * 6)
+    session = session_with(transport, budget, breakers)
+    session.get("http://h/v2/orders")
+    assert transport.sent == 3
+    assert breakers.stats()["v2/orders"].failures == 1
+
+
+@pytest.mark.usefixtures("clock")
+def test_open_breaker_rejects_without_sending(tmp_path, budget, fake_transport):
+    breakers = CircuitBreakers(tmp_path, ["v2/orders"], lambda url: "v2/orders")
+    breaker = breakers.breakers["v2/orders"]
+    for _ in range(breaker.threshold):
+        breaker.record(False)
+    transport = fake_transport()
+    with pytest.raises(CircuitOpenError):
+        session_with(transport, budget, breakers).get("http://h/v2/orders")
+    assert transport.sent == 0
@@ -0,0 +1,43 @@
+import random
+import pytest
+
+from tests.api.sharding import parse_shard, partition, partition_key
+
+NODEIDS = [f"test_a.py::test_{i}" for i in range(20)]
+WEIGHTS = {nodeid: float(i % 7 + 1) for i, nodeid in enumerate(NODEIDS)}
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == (2, 3)
+    for value in ("0/3", "4/3", "1/0", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_partition_does_not_depend_on_collection_order():
+    shuffled = NODEIDS[:]
+    random.Random(1).shuffle(shuffled)
+    assert partition(shuffled, 3, WEIGHTS.get) == partition(NODEIDS, 3, WEIGHTS.get)
+    assert partition_key(shuffled, WEIGHTS.get) == partition_key(NODEIDS, WEIGHTS.get)
+
+
+def test_partition_covers_every_test_once():
+    shards = partition(NODEIDS + NODEIDS[:3], 3, WEIGHTS.get)
+    assert sorted(nodeid for shard in shards for nodeid in shard) == sorted(NODEIDS)
+
+
+def test_partition_balances_load():
+    shards = partition(NODEIDS, 3, WEIGHTS.get)
+    loads = [sum(WEIGHTS[nodeid] for nodeid in shard) for shard in shards]
+    # LPT: разница нагрузок не больше самого длинного теста
+    assert max(loads) - min(loads) <= max(WEIGHTS.values())
+
+
+def test_partition_key_changes_with_weights():
+    weights = {**WEIGHTS, NODEIDS[0]: 100.0}
+    assert partition_key(NODEIDS, weights.get) != partition_key(NODEIDS, WEIGHTS.get)
+
+
+def test_more_shards_than_tests():
+    shards = partition(NODEIDS[:2], 4, WEIGHTS.get)
+    assert sorted(map(len, shards)) == [0, 0, 1, 1]
@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database.models import Base, CityModel, DeliveryModeModel, DeliveryPointModel
+from database.snapshot import ReferenceSnapshot, source_marker, write_snapshot
+from enums.country_code import CountryCode
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                CityModel(
+                    city_uuid="b", code=270, country_code=CountryCode.RU, city="Новосибирск",
+                    latitude=55.03, kladr_code=5400000100000, content_hash="x",
+                ),
+                CityModel(city_uuid="a", code=44, country_code=CountryCode.RU, city="Москва"),
+                CityModel(city_uuid="c", code=9999, city=None),
+            ]
+        )
+        session.add_all(
+            [
+                DeliveryPointModel(
+                    code="MSK2", city_code=44, type="PVZ", weight_min=0, weight_max=30,
+                    take_only=False, phones=[{"number": "+7"}],
+                ),
+                DeliveryPointModel(
+                    code="MSK1", city_code=44, type="POSTAMAT", weight_min=5, weight_max=20,
+                    take_only=True,
+                ),
+                DeliveryPointModel(code="NSK1", city_code=270, weight_min=None, weight_max=0),
+            ]
+        )
+        session.add_all(
+            [
+                DeliveryModeModel(delivery_mode="1", delivery_mode_name="дверь-дверь",
+                                  tariff_code=137),
+                DeliveryModeModel(delivery_mode="2", delivery_mode_name="дверь-склад",
+                                  tariff_code=136),
+            ]
+        )
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def snapshot(session, tmp_path):
+    write_snapshot(session, tmp_path / "reference.snap")
+    return ReferenceSnapshot.open(tmp_path / "reference.snap")
+
+
+def test_tables_sorted(snapshot):
+    assert [city.code for city in snapshot.cities] == [44, 270, 9999]
+    assert [point.code for point in snapshot.delivery_points] == ["MSK1", "MSK2", "NSK1"]
+    assert [mode.tariff_code for mode in snapshot.delivery_modes] == [137, 136]
+    assert snapshot.cities[-1].code == 9999
+    assert [city.code for city in snapshot.cities[1:]] == [270, 9999]
+    with pytest.raises(IndexError):
+        snapshot.cities[3]
+
+
+def test_values_and_nulls(snapshot):
+    moscow, novosibirsk, empty = snapshot.cities
+    assert novosibirsk.city == "Новосибирск"
+    assert novosibirsk.latitude == 55.03
+    assert novosibirsk.kladr_code == 5400000100000
+    assert moscow.country_code is CountryCode.RU
+    assert moscow.latitude is None
+    assert moscow.kladr_code is None
+    assert empty.city is None
+    assert empty.country_code is None
+    msk1, msk2, _ = snapshot.delivery_points
+    assert msk1.take_only is True
+    assert msk2.take_only is False
+    assert msk2.type == "PVZ"
+
+
+def test_skipped_columns(snapshot):
+    city = snapshot.cities[1]
+    assert city.to_dict()["country_code"] == "RU"
+    assert "content_hash" not in city.to_dict()
+    with pytest.raises(AttributeError):
+        city.content_hash
+    with pytest.raises(AttributeError):
+        snapshot.delivery_points[0].phones
+
+
+def test_records_equality(snapshot):
+    assert snapshot.cities[0] == snapshot.cities[0]
+    assert snapshot.cities[0] != snapshot.cities[1]
+    assert len({snapshot.cities[0], snapshot.cities[0]}) == 1
+
+
+def test_city_points(snapshot):
+    assert [point.code for point in snapshot.city_points(44)] == ["MSK1", "MSK2"]
+    assert [point.code for point in snapshot.city_points(270)] == ["NSK1"]
+    assert snapshot.city_points(9999) == []
+
+
+def test_weight_envelopes(snapshot):
+    envelopes = snapshot.weight_envelopes
+    # нулевые веса не учитываются
+    assert envelopes[44] == (5, 20)
+    assert envelopes[270] == (None, None)
+    assert 9999 not in envelopes
+    assert dict(envelopes) == {44: (5, 20), 270: (None, None)}
+
+
+def test_open_missing_file(tmp_path):
+    assert ReferenceSnapshot.open(tmp_path / "missing.snap") is None
+
+
+def test_open_not_a_snapshot(tmp_path):
+    path = tmp_path / "reference.snap"
+    path.write_bytes(b"NOTASNAP" + bytes(16))
+    with pytest.raises(ValueError):
+        ReferenceSnapshot.open(path)
+
+
+def test_marker_tracks_database(session, snapshot):
+    assert snapshot.marker == source_marker(session)
+    assert snapshot.marker["cities"] == 3
+    session.add(CityModel(city_uuid="d", code=137, city="Санкт-Петербург"))
+    session.commit()
+    # снимок записан до изменения базы и больше ей не соответствует
+    assert snapshot.marker != source_marker(session)
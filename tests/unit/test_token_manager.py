@@ -0,0 +1,50 @@
+import json
+import pytest
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from yarl import URL
+
+from database.models import Base
+from database.repository import TokenRepository
+from tests.api.api_client import ApiClient
+from tests.api.fixtures.token_manager import TokenError, TokenManager
+
+BASE_URL = URL("http://api")
+TOKEN = {"access_token": "abc", "expires_in": 3600, "jti": "1", "token_type": "bearer"}
+
+
+@pytest.fixture
+def token_repository():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield TokenRepository(session)
+
+
+def token_manager(token_repository, transport) -> TokenManager:
+    return TokenManager(
+        BASE_URL,
+        token_repository,
+        ApiClient(BASE_URL, adapter=transport),
+        background_refresh=False,
+    )
+
+
+def test_token_is_fetched_once(token_repository, fake_transport):
+    transport = fake_transport((200, json.dumps(TOKEN)))
+    manager = token_manager(token_repository, transport)
+    assert manager.auth_header == {"Authorization": "Bearer abc"}
+    assert manager.token == "abc"
+    assert transport.sent == 1
+    assert token_repository.get_last_token_row().access_token == "abc"
+
+
+@pytest.mark.parametrize("outcome", [500, requests.ConnectionError("circuit is open")])
+def test_failed_oauth_is_an_ordinary_error(token_repository, fake_transport, outcome):
+    manager = token_manager(token_repository, fake_transport(outcome))
+    # фоновые потоки ловят ошибки запросов и не должны падать с pytest.fail
+    with pytest.raises(requests.RequestException) as error:
+        _ = manager.auth_header
+    assert isinstance(error.value, TokenError)
+    assert not isinstance(error.value, pytest.fail.Exception)